@@ -2,11 +2,21 @@
 # REPLACE your current schema.py with this
 
 import graphene
-from crm.schema import Query as CRMQuery
+from crm.schema import AsyncQuery as CRMAsyncQuery, Query as CRMQuery, Mutation as CRMMutation
 
 
 class Query(CRMQuery, graphene.ObjectType):
     pass
 
 
-schema = graphene.Schema(query=Query)
\ No newline at end of file
+class AsyncQuery(CRMAsyncQuery, Query):
+    class Meta:
+        name = 'Query'
+
+
+class Mutation(CRMMutation, graphene.ObjectType):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation)
+async_schema = graphene.Schema(query=AsyncQuery, mutation=Mutation)
@@ -73,6 +73,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'alx_backend_graphql_crm.wsgi.application'
+ASGI_APPLICATION = 'alx_backend_graphql_crm.asgi.application'
 
 
 # Database
@@ -82,6 +83,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the in-memory default, so the multi-threaded
+        # tests' connections wait on each other's locks instead of failing
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -131,10 +135,96 @@ GRAPHENE = {
     'SCHEMA': 'alx_backend_graphql_crm.schema.schema'
 }
 
+# "default" is per process; "shared" is seen by every web and Celery worker
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/1"},
+}
+
+# Parsed/validated GraphQL document cache and persisted-query store (crm/persisted.py)
+GRAPHQL_DOCUMENT_CACHE = {
+    "MAX_ENTRIES": 1000,
+    "MAX_BYTES": 16 * 1024 * 1024,  # estimated AST memory
+    "PERSISTED_QUERY_CACHE": "default",  # alias in CACHES
+}
+
+# Shared cache of query results, invalidated per model on writes
+GRAPHQL_RESPONSE_CACHE = {
+    "ENABLED": False,
+    "CACHE": "default",  # alias in CACHES; use a shared backend (e.g. Redis) across workers
+    "TIMEOUT": 300,  # seconds
+}
+
+# Query cost limits (crm/complexity.py): cost ~ rows fetched, nested page sizes multiply
+GRAPHQL_QUERY_COST = {
+    "MAX_COST": 20_000,  # estimated rows; allCustomers { orders { items { product } } } costs 11100 per 100 customers
+    "MAX_DEPTH": 6,  # nested object fields; connection edges/node do not count
+    "ROW_ESTIMATES": {},  # e.g. {"Query.allOrders": 50000, "Customer.orders": 10}
+    "TABLE_SIZE_TTL": 60,  # seconds; unpaginated root lists (allOrders, ...) are priced at the table size
+}
+
+# Resolver timing and SQL counts (crm/instrumentation.py), scraped from /graphql/metrics
+GRAPHQL_INSTRUMENTATION = {
+    "SAMPLE_RATE": 0.0,  # fraction of requests traced into the histograms
+    "DEBUG_HEADER": "X-GraphQL-Debug",  # traced and returned in extensions.timing; DEBUG, INTERNAL_IPS or staff only
+    "MAX_OPERATIONS": 100,  # operation names with their own histogram series; the rest count as "other"
+}
+
+# /export/customers and /export/orders (crm/exports.py)
+CRM_EXPORT = {
+    "CHUNK_SIZE": 2000,  # rows fetched per round trip and flushed per response chunk
+}
+
+# GraphQL client used by the cron jobs and Celery tasks (crm/client.py)
+CRM_GRAPHQL_CLIENT = {
+    "URL": "http://localhost:8000/graphql",
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 30,
+    "RETRIES": 3,  # queries on any transport error or 429/5xx; mutations only if never sent
+    "BACKOFF": 0.5,  # seconds, doubled per attempt with full jitter
+    "BACKOFF_MAX": 8.0,
+    "POOL_SIZE": 10,  # keep-alive connections per process
+    "IN_PROCESS": None,  # None: execute against crm.schema.schema whenever Django is loaded
+}
+
+# DailySales rollup refreshed by crm.tasks.refresh_sales_rollup (crm/rollups.py)
+CRM_SALES_ROLLUP = {
+    "LOOKBACK_DAYS": 1,  # days before the watermark rebuilt on every run
+    "BATCH_SIZE": 1000,
+}
+
+# crm.tasks.generate_crm_report: one chord subtask per primary-key range of this size
+CRM_REPORT = {
+    "PARTITION_SIZE": 100_000,
+}
+
+# Structured job output (crm/sinks.py): JSONLinesSink, RotatingFileSink or
+# DatabaseSink (crm.JobLog rows), plus their options
+CRM_SINKS = {
+    "heartbeat": {
+        "BACKEND": "crm.sinks.RotatingFileSink",
+        "PATH": "/tmp/crm_heartbeat_log.jsonl",
+        "MAX_BYTES": 1024 * 1024,
+        "BACKUP_COUNT": 3,
+    },
+    "low_stock": {"BACKEND": "crm.sinks.JSONLinesSink", "PATH": "/tmp/crm_low_stock_log.jsonl"},
+    "order_reminders": {"BACKEND": "crm.sinks.JSONLinesSink", "PATH": "/tmp/crm_order_reminders_log.jsonl"},
+    "report": {"BACKEND": "crm.sinks.DatabaseSink"},
+}
+
+# Event-driven restocking (crm/inventory.py): stock writes that leave a product
+# below THRESHOLD queue crm.tasks.restock_product, once per product per window
+CRM_RESTOCK = {
+    "THRESHOLD": 10,
+    "INCREMENT_BY": 10,
+    "DEBOUNCE_SECONDS": 5,  # events for one product within this window queue one task
+    "CACHE": "shared",  # alias in CACHES holding the debounce keys; must be shared by all workers (crm.E002)
+    "QUEUE": "restock",  # run a worker with -Q celery,restock
+}
+
 # django-crontab jobs
 CRONJOBS = [
     ('*/5 * * * *', 'crm.cron.log_crm_heartbeat'),
-    ('0 */12 * * *', 'crm.cron.update_low_stock'),  # Task 3 below
 ]
 
 # Celery broker/backend (example uses Redis)
@@ -146,4 +236,8 @@ CELERY_BEAT_SCHEDULE = {
         "task": "crm.tasks.generate_crm_report",
         "schedule": crontab(day_of_week="mon", hour=6, minute=0),  # Mondays 06:00
     },
+    "refresh-sales-rollup": {
+        "task": "crm.tasks.refresh_sales_rollup",
+        "schedule": crontab(minute="*/15"),
+    },
 }
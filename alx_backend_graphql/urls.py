@@ -6,10 +6,17 @@ URL configuration for alx_backend_graphql_crm project.
 
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
+from crm.views import AsyncCRMGraphQLView, CRMGraphQLView, export, graphql_cache_stats, graphql_metrics
+from .schema import async_schema
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
-]
\ No newline at end of file
+    path("graphql", csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
+    # ASGI deployments: queries run on the event loop (see alx_backend_graphql/asgi.py)
+    path("graphql/async", csrf_exempt(AsyncCRMGraphQLView.as_view(graphiql=True, async_schema=async_schema))),
+    path("graphql/cache-stats", graphql_cache_stats),
+    path("graphql/metrics", graphql_metrics),
+    path("export/customers", export, {"resource": "customers"}),
+    path("export/orders", export, {"resource": "orders"}),
+]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, OrderItem, DailySales, JobLog
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -11,7 +11,28 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'price', 'stock')
     search_fields = ('name',)
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 1
+    autocomplete_fields = ('product',)
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer', 'total_amount', 'order_date')
-    filter_horizontal = ('products',)
\ No newline at end of file
+    inlines = (OrderItemInline,)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Deleted inline lines do not go through the item/m2m signals
+        Order.objects.filter(pk=form.instance.pk).update_totals()
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'order_count', 'revenue', 'customer_count')
+    date_hierarchy = 'date'
+
+@admin.register(JobLog)
+class JobLogAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'stream', 'event', 'level', 'message')
+    list_filter = ('stream', 'level')
+    date_hierarchy = 'created_at'
@@ -0,0 +1,227 @@
+import statistics
+import subprocess
+from contextlib import nullcontext
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .instrumentation import OperationTrace
+from .models import Customer, Order, OrderItem, Product
+from .schema import schema
+
+PERCENTILES = (50, 90, 95, 99)
+
+CUSTOMER_FIELDS = "id name email phone createdAt"
+PRODUCT_FIELDS = "id name price stock"
+ORDER_FIELDS = "id totalAmount orderDate customer { name email } products { edges { node { name price } } }"
+
+
+class Operation:
+    """
+    One benchmarked GraphQL document. ``variables`` receives the fixtures so
+    operations can refer to rows of whatever dataset is loaded.
+    """
+
+    def __init__(self, name, query, variables=None, mutation=False):
+        self.name = name
+        self.query = query
+        self.variables = variables or (lambda fixtures: {})
+        self.mutation = mutation
+
+
+def connection_page(field, fields, args=''):
+    return f"{{ {field}(first: 20{args}) {{ pageInfo {{ hasNextPage }} edges {{ cursor node {{ {fields} }} }} }} }}"
+
+
+def keyset_page(field, fields):
+    return (
+        f"query($after: String) {{ {field}(first: 20, keyset: true, after: $after) "
+        f"{{ pageInfo {{ hasNextPage endCursor }} edges {{ node {{ {fields} }} }} }} }}"
+    )
+
+
+OPERATIONS = [
+    # Connection pages
+    Operation('customers.page', connection_page('customersConnection', CUSTOMER_FIELDS)),
+    Operation('customers.page.deep', connection_page('customersConnection', CUSTOMER_FIELDS, ', offset: 5000')),
+    Operation('customers.keyset', keyset_page('customersConnection', CUSTOMER_FIELDS)),
+    Operation('products.page', connection_page('productsConnection', PRODUCT_FIELDS)),
+    Operation('orders.page', connection_page('ordersConnection', ORDER_FIELDS)),
+    Operation('orders.keyset', keyset_page('ordersConnection', ORDER_FIELDS)),
+    Operation('customers.page.orders', connection_page(
+        'customersConnection', f"{CUSTOMER_FIELDS} orders(first: 5) {{ edges {{ node {{ id totalAmount }} }} }}"
+    )),
+    # Filters from crm/filters.py
+    Operation('customers.filter.name', connection_page('customersConnection', CUSTOMER_FIELDS, ', name: "ali"')),
+    Operation('customers.filter.email', connection_page('customersConnection', CUSTOMER_FIELDS, ', email: "customer1"')),
+    Operation('customers.filter.phonePattern',
+              connection_page('customersConnection', CUSTOMER_FIELDS, ', phonePattern: "+1"')),
+    Operation('customers.filter.createdAt', (
+        "query($since: DateTime) { customersConnection(first: 20, createdAt_Gte: $since) "
+        f"{{ pageInfo {{ hasNextPage }} edges {{ node {{ {CUSTOMER_FIELDS} }} }} }} }}"
+    ), lambda f: {'since': f['recent']}),
+    Operation('products.filter.name', connection_page('productsConnection', PRODUCT_FIELDS, ', name: "laptop"')),
+    Operation('products.filter.price',
+              connection_page('productsConnection', PRODUCT_FIELDS, ', price_Gte: 100, price_Lte: 500')),
+    Operation('products.filter.lowStock', connection_page('productsConnection', PRODUCT_FIELDS, ', stock_Lte: 9')),
+    Operation('orders.filter.totalAmount',
+              connection_page('ordersConnection', ORDER_FIELDS, ', totalAmount_Gte: 1000')),
+    Operation('orders.filter.orderDate', (
+        "query($since: DateTime) { ordersConnection(first: 20, orderDate_Gte: $since) "
+        f"{{ pageInfo {{ hasNextPage }} edges {{ node {{ {ORDER_FIELDS} }} }} }} }}"
+    ), lambda f: {'since': f['recent']}),
+    Operation('orders.filter.customerName',
+              connection_page('ordersConnection', ORDER_FIELDS, ', customerName: "smith"')),
+    Operation('orders.filter.productName',
+              connection_page('ordersConnection', ORDER_FIELDS, ', productName: "camera"')),
+    Operation('orders.filter.productId', (
+        "query($product: Decimal) { ordersConnection(first: 20, productId: $product) "
+        f"{{ pageInfo {{ hasNextPage }} edges {{ node {{ {ORDER_FIELDS} }} }} }} }}"
+    ), lambda f: {'product': f['popular_product']}),
+    Operation('crmStats', (
+        "{ crmStats { customerCount orderCount revenueSum revenueAvg "
+        "periods(granularity: MONTH) { period orderCount revenue } } }"
+    )),
+    # Mutations, each rolled back after the run
+    Operation('createCustomer', (
+        'mutation { createCustomer(input: {name: "Bench Customer", email: "bench@example.com", '
+        'phone: "+15550000000"}) { ok customer { id } } }'
+    ), mutation=True),
+    Operation('createProduct', (
+        'mutation { createProduct(input: {name: "Bench Product", price: "9.99", stock: 5}) { ok product { id } } }'
+    ), mutation=True),
+    Operation('createOrder', (
+        "mutation($customer: ID!, $product: ID!) { createOrder(input: "
+        "{customerId: $customer, productId: $product, quantity: 1}) { ok message order { id totalAmount } } }"
+    ), lambda f: {'customer': f['customer'], 'product': f['stocked_product']}, mutation=True),
+    Operation('updateLowStockProducts', (
+        "mutation { updateLowStockProducts(incrementBy: 10) { ok updatedProducts { id stock } } }"
+    ), mutation=True),
+    Operation('createCustomers', (
+        "mutation($input: [CustomerInput!]!) { createCustomers(input: $input) { ok errors { index } } }"
+    ), lambda f: {'input': [
+        {'name': f'Bench {i}', 'email': f'bench{i}@example.com'} for i in range(100)
+    ]}, mutation=True),
+    Operation('createProducts', (
+        "mutation($input: [ProductInput!]!) { createProducts(input: $input) { ok errors { index } } }"
+    ), lambda f: {'input': [
+        {'name': f'Bench {i}', 'price': '1.00', 'stock': 10} for i in range(100)
+    ]}, mutation=True),
+    Operation('createOrders', (
+        "mutation($input: [OrderInput!]!) { createOrders(input: $input) { ok errors { index } } }"
+    ), lambda f: {'input': [
+        {'customerId': f['customer'], 'productId': f['stocked_product'], 'quantity': 1} for _ in range(20)
+    ]}, mutation=True),
+]
+
+
+def load_fixtures():
+    """Ids and dates the operations refer to; ``None`` when the database is empty."""
+    customer = Customer.objects.order_by('pk').values_list('pk', flat=True).first()
+    stocked = Product.objects.filter(stock__gte=20).order_by('pk').values_list('pk', flat=True).first()
+    if customer is None or stocked is None:
+        return None
+    popular = (
+        OrderItem.objects.values('product_id').annotate(n=Count('id')).order_by('-n')
+        .values_list('product_id', flat=True).first()
+    )
+    latest = Order.objects.aggregate(latest=Max('order_date'))['latest'] or timezone.now()
+    return {
+        'customer': str(customer),
+        'stocked_product': str(stocked),
+        'popular_product': str(popular or stocked),
+        'recent': (latest - timedelta(days=30)).isoformat(),
+    }
+
+
+def dataset_counts():
+    return {
+        'customers': Customer.objects.count(),
+        'products': Product.objects.count(),
+        'orders': Order.objects.count(),
+        'order_items': OrderItem.objects.count(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Rollback(Exception):
+    pass
+
+
+def execute(operation, variables):
+    """Run ``operation`` once; returns ``(seconds, sql_queries, errors)``."""
+    trace = OperationTrace(operation.name)
+    # A fresh context per run, so request loaders never carry rows over
+    context = SimpleNamespace()
+    try:
+        with transaction.atomic() if operation.mutation else nullcontext():
+            with trace.capture():
+                result = schema.execute(operation.query, variable_values=variables, context_value=context)
+            if operation.mutation:
+                raise Rollback
+    except Rollback:
+        pass
+    return trace.duration, trace.sql_count, [e.message for e in result.errors or []]
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    q = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {
+        **{f'p{p}_ms': round(q[p - 1] * 1000, 3) for p in PERCENTILES},
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'min_ms': round(timings[0] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+        'queries': max(queries),
+    }
+
+
+def run(runs=20, warmup=2, only=None):
+    """Benchmark every operation (or those named in ``only``) and return the JSON-ready report."""
+    fixtures = load_fixtures()
+    if fixtures is None:
+        return None
+    results = {}
+    for operation in OPERATIONS:
+        if only and operation.name not in only:
+            continue
+        variables = operation.variables(fixtures)
+        timings, queries, errors = [], [], []
+        for i in range(warmup + runs):
+            elapsed, sql_count, errors = execute(operation, variables)
+            if i >= warmup:
+                timings.append(elapsed)
+                queries.append(sql_count)
+        results[operation.name] = {**summarize(timings, queries), 'errors': errors}
+    return {
+        'revision': git_revision(),
+        'created': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'runs': runs,
+        'dataset': dataset_counts(),
+        'operations': results,
+    }
+
+
+def compare(previous, current):
+    """Rows of ``(operation, old p50, new p50, change %, old queries, new queries)``."""
+    rows = []
+    for name, new in current['operations'].items():
+        old = previous.get('operations', {}).get(name)
+        if old is None:
+            rows.append((name, None, new['p50_ms'], None, None, new['queries']))
+            continue
+        change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else None
+        rows.append((name, old['p50_ms'], new['p50_ms'], change, old['queries'], new['queries']))
+    return rows
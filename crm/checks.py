@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .inventory import restock_settings
+
+# Backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_restock_cache(app_configs, **kwargs):
+    """The restock debounce keys must live in a cache every web and Celery worker shares."""
+    alias = restock_settings()['CACHE']
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        return [Error(
+            f"CRM_RESTOCK['CACHE'] is {alias!r}, which is not an alias in CACHES.",
+            id='crm.E001',
+        )]
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"CRM_RESTOCK['CACHE'] is {alias!r}, a process-local {backend.rsplit('.', 1)[-1]}; "
+            "restock events would be debounced per process, not per product.",
+            hint="Point it at a cache shared by the web and Celery workers, e.g. RedisCache.",
+            id='crm.E002',
+        )]
+    return []
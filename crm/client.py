@@ -0,0 +1,175 @@
+"""
+GraphQL client shared by the cron jobs and Celery tasks.
+
+Over HTTP it keeps one pooled ``requests.Session`` per process, so calls reuse
+keep-alive connections, and retries failed calls with exponential backoff.
+Queries are retried on any transport error or 429/502/503/504; mutations only
+when the request cannot have reached the server, so a retry never applies one
+twice.
+
+Inside the Django process (Celery workers, ``manage.py crontab run``) the
+client can skip HTTP and execute against ``crm.schema.schema`` directly. The
+module imports without Django so standalone scripts can use the HTTP mode.
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import requests
+from django.conf import settings
+from graphql import OperationType, get_operation_ast, parse
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+DEFAULTS = {
+    'URL': 'http://localhost:8000/graphql',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 30,
+    'RETRIES': 3,
+    'BACKOFF': 0.5,
+    'BACKOFF_MAX': 8.0,
+    'POOL_SIZE': 10,
+    # None: in-process whenever Django is configured and its apps are loaded
+    'IN_PROCESS': None,
+}
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def _settings():
+    configured = getattr(settings, 'CRM_GRAPHQL_CLIENT', {}) if settings.configured else {}
+    return {**DEFAULTS, **configured}
+
+
+def _django_ready():
+    if not settings.configured:
+        return False
+    from django.apps import apps
+    return apps.ready
+
+
+def _is_mutation(query, operation_name=None):
+    try:
+        operation = get_operation_ast(parse(query), operation_name)
+    except Exception:
+        return True  # unknown: treat as not safe to repeat
+    return operation is None or operation.operation != OperationType.QUERY
+
+
+def _not_sent(exc):
+    """True when the request failed before the server could have received it."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class GraphQLClientError(Exception):
+    """The operation returned GraphQL errors, or the server could not be reached."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+class GraphQLClient:
+    def __init__(self, url=None, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff=None, backoff_max=None, pool_size=None, in_process=None):
+        config = _settings()
+        self.url = url or config['URL']
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else config['CONNECT_TIMEOUT'],
+            read_timeout if read_timeout is not None else config['READ_TIMEOUT'],
+        )
+        self.retries = retries if retries is not None else config['RETRIES']
+        self.backoff = backoff if backoff is not None else config['BACKOFF']
+        self.backoff_max = backoff_max if backoff_max is not None else config['BACKOFF_MAX']
+        self.pool_size = pool_size or config['POOL_SIZE']
+        if in_process is None:
+            in_process = config['IN_PROCESS']
+        self.in_process = _django_ready() if in_process is None else in_process
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def execute(self, query, variables=None, operation_name=None, timeout=None):
+        """Run one operation and return its ``data``; raises GraphQLClientError on errors."""
+        if self.in_process:
+            body = self._execute_in_process(query, variables, operation_name)
+        else:
+            body = self._execute_http(query, variables, operation_name, timeout)
+        errors = body.get('errors')
+        if errors:
+            raise GraphQLClientError(errors[0].get('message', 'GraphQL error'), errors)
+        return body.get('data') or {}
+
+    def _execute_in_process(self, query, variables, operation_name):
+        from .schema import schema
+
+        # A bare context: the request loaders attach themselves to it
+        result = schema.execute(
+            query, variable_values=variables, operation_name=operation_name, context_value=SimpleNamespace(),
+        )
+        return result.formatted
+
+    def _execute_http(self, query, variables, operation_name, timeout):
+        payload = {'query': query, 'variables': variables or {}}
+        if operation_name:
+            payload['operationName'] = operation_name
+        timeout = (self.timeout[0], timeout) if timeout is not None else self.timeout
+        idempotent = not _is_mutation(query, operation_name)
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=timeout)
+            except requests.RequestException as e:
+                if last_attempt or not (idempotent or _not_sent(e)):
+                    raise GraphQLClientError(f"GraphQL request failed: {e}") from e
+            else:
+                if resp.status_code not in RETRY_STATUSES or last_attempt or not idempotent:
+                    if resp.status_code >= 400 and not _is_graphql_body(resp):
+                        raise GraphQLClientError(f"GraphQL request failed: HTTP {resp.status_code}")
+                    return resp.json()
+            self.sleep(attempt)
+
+    def sleep(self, attempt):
+        """Exponential backoff with full jitter."""
+        time.sleep(random.uniform(0, min(self.backoff * 2 ** attempt, self.backoff_max)))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def _is_graphql_body(resp):
+    # Validation errors come back as 400 with a regular {"errors": [...]} body
+    try:
+        return isinstance(resp.json(), dict)
+    except ValueError:
+        return False
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(in_process=None):
+    """The process-wide client, so every job shares one connection pool."""
+    with _clients_lock:
+        client = _clients.get(in_process)
+        if client is None:
+            client = _clients[in_process] = GraphQLClient(in_process=in_process)
+        return client
@@ -0,0 +1,231 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from graphene import relay
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    InlineFragmentNode,
+    get_named_type,
+    get_nullable_type,
+    get_operation_ast,
+    is_composite_type,
+)
+from graphql.execution.values import get_argument_values
+
+# A root list of 100 rows with two levels of estimated relations under it,
+# e.g. allCustomers { orders { items { product } } } at 11100, must fit
+DEFAULT_MAX_COST = 20_000
+DEFAULT_MAX_DEPTH = 6
+# Seconds a table-size estimate for the unpaginated root lists is reused
+DEFAULT_TABLE_SIZE_TTL = 60
+# Rows assumed for list fields and connections without first/last, keyed by
+# "<Model or parent type>.<field>". Unpaginated root lists (allOrders, ...) return
+# the whole table and are priced at its estimated size; anything else falls back
+# to the connection max_limit.
+DEFAULT_ROW_ESTIMATES = {
+    'Customer.orders': 10,
+    'Product.orders': 50,
+    'Order.products': 5,
+    'Order.items': 5,
+}
+# Fields that only wrap the rows of a connection; they cost nothing and add no depth
+CONNECTION_WRAPPERS = ('edges', 'node', 'pageInfo')
+
+
+def _settings():
+    return getattr(settings, 'GRAPHQL_QUERY_COST', {})
+
+
+def _row_estimates():
+    return {**DEFAULT_ROW_ESTIMATES, **_settings().get('ROW_ESTIMATES', {})}
+
+
+def _is_connection(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(graphene_type, relay.Connection)
+
+
+def _model(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return getattr(getattr(graphene_type, '_meta', None), 'model', None)
+
+
+def _owner_name(graphql_type):
+    model = _model(graphql_type)
+    return model.__name__ if model is not None else graphql_type.name
+
+
+_table_sizes = {}
+_table_sizes_lock = threading.Lock()
+
+
+def table_rows(model):
+    """
+    Approximate row count of ``model``'s table, reused for TABLE_SIZE_TTL
+    seconds: the planner's estimate on PostgreSQL (a catalog read, no scan),
+    COUNT(*) elsewhere or before the table has been analyzed.
+    """
+    now = time.monotonic()
+    with _table_sizes_lock:
+        cached = _table_sizes.get(model)
+    if cached is not None and now - cached[1] < _settings().get('TABLE_SIZE_TTL', DEFAULT_TABLE_SIZE_TTL):
+        return cached[0]
+    rows = None
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row is not None and row[0] >= 0:
+            rows = row[0]
+    if rows is None:
+        rows = model._default_manager.count()
+    with _table_sizes_lock:
+        _table_sizes[model] = (rows, now)
+    return rows
+
+
+@receiver(setting_changed)
+def _reset_table_sizes(setting, **kwargs):
+    if setting == 'GRAPHQL_QUERY_COST':
+        with _table_sizes_lock:
+            _table_sizes.clear()
+
+
+class QueryCost:
+    """
+    Estimated rows fetched by an operation and its depth in nested object fields
+    (connection edges/node excluded), against the configured limits.
+    """
+
+    def __init__(self, cost, depth, max_cost, max_depth):
+        self.cost = cost
+        self.depth = depth
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+
+    @property
+    def extensions(self):
+        return {'cost': {
+            'requested': self.cost,
+            'maximum': self.max_cost,
+            'depth': self.depth,
+            'maxDepth': self.max_depth,
+        }}
+
+    @property
+    def errors(self):
+        errors = []
+        if self.max_depth is not None and self.depth > self.max_depth:
+            errors.append(GraphQLError(
+                f"Query depth {self.depth} exceeds the maximum of {self.max_depth}",
+                extensions={'code': 'QUERY_TOO_DEEP'},
+            ))
+        if self.max_cost is not None and self.cost > self.max_cost:
+            errors.append(GraphQLError(
+                f"Query cost {self.cost} exceeds the maximum of {self.max_cost}",
+                extensions={'code': 'QUERY_TOO_COMPLEX'},
+            ))
+        return errors
+
+
+class CostAnalyzer:
+    """
+    Walk an operation without executing it. Every object-valued field costs one
+    row per parent row, multiplied by the rows it returns: ``first``/``last`` on
+    connections, otherwise a row estimate, so nesting multiplies page sizes.
+    """
+
+    def __init__(self, schema, document, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)
+        }
+        self.row_estimates = _row_estimates()
+        self.max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    def fields(self, parent_type, selection_set, seen=()):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield parent_type, selection
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.schema.get_type(condition.name.value) if condition else parent_type
+                yield from self.fields(fragment_type, selection.selection_set, seen)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is not None and name not in seen:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                    yield from self.fields(fragment_type, fragment.selection_set, (*seen, name))
+
+    def rows(self, parent_type, field_def, node):
+        """Rows one parent row fans out to through this field."""
+        output_type = get_nullable_type(field_def.type)
+        if _is_connection(get_named_type(output_type)):
+            try:
+                args = get_argument_values(field_def, node, self.variables)
+            except GraphQLError:
+                args = {}
+            requested = args.get('first') if args.get('first') is not None else args.get('last')
+            if requested is not None:
+                return max(requested, 0)
+        elif not isinstance(output_type, GraphQLList):
+            return 1
+        key = f"{_owner_name(parent_type)}.{node.name.value}"
+        if key in self.row_estimates:
+            return self.row_estimates[key]
+        if parent_type is self.schema.query_type and isinstance(output_type, GraphQLList):
+            # Nothing caps allOrders and friends: they return every row
+            model = _model(get_named_type(output_type))
+            if model is not None:
+                return max(table_rows(model), 1)
+        return self.max_limit or 100
+
+    def selection(self, parent_type, selection_set, in_connection=False):
+        """``(cost, depth)`` of a selection set for one row of ``parent_type``."""
+        cost = depth = 0
+        for field_type, node in self.fields(parent_type, selection_set):
+            name = node.name.value
+            if name.startswith('__'):
+                continue  # introspection
+            field_def = field_type.fields.get(name)
+            if field_def is None:
+                continue
+            named = get_named_type(field_def.type)
+            if not is_composite_type(named) or node.selection_set is None:
+                continue
+            if in_connection and name in CONNECTION_WRAPPERS:
+                child_cost, child_depth = self.selection(named, node.selection_set, in_connection=name == 'edges')
+                cost += child_cost
+                depth = max(depth, child_depth)
+                continue
+            child_cost, child_depth = self.selection(named, node.selection_set, in_connection=_is_connection(named))
+            cost += self.rows(field_type, field_def, node) * (1 + child_cost)
+            depth = max(depth, 1 + child_depth)
+        return cost, depth
+
+    def operation(self, operation):
+        root_type = self.schema.get_root_type(operation.operation)
+        return self.selection(root_type, operation.selection_set)
+
+
+def estimate_cost(schema, document, operation_name=None, variables=None):
+    """Cost and depth of the selected operation, checked against GRAPHQL_QUERY_COST."""
+    config = _settings()
+    max_cost = config.get('MAX_COST', DEFAULT_MAX_COST)
+    max_depth = config.get('MAX_DEPTH', DEFAULT_MAX_DEPTH)
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return QueryCost(0, 0, max_cost, max_depth)
+    cost, depth = CostAnalyzer(schema, document, variables).operation(operation)
+    return QueryCost(cost, depth, max_cost, max_depth)
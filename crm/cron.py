@@ -1,31 +1,20 @@
-from gql.transport.requests import RequestsHTTPTransport
-from gql import gql, Client
-from datetime import datetime
-from pathlib import Path
-import requests
-
-HEARTBEAT_LOG = Path("/tmp/crm_heartbeat_log.txt")
-LOW_STOCK_LOG = Path("/tmp/low_stock_updates_log.txt")
-GRAPHQL_URL = "http://localhost:8000/graphql"
+from .client import get_client
+from .sinks import get_sink
 
 def log_crm_heartbeat():
     """
-    Logs 'DD/MM/YYYY-HH:MM:SS CRM is alive' every 5 minutes.
-    Optionally hits the GraphQL hello field; failure is ignored.
+    Records a 'CRM is alive' heartbeat every 5 minutes in the "heartbeat" sink.
+    Also hits the GraphQL hello field and records whether it answered.
     """
-    ts = datetime.now().strftime("%d/%m/%Y-%H:%M:%S")
-    line = f"{ts} CRM is alive"
+    # Always over HTTP, since it checks the web server
     try:
-        HEARTBEAT_LOG.parent.mkdir(parents=True, exist_ok=True)
-        with HEARTBEAT_LOG.open("a", encoding="utf-8") as f:
-            f.write(line + "\n")
+        get_client(in_process=False).execute("query { hello }", timeout=5)
+        graphql_ok = True
     except Exception:
-        pass
-
-    # Optional GraphQL ping (non-fatal)
+        graphql_ok = False
     try:
-        q = {"query": "query { hello }"}
-        requests.post(GRAPHQL_URL, json=q, timeout=5)
+        with get_sink("heartbeat") as sink:
+            sink.emit("heartbeat", "CRM is alive", graphql=graphql_ok)
     except Exception:
         pass
 
@@ -33,7 +22,11 @@ def log_crm_heartbeat():
 def update_low_stock():
     """
     Calls a GraphQL mutation to restock products with stock < 10 by +10.
-    Logs updated product names and new stock to /tmp/low_stock_updates_log.txt
+    Records the updated products and their new stock in the "low_stock" sink.
+
+    No longer scheduled: stock writes queue crm.tasks.restock_product for the
+    products they take below the threshold. Run it by hand for a full sweep,
+    e.g. after importing products with bulk SQL.
     """
     mutation = """
     mutation {
@@ -48,19 +41,11 @@ def update_low_stock():
       }
     }
     """
-    try:
-        resp = requests.post(GRAPHQL_URL, json={"query": mutation}, timeout=30)
-        resp.raise_for_status()
-        data = resp.json().get("data", {}).get("updateLowStockProducts", {})
+    with get_sink("low_stock") as sink:
+        try:
+            data = get_client().execute(mutation).get("updateLowStockProducts") or {}
+        except Exception as e:
+            sink.emit("restock", f"ERROR: {e}", level="error")
+            return
         products = data.get("updatedProducts") or []
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        lines = [f"{ts} - Restocked {len(products)} products"]
-        for p in products:
-            lines.append(f"- {p['name']}: stock={p['stock']}")
-        LOW_STOCK_LOG.parent.mkdir(parents=True, exist_ok=True)
-        with LOW_STOCK_LOG.open("a", encoding="utf-8") as f:
-            f.write("\n".join(lines) + "\n")
-    except Exception as e:
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with LOW_STOCK_LOG.open("a", encoding="utf-8") as f:
-            f.write(f"{ts} - ERROR: {e}\n")
+        sink.emit("restock", f"Restocked {len(products)} products", count=len(products), products=products)
@@ -1,24 +1,37 @@
 #!/usr/bin/env python3
 """
-Query the GraphQL endpoint for orders created in the last 7 days
-and log reminders to /tmp/order_reminders_log.txt
+Query the GraphQL endpoint for orders placed since the last run and record
+one reminder per order in the "order_reminders" sink (JSON Lines in
+/tmp/crm_order_reminders_log.jsonl by default).
+
+The script keeps a high-water mark (the newest ``orderDate`` it has seen) in
+/tmp/order_reminders_state.json and asks only for orders at or after it, so
+each run reads new orders only. The first run looks back 7 days. Orders within
+OVERLAP of the mark are fetched again, to catch orders committed late, and
+skipped by id, so every reminder is logged exactly once.
 """
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import json
+import os
 import sys
 
-# If you prefer using the gql package, it's fine—but to minimize deps here,
-# we'll use requests. (You listed gql in the brief; we'll still include it in requirements)
-import requests
+# Run from cron as a plain script: make the crm package importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from crm.client import get_client
+from crm.sinks import get_sink
 
-GRAPHQL_URL = "http://localhost:8000/graphql"
-LOG_FILE = Path("/tmp/order_reminders_log.txt")
+STATE_FILE = Path("/tmp/order_reminders_state.json")
+FIRST_RUN_LOOKBACK = timedelta(days=7)
+OVERLAP = timedelta(minutes=5)
+PAGE_SIZE = 100
 
+# Keyset pages in (orderDate, id) order; the date filter is applied in SQL
 QUERY = """
-query RecentOrders($first:Int) {
-  allOrders(first:$first) {
+query NewOrders($since: DateTime!, $first: Int!, $after: String) {
+  ordersConnection(orderDate_Gte: $since, first: $first, after: $after, keyset: true) {
+    pageInfo { hasNextPage endCursor }
     edges {
       node {
         id
@@ -30,40 +43,71 @@ query RecentOrders($first:Int) {
 }
 """
 
-def main():
+
+def parse_date(value):
+    # Graphene returns ISO 8601 strings
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def load_state():
+    """``(watermark, {order id: orderDate})`` from the last run, or a fresh start."""
     try:
-        resp = requests.post(GRAPHQL_URL, json={"query": QUERY, "variables": {"first": 1000}})
-        resp.raise_for_status()
-        data = resp.json()
-        edges = data.get("data", {}).get("allOrders", {}).get("edges", [])
-    except Exception as e:
-        print(f"Failed to query GraphQL: {e}", file=sys.stderr)
-        return
-
-    now = datetime.now(timezone.utc)
-    week_ago = now - timedelta(days=7)
-
-    lines = []
-    for edge in edges:
-        node = edge.get("node", {})
-        od = node.get("orderDate")
-        email = (node.get("customer") or {}).get("email")
-        if not od or not email:
-            continue
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        return parse_date(state["watermark"]), state["processed"]
+    except (OSError, ValueError, KeyError):
+        return datetime.now(timezone.utc) - FIRST_RUN_LOOKBACK, {}
+
+
+def save_state(watermark, processed):
+    # Only ids inside the overlap window can be fetched again
+    horizon = watermark - OVERLAP
+    processed = {pk: od for pk, od in processed.items() if parse_date(od) >= horizon}
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"watermark": watermark.isoformat(), "processed": processed}), encoding="utf-8")
+    os.replace(tmp, STATE_FILE)
+
+
+def fetch_page(since, after):
+    variables = {"since": since.isoformat(), "first": PAGE_SIZE, "after": after}
+    return get_client().execute(QUERY, variables)["ordersConnection"]
+
+
+def main():
+    watermark, processed = load_state()
+    since = watermark - OVERLAP
+    after = None
+    sent = 0
+    sink = get_sink("order_reminders")
+
+    while True:
         try:
-            # Graphene returns ISO 8601 strings
-            od_dt = datetime.fromisoformat(od.replace("Z", "+00:00"))
-        except Exception:
-            continue
+            page = fetch_page(since, after)
+        except Exception as e:
+            print(f"Failed to query GraphQL: {e}", file=sys.stderr)
+            return
+
+        for edge in page["edges"]:
+            node = edge["node"]
+            order_id, od = node["id"], node["orderDate"]
+            if order_id in processed:
+                continue
+            processed[order_id] = od
+            watermark = max(watermark, parse_date(od))
+            email = (node.get("customer") or {}).get("email")
+            if email:
+                sink.emit("reminder", f"Order {order_id} -> {email}", order_id=order_id, email=email, order_date=od)
+                sent += 1
 
-        if od_dt >= week_ago:
-            lines.append(f"{now:%Y-%m-%d %H:%M:%S} - Order {node.get('id')} -> {email}")
+        # One write per page, before the state that marks the page as done;
+        # saved after every page, so a failed run resumes where it stopped
+        sink.flush()
+        save_state(watermark, processed)
 
-    if lines:
-        with LOG_FILE.open("a", encoding="utf-8") as f:
-            f.write("\n".join(lines) + "\n")
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
 
-    print("Order reminders processed!")
+    print(f"Order reminders processed! ({sent} new)")
 
 if __name__ == "__main__":
     main()
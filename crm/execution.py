@@ -0,0 +1,35 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from .loaders import AsyncCRMLoaders
+
+ASYNC_FLAG = '_crm_async'
+
+
+def enable_async(context):
+    """Mark ``context`` as executing on the event loop and give it async loaders."""
+    setattr(context, ASYNC_FLAG, True)
+    setattr(context, '_crm_loaders', AsyncCRMLoaders())
+    return context
+
+
+def is_async(info):
+    return getattr(info.context, ASYNC_FLAG, False)
+
+
+def async_aware(resolver):
+    """
+    Wrap a resolver whose work is sync ORM code (pagination, aggregates) so that
+    under async execution it runs in the request's database thread and returns
+    an awaitable, while sync execution calls it directly.
+    """
+    threaded = sync_to_async(resolver)
+
+    @wraps(resolver)
+    def wrapper(root, info, **kwargs):
+        if is_async(info):
+            return threaded(root, info, **kwargs)
+        return resolver(root, info, **kwargs)
+
+    return wrapper
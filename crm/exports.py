@@ -0,0 +1,159 @@
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from graphene.utils.str_converters import to_snake_case
+
+from .filters import CustomerFilter, OrderFilter
+from .models import OrderItem
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _settings():
+    return getattr(settings, 'CRM_EXPORT', {})
+
+
+def chunk_size():
+    return _settings().get('CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+class ExportError(Exception):
+    pass
+
+
+class Export:
+    """
+    A flat, filterable export of one model: ``columns`` maps each output column
+    to the ``values_list`` lookup that reads it, joins included, so the export
+    is a single streamed query however many rows it has.
+    """
+
+    filterset_class = None
+    columns = {}
+
+    def __init__(self, params):
+        # Accept the GraphQL argument names (totalAmount_Gte) as well as the filter's own
+        data = {to_snake_case(key): value for key, value in params.items()}
+        self.filterset = self.filterset_class(data=data, queryset=self.filterset_class._meta.model.objects.all())
+        if not self.filterset.is_valid():
+            raise ExportError(self.filterset.errors.get_json_data())
+
+    def queryset(self):
+        return self.filterset.qs.order_by('pk').values_list(*self.columns.values())
+
+    def rows(self):
+        """Tuples in ``columns`` order, read ``chunk_size()`` rows at a time."""
+        return self.queryset().iterator(chunk_size=chunk_size())
+
+    @property
+    def headers(self):
+        return list(self.columns)
+
+
+class CustomerExport(Export):
+    filterset_class = CustomerFilter
+    columns = {
+        'id': 'pk',
+        'name': 'name',
+        'email': 'email',
+        'phone': 'phone',
+        'created_at': 'created_at',
+    }
+
+
+class OrderExport(Export):
+    filterset_class = OrderFilter
+    columns = {
+        'id': 'pk',
+        'order_date': 'order_date',
+        'customer_id': 'customer_id',
+        'customer_name': 'customer__name',
+        'customer_email': 'customer__email',
+        'total_amount': 'total_amount',
+    }
+
+    @property
+    def headers(self):
+        return [*self.columns, 'products']
+
+    def rows(self):
+        """
+        Order rows plus their product names. Line items are read once per chunk
+        of orders (one ``order_id IN (...)`` query), never once per order.
+        """
+        orders = super().rows()
+        size = chunk_size()
+        while chunk := list(islice(orders, size)):
+            names = {}
+            items = (
+                OrderItem.objects.filter(order_id__in=[row[0] for row in chunk])
+                .order_by('order_id', 'pk')
+                .values_list('order_id', 'product__name')
+            )
+            for order_id, name in items:
+                names.setdefault(order_id, []).append(name)
+            for row in chunk:
+                yield (*row, '; '.join(names.get(row[0], ())))
+
+
+EXPORTS = {
+    'customers': CustomerExport,
+    'orders': OrderExport,
+}
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _cell(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _csv_cell(value):
+    # Spreadsheets evaluate text starting with these as a formula
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(export):
+    """CSV text, one string per chunk of rows, with formula-like text cells quoted."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export.headers)
+    size = chunk_size()
+    for n, row in enumerate(export.rows(), 1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if n % size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(export):
+    """One JSON object per line, flushed once per chunk of rows."""
+    headers = export.headers
+    encoder = DjangoJSONEncoder()
+    lines = []
+    size = chunk_size()
+    for row in export.rows():
+        lines.append(encoder.encode(dict(zip(headers, map(_cell, row)))) + '\n')
+        if len(lines) == size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
@@ -1,6 +1,18 @@
 import django_filters
-from .models import Customer, Product, Order
-from django.db.models import Q
+from .models import Customer, Product, Order, OrderItem
+from django.db.models import Exists, OuterRef, Q
+
+
+# Relation filters on Order use semi-joins instead of joining Order.products,
+# which duplicates rows and then needs a DISTINCT over the whole result.
+def has_order_item(**lookups):
+    """Correlated EXISTS over the order's line items."""
+    return Exists(OrderItem.objects.filter(order=OuterRef('pk'), **lookups))
+
+
+def order_ids_with_item(**lookups):
+    """Uncorrelated ``order_id IN (...)`` subquery, for lookups selective enough to drive the plan."""
+    return OrderItem.objects.filter(**lookups).values('order_id')
 
 class CustomerFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
@@ -14,7 +26,7 @@ class CustomerFilter(django_filters.FilterSet):
         fields = ['name', 'email', 'created_at__gte', 'created_at__lte', 'phone_pattern']
 
     def filter_phone_pattern(self, queryset, name, value):
-        # Example: startswith value
+        # LIKE 'value%'; on PostgreSQL it seeks the varchar_pattern_ops index crm_customer_phone
         return queryset.filter(phone__startswith=value)
 
 class ProductFilter(django_filters.FilterSet):
@@ -42,7 +54,8 @@ class OrderFilter(django_filters.FilterSet):
         fields = ['total_amount__gte', 'total_amount__lte', 'order_date__gte', 'order_date__lte', 'customer_name', 'product_name', 'product_id']
 
     def filter_by_product_name(self, queryset, name, value):
-        return queryset.filter(products__name__icontains=value).distinct()
+        return queryset.filter(has_order_item(product__name__icontains=value))
 
     def filter_by_product_id(self, queryset, name, value):
-        return queryset.filter(products__id=value).distinct()
\ No newline at end of file
+        # Seeks crm_orderitem_product_order first; a correlated EXISTS would probe every order on SQLite
+        return queryset.filter(pk__in=order_ids_with_item(product_id=value))
\ No newline at end of file
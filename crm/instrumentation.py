@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+TRACE_ATTR = '_crm_trace'
+DEFAULT_DEBUG_HEADER = 'X-GraphQL-Debug'
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+DEFAULT_MAX_OPERATIONS = 100
+# Series label for the operation names past MAX_OPERATIONS
+OTHER_OPERATION = 'other'
+
+
+def _settings():
+    return getattr(settings, 'GRAPHQL_INSTRUMENTATION', {})
+
+
+def debug_allowed(request):
+    """Timing exposes SQL counts and resolver paths: DEBUG, INTERNAL_IPS and staff only."""
+    if settings.DEBUG or request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', ()):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def debug_requested(request):
+    header = _settings().get('DEBUG_HEADER', DEFAULT_DEBUG_HEADER)
+    return bool(header and request.headers.get(header)) and debug_allowed(request)
+
+
+def should_trace(request):
+    """Debug-header requests are always traced, others at SAMPLE_RATE (default off)."""
+    if debug_requested(request):
+        return True
+    rate = _settings().get('SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class OperationTrace:
+    """Wall time per field path plus the SQL issued while one operation executed."""
+
+    def __init__(self):
+        # Taken from the executed operation, never from the request's operationName
+        self.operation_name = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.fields = defaultdict(lambda: [0, 0.0])
+        self.field_types = defaultdict(list)
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+    @property
+    def label(self):
+        return self.operation_name or 'anonymous'
+
+    def add_field(self, info, elapsed):
+        if self.operation_name is None and info.operation.name:
+            self.operation_name = info.operation.name.value
+        path = '.'.join(str(key) for key in info.path.as_list() if not isinstance(key, int))
+        entry = self.fields[path]
+        entry[0] += 1
+        entry[1] += elapsed
+        self.field_types[f'{info.parent_type.name}.{info.field_name}'].append(elapsed)
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    @contextmanager
+    def capture(self):
+        with connection.execute_wrapper(self.sql_wrapper):
+            try:
+                yield self
+            finally:
+                self.duration = time.perf_counter() - self.started
+
+    @asynccontextmanager
+    async def capture_async(self):
+        # Under async execution the SQL runs in the request's DB thread, so the
+        # wrapper has to be installed on that thread's connection
+        await sync_to_async(self._install)()
+        try:
+            yield self
+        finally:
+            self.duration = time.perf_counter() - self.started
+            await sync_to_async(self._uninstall)()
+
+    def _install(self):
+        connection.execute_wrappers.append(self.sql_wrapper)
+
+    def _uninstall(self):
+        connection.execute_wrappers.remove(self.sql_wrapper)
+
+    @property
+    def extensions(self):
+        return {'timing': {
+            'operation': self.label,
+            'durationMs': round(self.duration * 1000, 3),
+            'sqlQueries': self.sql_count,
+            'sqlMs': round(self.sql_time * 1000, 3),
+            'fields': [
+                {'path': path, 'calls': calls, 'totalMs': round(total * 1000, 3)}
+                for path, (calls, total) in sorted(self.fields.items(), key=lambda item: -item[1][1])
+            ],
+        }}
+
+
+class TimingMiddleware:
+    """
+    Graphene middleware timing every resolver of a traced operation. The views
+    only install it on traced requests, so untraced ones pay nothing per field.
+    """
+
+    def resolve(self, next, root, info, **args):
+        trace = getattr(info.context, TRACE_ATTR, None)
+        if trace is None:
+            return next(root, info, **args)
+        start = time.perf_counter()
+        result = next(root, info, **args)
+        if isawaitable(result):
+            return self._resolve_async(trace, info, start, result)
+        trace.add_field(info, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    async def _resolve_async(trace, info, start, result):
+        try:
+            return await result
+        finally:
+            trace.add_field(info, time.perf_counter() - start)
+
+
+# Aggregated metrics, exported in the Prometheus text format
+class Histogram:
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def lines(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            prefix = label_text + ',' if label_text else ''
+            suffix = f'{{{label_text}}}' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}'
+            yield f'{self.name}_sum{suffix} {total:.6f}'
+            yield f'{self.name}_count{suffix} {count}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = set()
+        self.operation_duration = Histogram(
+            'graphql_operation_duration_seconds', 'Wall time of traced GraphQL operations.')
+        self.operation_sql_queries = Histogram(
+            'graphql_operation_sql_queries', 'SQL statements per traced GraphQL operation.', QUERY_COUNT_BUCKETS)
+        self.operation_sql_duration = Histogram(
+            'graphql_operation_sql_duration_seconds', 'Time spent in SQL per traced GraphQL operation.')
+        self.field_duration = Histogram(
+            'graphql_field_duration_seconds', 'Resolver wall time per field of traced GraphQL operations.')
+
+    def operation_label(self, name):
+        """
+        ``name`` while fewer than MAX_OPERATIONS names have their own series,
+        else OTHER_OPERATION: names come from client documents, and each one
+        would otherwise add series for as long as the process lives.
+        """
+        if name is None:
+            return 'anonymous'
+        if name not in self._operations:
+            if len(self._operations) >= _settings().get('MAX_OPERATIONS', DEFAULT_MAX_OPERATIONS):
+                return OTHER_OPERATION
+            self._operations.add(name)
+        return name
+
+    def record(self, trace):
+        with self._lock:
+            operation = (('operation', self.operation_label(trace.operation_name)),)
+            self.operation_duration.observe(operation, trace.duration)
+            self.operation_sql_queries.observe(operation, trace.sql_count)
+            self.operation_sql_duration.observe(operation, trace.sql_time)
+            for field, timings in trace.field_types.items():
+                for elapsed in timings:
+                    self.field_duration.observe((('field', field),), elapsed)
+
+    def export(self):
+        with self._lock:
+            histograms = (
+                self.operation_duration,
+                self.operation_sql_queries,
+                self.operation_sql_duration,
+                self.field_duration,
+            )
+            return '\n'.join(line for h in histograms for line in h.lines()) + '\n'
+
+
+metrics = MetricsRegistry()
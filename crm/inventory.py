@@ -0,0 +1,167 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Product
+from .response_cache import invalidate
+
+LOW_STOCK_THRESHOLD = 10
+RESTOCK_DEFAULTS = {
+    'THRESHOLD': LOW_STOCK_THRESHOLD,
+    'INCREMENT_BY': 10,
+    'DEBOUNCE_SECONDS': 5,
+    'CACHE': 'shared',
+    'QUEUE': 'restock',
+}
+
+
+def restock_settings():
+    return {**RESTOCK_DEFAULTS, **getattr(settings, 'CRM_RESTOCK', {})}
+
+
+def supports_update_returning():
+    # PostgreSQL and SQLite >= 3.35 accept UPDATE ... RETURNING; MySQL/MariaDB do not
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert
+
+
+def _restock_returning(increment_by, where, params):
+    table = connection.ops.quote_name(Product._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in Product._meta.concrete_fields)
+    sql = (
+        f"UPDATE {table} SET stock = stock + %s WHERE {where} "
+        f"RETURNING {columns}"
+    )
+    # raw() applies the backend converters (e.g. Decimal for price on SQLite)
+    return sorted(Product.objects.raw(sql, [increment_by, *params]), key=lambda p: p.pk)
+
+
+def _restock_ids(ids, increment_by, threshold):
+    """
+    Restock those of ``ids`` still below ``threshold``, checked again in the
+    UPDATE (or under a row lock) so that a concurrent restock of the same
+    product since the ids were read is not applied twice. Call inside a
+    transaction.
+    """
+    if not ids:
+        return []
+    if supports_update_returning():
+        placeholders = ', '.join(['%s'] * len(ids))
+        return _restock_returning(increment_by, f"id IN ({placeholders}) AND stock < %s", [*ids, threshold])
+    ids = list(
+        Product.objects.select_for_update().filter(pk__in=ids, stock__lt=threshold).values_list('pk', flat=True)
+    )
+    Product.objects.filter(pk__in=ids).update(stock=F('stock') + increment_by)
+    return list(Product.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def reserve_stock(product_id, quantity):
+    """
+    Take ``quantity`` units of a product in one conditional UPDATE
+    (``SET stock = stock - q WHERE stock >= q``) and report whether it applied.
+
+    The check and the decrement are a single statement, so concurrent orders
+    can neither oversell nor lose updates, and the row lock lasts only from the
+    UPDATE to the end of the caller's transaction. Call it last in that
+    transaction to keep the lock short.
+    """
+    reserved = take_stock(product_id, quantity)
+    if reserved:
+        invalidate(Product)
+        stock_changed([product_id])
+    return reserved
+
+
+def take_stock(product_id, quantity):
+    """
+    reserve_stock's conditional UPDATE alone, for batches that invalidate and
+    report stock_changed() once for all their products.
+    """
+    return bool(Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity))
+
+
+def restock_low_stock(increment_by=10, threshold=LOW_STOCK_THRESHOLD, chunk_size=None):
+    """
+    Add ``increment_by`` to every product with ``stock < threshold`` and return the
+    updated products.
+
+    Without ``chunk_size`` this is one set-based UPDATE (one statement with RETURNING
+    where supported). With ``chunk_size`` the products are restocked in primary-key
+    ranges of that size, each in its own short transaction, so row locks are only
+    held for one chunk at a time.
+    """
+    if not chunk_size:
+        with transaction.atomic():
+            if supports_update_returning():
+                updated = _restock_returning(increment_by, "stock < %s", [threshold])
+            else:
+                ids = list(Product.objects.filter(stock__lt=threshold).values_list('pk', flat=True))
+                updated = _restock_ids(ids, increment_by, threshold)
+        # Set-based UPDATEs send no post_save, so cached responses are dropped here
+        invalidate(Product)
+        return updated
+
+    updated = []
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Product.objects.filter(stock__lt=threshold, pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            updated.extend(_restock_ids(ids, increment_by, threshold))
+        last_pk = ids[-1]
+    invalidate(Product)
+    return updated
+
+
+def restock_products(product_ids, increment_by=10, threshold=LOW_STOCK_THRESHOLD):
+    """
+    Add ``increment_by`` to those of ``product_ids`` still below ``threshold``
+    and return them. The threshold is checked in the UPDATE itself, so a
+    product restocked by an earlier event is not restocked again.
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return []
+    with transaction.atomic():
+        updated = _restock_ids(ids, increment_by, threshold)
+    if updated:
+        invalidate(Product)
+    return updated
+
+
+def stock_changed(product_ids):
+    """
+    Report that the stock of ``product_ids`` was written. Once the current
+    transaction commits, those now below the restock threshold are queued for
+    restocking (see enqueue_low_stock); rolled-back writes queue nothing.
+    """
+    ids = list(product_ids)
+    if ids:
+        transaction.on_commit(lambda: enqueue_low_stock(ids), robust=True)
+
+
+def enqueue_low_stock(product_ids):
+    """
+    Queue one ``crm.tasks.restock_product`` per product below the threshold,
+    at most once per product every DEBOUNCE_SECONDS: the first event of a burst
+    claims a cache key and schedules the task that far ahead, and later events
+    in the window find the key taken. Costs one query for the changed products,
+    however large the catalog.
+    """
+    from .tasks import restock_product
+
+    config = restock_settings()
+    low = Product.objects.filter(pk__in=product_ids, stock__lt=config['THRESHOLD']).values_list('pk', flat=True)
+    cache = caches[config['CACHE']]
+    delay = config['DEBOUNCE_SECONDS']
+    queued = []
+    for pk in low:
+        if cache.add(f"crm:restock:{pk}", 1, timeout=delay):
+            restock_product.apply_async(args=[pk], countdown=delay, queue=config['QUEUE'])
+            queued.append(pk)
+    return queued
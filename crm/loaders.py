@@ -0,0 +1,210 @@
+import asyncio
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from .models import Customer, Product, Order, OrderItem
+
+
+class BatchLoader:
+    """
+    Per-request loader: keys are queued as parents are fetched and the
+    first cache miss resolves every queued key with one batched query.
+    """
+
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+        self._queue = set()
+
+    def queue(self, keys):
+        self._queue.update(k for k in keys if k is not None and k not in self._cache)
+
+    def prime(self, key, value):
+        self._cache[key] = value
+        self._queue.discard(key)
+
+    def is_cached(self, key):
+        return key in self._cache
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.queue(keys)
+        return [self.load(k) for k in keys]
+
+    def dispatch(self):
+        keys, self._queue = list(self._queue), set()
+        if not keys:
+            return
+        results = self.batch_load_fn(keys)
+        for key in keys:
+            value = results.get(key)
+            if value is None and self.default is not None:
+                value = self.default()
+            self._cache[key] = value
+
+
+class CRMLoaders:
+    """
+    Loaders for the Customer/Order/Product relations. Each batch queues the
+    rows it returns on the loaders of the next level down, so nested
+    selections are resolved with one IN (...) query per relation.
+    """
+
+    def __init__(self):
+        self.customer = BatchLoader(self._load_customers)
+        self.product = BatchLoader(Product.objects.in_bulk)
+        self.order_items = BatchLoader(self._load_order_items, default=list)
+        self.order_products = BatchLoader(self._load_order_products, default=list)
+        self.customer_orders = BatchLoader(self._load_customer_orders, default=list)
+        self.product_orders = BatchLoader(self._load_product_orders, default=list)
+
+    # Queueing
+    def queue_customers(self, customers):
+        for c in customers:
+            self.customer.prime(c.pk, c)
+        self.customer_orders.queue(c.pk for c in customers)
+
+    def queue_products(self, products):
+        products = list(products)
+        for p in products:
+            self.product.prime(p.pk, p)
+        self.product_orders.queue(p.pk for p in products)
+
+    def queue_orders(self, orders):
+        # Relations joined or prefetched by the queryset optimizer feed the next level directly
+        self.queue_customers([o.customer for o in orders if Order.customer.is_cached(o)])
+        self.queue_products({
+            p.pk: p
+            for o in orders if 'products' in getattr(o, '_prefetched_objects_cache', {})
+            for p in o.products.all()
+        }.values())
+        self.customer.queue(o.customer_id for o in orders)
+        self.order_products.queue(o.pk for o in orders)
+        self.order_items.queue(o.pk for o in orders)
+
+    def queue(self, instances):
+        instances = [i for i in instances if i is not None]
+        if not instances:
+            return
+        model = type(instances[0])
+        if model is Order:
+            self.queue_orders(instances)
+        elif model is Customer:
+            self.queue_customers(instances)
+        elif model is Product:
+            self.queue_products(instances)
+
+    # Batch load functions
+    def _load_customers(self, ids):
+        customers = Customer.objects.in_bulk(ids)
+        self.queue_customers(list(customers.values()))
+        return customers
+
+    def _load_order_products(self, order_ids):
+        grouped = defaultdict(list)
+        for lines in self.order_items.load_many(order_ids):
+            for line in lines:
+                grouped[line.order_id].append(line.product)
+        return grouped
+
+    def _load_order_items(self, order_ids):
+        grouped = defaultdict(list)
+        items = OrderItem.objects.filter(order_id__in=order_ids).select_related('product').order_by('pk')
+        for item in items:
+            grouped[item.order_id].append(item)
+        self.queue_products({i.product_id: i.product for lines in grouped.values() for i in lines}.values())
+        return grouped
+
+    def _load_customer_orders(self, customer_ids):
+        grouped = defaultdict(list)
+        orders = list(Order.objects.filter(customer_id__in=customer_ids).order_by('pk'))
+        for order in orders:
+            grouped[order.customer_id].append(order)
+        self.queue_orders(orders)
+        return grouped
+
+    def _load_product_orders(self, product_ids):
+        grouped = defaultdict(list)
+        rows = OrderItem.objects.filter(product_id__in=product_ids).select_related('order').order_by('pk')
+        for row in rows:
+            grouped[row.product_id].append(row.order)
+        self.queue_orders({o.pk: o for items in grouped.values() for o in items}.values())
+        return grouped
+
+
+class AsyncBatchLoader:
+    """
+    Event-loop front for a BatchLoader. Cached keys resolve immediately; the
+    keys requested by sibling resolvers in the same loop iteration are loaded
+    together by the wrapped loader in the request's database thread.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._pending = {}
+
+    def queue(self, keys):
+        # Queued keys join the next batch of the wrapped loader
+        self.loader.queue(keys)
+
+    def load(self, key):
+        if self.loader.is_cached(key):
+            return self.loader.load(key)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(lambda: asyncio.ensure_future(self.dispatch()))
+            future = self._pending[key] = loop.create_future()
+        return future
+
+    async def dispatch(self):
+        pending, self._pending = self._pending, {}
+        try:
+            values = await sync_to_async(self.loader.load_many)(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                future.set_exception(e)
+        else:
+            for future, value in zip(pending.values(), values):
+                future.set_result(value)
+
+
+class AsyncCRMLoaders:
+    """
+    CRMLoaders for async execution: relation loads return awaitables, while
+    queueing and the batch functions are shared with the sync loaders.
+    """
+
+    def __init__(self):
+        loaders = CRMLoaders()
+        self.customer = AsyncBatchLoader(loaders.customer)
+        self.product = AsyncBatchLoader(loaders.product)
+        self.order_items = AsyncBatchLoader(loaders.order_items)
+        self.order_products = AsyncBatchLoader(loaders.order_products)
+        self.customer_orders = AsyncBatchLoader(loaders.customer_orders)
+        self.product_orders = AsyncBatchLoader(loaders.product_orders)
+        self.queue = loaders.queue
+        self.queue_customers = loaders.queue_customers
+        self.queue_products = loaders.queue_products
+        self.queue_orders = loaders.queue_orders
+
+
+def get_loaders(info):
+    """Return the loaders bound to the current request, creating them on first use."""
+    context = info.context
+    if context is None:
+        return CRMLoaders()
+    loaders = getattr(context, '_crm_loaders', None)
+    if loaders is None:
+        loaders = CRMLoaders()
+        setattr(context, '_crm_loaders', loaders)
+    return loaders
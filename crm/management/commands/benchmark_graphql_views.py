@@ -0,0 +1,140 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+
+from crm.models import Order
+
+DEFAULT_QUERY = """
+{
+  ordersConnection(first: 20) {
+    edges { node { id totalAmount customer { name email } products { edges { node { name price } } } } }
+  }
+}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test /graphql (sync view) against /graphql/async (async view) in-process "
+        "with the same number of workers: W threads for the sync view, W event loops "
+        "for the async one, both driven by the same number of concurrent clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--clients', type=int, default=32,
+                            help='Concurrent in-flight requests across all workers.')
+        parser.add_argument('--db-latency-ms', type=float, default=5.0,
+                            help='Simulated network round trip added to every SQL statement.')
+        parser.add_argument('--query', default=DEFAULT_QUERY)
+        parser.add_argument('--sync-path', default='/graphql')
+        parser.add_argument('--async-path', default='/graphql/async')
+
+    def handle(self, *args, **options):
+        if not Order.objects.exists():
+            self.stderr.write("No orders to query; seed the database first.")
+            return
+        body = json.dumps({'query': options['query']})
+        latency = options['db_latency_ms'] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            # Fires again when a closed wrapper reconnects
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        if latency:
+            connection_created.connect(add_delay)
+        try:
+            self.stdout.write(
+                f"{options['requests']} requests, {options['workers']} workers, {options['clients']} clients, "
+                f"{options['db_latency_ms']:g} ms per query"
+            )
+            self.report('sync', self.run_sync(options['sync_path'], body, options))
+            self.report('async', self.run_async(options['async_path'], body, options))
+        finally:
+            connection_created.disconnect(add_delay)
+
+    def report(self, label, result):
+        timings, errors, elapsed = result
+        timings.sort()
+        q = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        self.stdout.write(
+            f"{label:<6} {len(timings) / elapsed:8.1f} req/s   p50 {q[49] * 1000:8.1f} ms"
+            f"   p95 {q[94] * 1000:8.1f} ms   p99 {q[98] * 1000:8.1f} ms   errors {errors}"
+        )
+
+    @staticmethod
+    def run_sync(path, body, options):
+        """One request at a time per worker thread; clients beyond that wait in the queue."""
+        client_slots = threading.Semaphore(options['clients'])
+        local = threading.local()
+
+        def request(queued_at):
+            try:
+                client = getattr(local, 'client', None) or Client()
+                local.client = client
+                response = client.post(path, body, content_type='application/json')
+                return time.perf_counter() - queued_at, response.status_code != 200
+            finally:
+                client_slots.release()
+                connections.close_all()  # CONN_MAX_AGE = 0, as in the async run
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = []
+            for _ in range(options['requests']):
+                client_slots.acquire()
+                futures.append(pool.submit(request, time.perf_counter()))
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        return [t for t, _ in results], sum(e for _, e in results), elapsed
+
+    @staticmethod
+    def run_async(path, body, options):
+        """Each worker is an event loop serving its share of the clients concurrently."""
+        workers = options['workers']
+        per_worker = [options['requests'] // workers + (i < options['requests'] % workers) for i in range(workers)]
+        clients = max(options['clients'] // workers, 1)
+        results = []
+
+        async def serve(n_requests):
+            client = AsyncClient()
+            slots = asyncio.Semaphore(clients)
+
+            async def request():
+                async with slots:
+                    queued_at = time.perf_counter()
+                    # What the ASGI handler does per request: a DB thread of its own,
+                    # and its connection closed at the end as with CONN_MAX_AGE = 0
+                    async with ThreadSensitiveContext():
+                        response = await client.post(path, body, content_type='application/json')
+                        await sync_to_async(connections.close_all)()
+                return time.perf_counter() - queued_at, response.status_code != 200
+
+            return await asyncio.gather(*(request() for _ in range(n_requests)))
+
+        def worker(n_requests):
+            results.extend(asyncio.run(serve(n_requests)))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in per_worker]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        return [t for t, _ in results], sum(e for _, e in results), elapsed
@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crm.filters import has_order_item, order_ids_with_item
+from crm.models import Customer, Product, Order, OrderItem
+
+STRATEGIES = {
+    'join+distinct': {
+        'product_name': lambda qs, v: qs.filter(products__name__icontains=v).distinct(),
+        'product_id': lambda qs, v: qs.filter(products__id=v).distinct(),
+    },
+    'in': {
+        'product_name': lambda qs, v: qs.filter(pk__in=order_ids_with_item(product__name__icontains=v)),
+        'product_id': lambda qs, v: qs.filter(pk__in=order_ids_with_item(product_id=v)),
+    },
+    'exists': {
+        'product_name': lambda qs, v: qs.filter(has_order_item(product__name__icontains=v)),
+        'product_id': lambda qs, v: qs.filter(has_order_item(product_id=v)),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product-filtered order listings (count + first page ordered by order_date) "
+        "with the old JOIN + DISTINCT filters against IN (...) and EXISTS semi-joins."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=0,
+                            help='Seed this many synthetic orders for the run and roll them back afterwards.')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['orders']:
+                self.seed(options['orders'])
+            product = Product.objects.order_by('pk').first()
+            if product is None:
+                self.stderr.write("No products to filter on; pass --orders N to seed a dataset.")
+                return
+            cases = [
+                ('product_name', product.name[:3]),
+                ('product_name', product.name),
+                ('product_id', product.pk),
+            ]
+            self.stdout.write(f"{Order.objects.count()} orders, {OrderItem.objects.count()} items")
+            for filter_name, value in cases:
+                for strategy, filters in STRATEGIES.items():
+                    timings = [self.run_once(filters[filter_name], value, options['page_size'])
+                               for _ in range(options['runs'])]
+                    self.stdout.write(
+                        f"{filter_name}={value!r:<18} {strategy:<14} median {statistics.median(timings) * 1000:8.1f} ms"
+                        f"   min {min(timings) * 1000:8.1f} ms"
+                    )
+            if options['orders']:
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def run_once(apply_filter, value, page_size):
+        start = time.perf_counter()
+        qs = apply_filter(Order.objects.all(), value)
+        qs.count()
+        list(qs.order_by('-order_date', '-id')[:page_size])
+        return time.perf_counter() - start
+
+    def seed(self, n_orders):
+        rng = random.Random(0)
+        n_customers = max(n_orders // 10, 1)
+        n_products = max(n_orders // 100, 10)
+        Customer.objects.bulk_create(
+            [Customer(name=f"Bench {i}", email=f"bench{i}@example.com") for i in range(n_customers)],
+            batch_size=1000,
+        )
+        Product.objects.bulk_create(
+            [Product(name=f"Bench product {i}", price=Decimal(rng.randint(100, 10000)) / 100, stock=100)
+             for i in range(n_products)],
+            batch_size=1000,
+        )
+        customer_ids = list(Customer.objects.values_list('pk', flat=True))
+        products = list(Product.objects.values_list('pk', 'price'))
+        for start in range(0, n_orders, 1000):
+            orders = Order.objects.bulk_create(
+                [Order(customer_id=rng.choice(customer_ids)) for _ in range(min(1000, n_orders - start))]
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order.pk, product_id=pk, quantity=rng.randint(1, 3), unit_price=price)
+                for order in orders
+                for pk, price in rng.sample(products, rng.randint(1, 4))
+            ])
@@ -0,0 +1,157 @@
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from crm import response_cache
+from crm.models import Customer, Product, Order, OrderItem
+
+# customers per preset; products and orders scale with it
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+               'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Yara']
+LAST_NAMES = ['Smith', 'Johnson', 'Okafor', 'Garcia', 'Nguyen', 'Müller', 'Rossi', 'Kowalski', 'Tanaka',
+              'Mensah', 'Silva', 'Dubois', 'Haddad', 'Kim', 'Novak', 'Ali', 'Ivanova', 'Brown', 'Lopez', 'Chen']
+PRODUCT_KINDS = ['Laptop', 'Phone', 'Monitor', 'Keyboard', 'Mouse', 'Headset', 'Tablet', 'Camera',
+                 'Printer', 'Router', 'Speaker', 'Charger', 'Cable', 'Dock', 'Webcam', 'Drive']
+PRODUCT_GRADES = ['Basic', 'Pro', 'Max', 'Mini', 'Plus', 'Air', 'Ultra', 'Lite']
+# Share of orders with 1..5 line items
+ITEMS_PER_ORDER_WEIGHTS = [35, 30, 18, 11, 6]
+END_DATE = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create() keep the generated dates instead of auto_now_add's now()."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic CRM dataset with bulk_create: customers, products "
+        "with skewed popularity, and orders with 1-5 line items each spread over --days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES),
+                            help='Preset: N customers, N/10 products and 2N orders.')
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--products', type=int)
+        parser.add_argument('--orders', type=int)
+        parser.add_argument('--days', type=int, default=365, help='Spread creation dates over this many days.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--flush', action='store_true', help='Delete all CRM rows first.')
+
+    def handle(self, *args, **options):
+        n_customers = SCALES[options['scale']] if options['scale'] else options['customers']
+        n_products = options['products'] or max(n_customers // 10, 50)
+        n_orders = options['orders'] if options['orders'] is not None else n_customers * 2
+        if n_customers <= 0 or n_products <= 0:
+            raise CommandError("Need at least one customer and one product.")
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.start = END_DATE - timedelta(days=options['days'])
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        if options['flush']:
+            with transaction.atomic():
+                OrderItem.objects.all().delete()
+                Order.objects.all().delete()
+                Customer.objects.all().delete()
+                Product.objects.all().delete()
+
+        with explicit_timestamps(Customer._meta.get_field('created_at'), Order._meta.get_field('order_date')):
+            customer_ids = self.create_customers(n_customers)
+            products = self.create_products(n_products)
+            n_items = self.create_orders(n_orders, customer_ids, products)
+        response_cache.invalidate(Customer, Product, Order, OrderItem)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {n_customers} customers, {n_products} products, {n_orders} orders, {n_items} order items"
+        ))
+
+    def timestamp(self, position):
+        """Dates grow with ``position`` (0..1) plus jitter, like rows inserted over time."""
+        offset = min(max(position + self.rng.uniform(-0.01, 0.01), 0.0), 1.0)
+        return self.start + timedelta(seconds=offset * self.span)
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_customers(self, total):
+        ids = []
+        for batch in self.batches(total):
+            customers = []
+            for i in batch:
+                phone = None
+                kind = self.rng.random()
+                if kind < 0.45:
+                    phone = f"+{self.rng.randint(1, 99)}{self.rng.randint(10 ** 8, 10 ** 9 - 1)}"
+                elif kind < 0.8:
+                    phone = f"{self.rng.randint(200, 999)}-{self.rng.randint(200, 999)}-{self.rng.randint(0, 9999):04d}"
+                customers.append(Customer(
+                    name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                    email=f"customer{i}.{self.rng.randint(0, 10 ** 6)}@example.com",
+                    phone=phone,
+                    created_at=self.timestamp(i / total),
+                ))
+            with transaction.atomic():
+                ids.extend(c.pk for c in Customer.objects.bulk_create(customers))
+        return ids
+
+    def create_products(self, total):
+        products = []
+        for batch in self.batches(total):
+            rows = [
+                Product(
+                    name=f"{self.rng.choice(PRODUCT_KINDS)} {self.rng.choice(PRODUCT_GRADES)} {i}",
+                    price=Decimal(self.rng.randint(199, 250_000)) / 100,
+                    # about 5% of products low on stock
+                    stock=self.rng.randint(0, 9) if self.rng.random() < 0.05 else self.rng.randint(10, 500),
+                )
+                for i in batch
+            ]
+            with transaction.atomic():
+                products.extend((p.pk, p.price) for p in Product.objects.bulk_create(rows))
+        return products
+
+    def create_orders(self, total, customer_ids, products):
+        # Zipf-like popularity: a few products appear in most orders
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(products))))
+        fan_out = list(range(1, len(ITEMS_PER_ORDER_WEIGHTS) + 1))
+        n_items = 0
+        for batch in self.batches(total):
+            lines = []
+            orders = []
+            for i in batch:
+                count = min(self.rng.choices(fan_out, ITEMS_PER_ORDER_WEIGHTS)[0], len(products))
+                picked = set()
+                while len(picked) < count:
+                    picked.add(self.rng.choices(range(len(products)), cum_weights=cum_weights)[0])
+                order_lines = [(products[p], self.rng.choices((1, 2, 3, 4), (70, 20, 7, 3))[0]) for p in sorted(picked)]
+                lines.append(order_lines)
+                orders.append(Order(
+                    customer_id=self.rng.choice(customer_ids),
+                    total_amount=sum(price * quantity for (_, price), quantity in order_lines),
+                    order_date=self.timestamp(i / total),
+                ))
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                items = OrderItem.objects.bulk_create([
+                    OrderItem(order_id=order.pk, product_id=pk, quantity=quantity, unit_price=price)
+                    for order, order_lines in zip(orders, lines)
+                    for (pk, price), quantity in order_lines
+                ], batch_size=self.batch_size)
+            n_items += len(items)
+        return n_items
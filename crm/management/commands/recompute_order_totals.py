@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from crm.models import Order
+
+
+class Command(BaseCommand):
+    help = "Recompute Order.total_amount from the order's products in batched set-based UPDATEs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of order ids covered by each UPDATE (default: 5000).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Order.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write("No orders to update.")
+            return
+
+        updated = 0
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Order.objects.filter(pk__gte=start, pk__lt=start + batch_size).update_totals()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed totals for {updated} orders."))
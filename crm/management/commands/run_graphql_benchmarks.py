@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the fixed GraphQL benchmark suite (connection pages, filters, aggregates and every "
+        "mutation, rolled back) against crm.schema.schema and record latency percentiles and "
+        "SQL query counts, optionally comparing with an earlier JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Measured runs per operation.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured runs per operation.')
+        parser.add_argument('--only', nargs='+', metavar='OPERATION', help='Run only these operations.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+        parser.add_argument('--compare', metavar='REPORT', help='Earlier JSON report to compare against.')
+        parser.add_argument('--list', action='store_true', help='List the operation names and exit.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for operation in benchmarks.OPERATIONS:
+                self.stdout.write(operation.name)
+            return
+        if options['runs'] <= 0:
+            raise CommandError("--runs must be positive.")
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+
+        report = benchmarks.run(runs=options['runs'], warmup=options['warmup'], only=options['only'])
+        if report is None:
+            self.stderr.write("Nothing to benchmark; run generate_crm_data first.")
+            return
+
+        dataset = report['dataset']
+        self.stdout.write(
+            f"{report['database']} @ {report['revision'] or 'unknown revision'}: {dataset['customers']} customers, "
+            f"{dataset['products']} products, {dataset['orders']} orders, {report['runs']} runs"
+        )
+        self.stdout.write(f"{'operation':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, result in report['operations'].items():
+            self.stdout.write(
+                f"{name:<32} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+                f"{result['queries']:8d}"
+            )
+            for error in result['errors']:
+                self.stdout.write(self.style.ERROR(f"  {error}"))
+
+        if previous is not None:
+            self.write_comparison(previous, report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def write_comparison(self, previous, report):
+        self.stdout.write(f"\nCompared with {previous.get('revision') or 'previous run'}:")
+        self.stdout.write(f"{'operation':<32} {'old p50':>9} {'new p50':>9} {'change':>8} {'queries':>10}")
+        for name, old, new, change, old_queries, new_queries in benchmarks.compare(previous, report):
+            if old is None:
+                self.stdout.write(f"{name:<32} {'-':>9} {new:9.2f} {'new':>8} {new_queries:>10}")
+                continue
+            change_text = f"{change:+7.1f}%" if change is not None else f"{'-':>8}"
+            queries = f"{old_queries}->{new_queries}" if old_queries != new_queries else str(new_queries)
+            self.stdout.write(f"{name:<32} {old:9.2f} {new:9.2f} {change_text:>8} {queries:>10}")
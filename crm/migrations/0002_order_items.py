@@ -0,0 +1,85 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_order_products_to_items(apps, schema_editor):
+    """Backfill one OrderItem (quantity 1, current product price) per existing order/product link."""
+    Order = apps.get_model('crm', 'Order')
+    OrderItem = apps.get_model('crm', 'OrderItem')
+    Through = Order.products.through
+    last_pk = 0
+    while True:
+        rows = list(
+            Through.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'order_id', 'product_id', 'product__price')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        OrderItem.objects.bulk_create([
+            OrderItem(order_id=order_id, product_id=product_id, quantity=1, unit_price=price)
+            for _, order_id, product_id, price in rows
+        ])
+        last_pk = rows[-1][0]
+
+
+def copy_items_to_order_products(apps, schema_editor):
+    Order = apps.get_model('crm', 'Order')
+    OrderItem = apps.get_model('crm', 'OrderItem')
+    Through = Order.products.through
+    last_pk = 0
+    while True:
+        rows = list(
+            OrderItem.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'order_id', 'product_id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        Through.objects.bulk_create([
+            Through(order_id=order_id, product_id=product_id) for _, order_id, product_id in rows
+        ])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='crm.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='crm.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('order', 'product'), name='crm_orderitem_order_product_uniq')],
+                'indexes': [models.Index(fields=['product', 'order'], name='crm_orderitem_product_order')],
+            },
+        ),
+        migrations.RunPython(copy_order_products_to_items, copy_items_to_order_products),
+        # Django cannot add `through=` to an existing M2M, so the auto-created
+        # table is dropped and the field re-added on top of OrderItem.
+        migrations.RemoveField(
+            model_name='order',
+            name='products',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='products',
+            field=models.ManyToManyField(related_name='orders', through='crm.OrderItem', to='crm.product'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:33
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('stream', models.CharField(max_length=50)),
+                ('event', models.CharField(max_length=50)),
+                ('level', models.CharField(default='info', max_length=10)),
+                ('message', models.TextField(blank=True)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stream', 'created_at'], name='crm_joblog_stream_created')],
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator
 from decimal import Decimal
 
@@ -8,6 +11,14 @@ class Customer(models.Model):
     phone = models.CharField(max_length=30, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # created_at range filters and the (created_at, id) keyset ordering
+            models.Index(fields=['created_at', 'id'], name='crm_customer_created_id'),
+            # phone_pattern (startswith); the opclass only applies on PostgreSQL
+            models.Index(fields=['phone'], name='crm_customer_phone', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return f"{self.name} <{self.email}>"
 
@@ -16,26 +27,140 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['price'], name='crm_product_price'),
+            models.Index(fields=['stock'], name='crm_product_stock'),
+        ]
+
     def __str__(self):
         return f"{self.name} (${self.price})"
 
+class OrderQuerySet(models.QuerySet):
+    def total_expression(self):
+        """Correlated SUM of the order's line totals, for use in update()/annotate()."""
+        line_totals = (
+            OrderItem.objects.filter(order_id=OuterRef('pk'))
+            .order_by()
+            .values('order_id')
+            .annotate(total=Sum(F('quantity') * F('unit_price')))
+            .values('total')
+        )
+        return Coalesce(
+            Subquery(line_totals),
+            Value(Decimal('0.00')),
+            output_field=self.model._meta.get_field('total_amount'),
+        )
+
+    def update_totals(self):
+        """Recompute total_amount for every order in this queryset with one UPDATE."""
+        from .response_cache import invalidate
+
+        updated = self.update(total_amount=self.total_expression())
+        invalidate(self.model)
+        return updated
+
+
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
-    products = models.ManyToManyField(Product, related_name='orders')
+    products = models.ManyToManyField(Product, related_name='orders', through='OrderItem')
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     order_date = models.DateTimeField(auto_now_add=True)
 
-    def calculate_total(self):
-        total = Decimal('0.00')
-        for p in self.products.all():
-            total += p.price
-        return total
+    objects = OrderQuerySet.as_manager()
 
-    def save(self, *args, **kwargs):
-        # If instance already exists and products set later, total will be recalculated in mutation
-        if self.pk and self.products.exists():
-            self.total_amount = self.calculate_total()
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            # order_date range filters and the (order_date, id) keyset ordering
+            models.Index(fields=['order_date', 'id'], name='crm_order_date_id'),
+            models.Index(fields=['total_amount'], name='crm_order_total_amount'),
+            models.Index(fields=['customer', 'order_date'], name='crm_order_customer_date'),
+        ]
+
+    # total_amount is kept in sync by the handlers in crm/signals.py,
+    # so saving an order never reads the products table.
+    def calculate_total(self):
+        total = self.items.aggregate(total=Sum(F('quantity') * F('unit_price')))['total']
+        return total or Decimal('0.00')
 
     def __str__(self):
         return f"Order {self.pk} by {self.customer.name} - {self.total_amount}"
+
+
+class OrderItem(models.Model):
+    """A product line of an order, with the price charged when the order was placed."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='crm_orderitem_order_product_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'order'], name='crm_orderitem_product_order'),
+        ]
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} @ {self.unit_price}"
+
+
+class DailySales(models.Model):
+    """
+    One row per day with orders, rolled up from Order by crm.rollups so that
+    time-series reports read a row per day instead of scanning every order.
+    """
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+    # Distinct per day; summed over longer periods it counts customer-days
+    customer_count = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'daily sales'
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders, {self.revenue}"
+
+
+class DailyProductSales(models.Model):
+    """Units and revenue of one product on one day, rolled up from OrderItem."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='crm_dailyproductsales_date_product_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='crm_dailyproductsales_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.units} x {self.product_id}"
+
+
+class JobLog(models.Model):
+    """A record written by a cron job or Celery task through crm.sinks.DatabaseSink."""
+    created_at = models.DateTimeField()
+    stream = models.CharField(max_length=50)
+    event = models.CharField(max_length=50)
+    level = models.CharField(max_length=10, default='info')
+    message = models.TextField(blank=True)
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stream', 'created_at'], name='crm_joblog_stream_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} [{self.stream}] {self.message}"
@@ -0,0 +1,95 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def _collect(info, selections, selected):
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            selected.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments[selection.name.value]
+            _collect(info, fragment.selection_set.selections, selected)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect(info, selection.selection_set.selections, selected)
+
+
+def selected_fields(info, field_nodes):
+    """Map each sub-field name requested under ``field_nodes`` to its FieldNodes (fragments inlined)."""
+    selected = {}
+    for field_node in field_nodes:
+        if field_node.selection_set:
+            _collect(info, field_node.selection_set.selections, selected)
+    return selected
+
+
+def connection_node_fields(info, field_nodes):
+    """Sub-fields requested on ``edges { node { ... } }`` of a connection."""
+    edges = selected_fields(info, field_nodes).get('edges', [])
+    return selected_fields(info, selected_fields(info, edges).get('node', []))
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(to_snake_case(name))
+    except FieldDoesNotExist:
+        return None
+
+
+def _column_names(model, selected):
+    # FK ids are always kept: the request loaders key on them
+    names = {model._meta.pk.name}
+    names.update(f.name for f in model._meta.concrete_fields if f.many_to_one)
+    for name in selected:
+        field = _model_field(model, name)
+        if field is None:
+            continue
+        if field.concrete and not field.many_to_many:
+            names.add(field.name)
+    return names
+
+
+def build_plan(model, info, selected):
+    """
+    Translate a selection into ``(only, select_related, prefetch)`` for ``model``.
+    Forward FKs are joined, forward M2Ms are prefetched with their own ``only()``;
+    reverse relations are left to the request loaders.
+    """
+    only = _column_names(model, selected)
+    select_related = []
+    prefetch = []
+    for name, nodes in selected.items():
+        field = _model_field(model, name)
+        if field is None or not field.is_relation or field.auto_created:
+            continue
+        related = field.related_model
+        if field.many_to_one:
+            select_related.append(field.name)
+            sub = selected_fields(info, nodes)
+            only.update(f'{field.name}__{col}' for col in _column_names(related, sub))
+        elif field.many_to_many:
+            sub = connection_node_fields(info, nodes)
+            queryset = related._default_manager.only(*_column_names(related, sub))
+            prefetch.append(Prefetch(field.name, queryset=queryset))
+    return only, select_related, prefetch
+
+
+def optimize_queryset(queryset, info, connection=True):
+    """
+    Narrow ``queryset`` to what the current GraphQL field actually selects.
+    ``connection`` tells whether the field is a Relay connection or a plain list.
+    """
+    if connection:
+        selected = connection_node_fields(info, info.field_nodes)
+    else:
+        selected = selected_fields(info, info.field_nodes)
+    if not selected:
+        return queryset
+    only, select_related, prefetch = build_plan(queryset.model, info, selected)
+    queryset = queryset.only(*only)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
@@ -0,0 +1,125 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.db.models import F, Q
+from graphene.relay import PageInfo
+from graphene.utils.str_converters import to_snake_case
+from graphql import GraphQLError
+
+CURSOR_PREFIX = 'keyset:'
+
+
+def parse_ordering(order_by, allowed):
+    """
+    ``[(field, descending), ...]`` for an ``orderBy`` value such as
+    ``"-totalAmount,orderDate"``, ending with ``id`` so that the order is total.
+    """
+    ordering = []
+    for part in (order_by or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name = to_snake_case(part.lstrip('-'))
+        if name not in allowed:
+            raise GraphQLError(f"Cannot order by {part!r}; use one of: {', '.join(allowed)}.")
+        ordering.append((name, part.startswith('-')))
+    if 'id' not in (name for name, _ in ordering):
+        ordering.append(('id', False))
+    return ordering
+
+
+def order_by_expressions(ordering, reverse=False):
+    return [f'-{name}' if descending != reverse else name for name, descending in ordering]
+
+
+def _cursor_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def encode_cursor(ordering, values):
+    """Encode the ordering key of a row (e.g. ``[order_date, id]``) as an opaque cursor."""
+    payload = json.dumps([order_by_expressions(ordering), [_cursor_value(v) for v in values]])
+    return base64.b64encode((CURSOR_PREFIX + payload).encode()).decode()
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        raw = base64.b64decode(cursor.encode()).decode()
+        if not raw.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        key, values = json.loads(raw[len(CURSOR_PREFIX):])
+        # A cursor only continues the ordering it was issued for
+        if key != order_by_expressions(ordering):
+            raise ValueError(cursor)
+        return [model._meta.get_field(name).to_python(v) for (name, _), v in zip(ordering, values, strict=True)]
+    except Exception:
+        raise GraphQLError(f"Invalid keyset cursor: {cursor}")
+
+
+def _seek(ordering, values, after):
+    """
+    Row-value comparison past ``values`` in ``ordering``, spelled out as
+    ``k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...`` (``<`` on descending columns,
+    and both flipped before a cursor) so every backend can use the index.
+    """
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(ordering, values):
+        op = 'lt' if descending == after else 'gt'
+        condition |= Q(**equal, **{f'{name}__{op}': value})
+        equal[name] = value
+    return condition
+
+
+def keyset_connection(connection_type, queryset, ordering, args, max_limit=None):
+    """
+    Build one page of ``connection_type`` by seeking past the cursor in
+    ``ordering`` (``[(field, descending), ...]``, from parse_ordering()) instead
+    of OFFSET, and without counting the full result.
+    """
+    first, last = args.get('first'), args.get('last')
+    after, before = args.get('after'), args.get('before')
+    if first is not None and last is not None:
+        raise GraphQLError("Keyset pagination accepts either `first` or `last`, not both.")
+    if (first is not None and first < 0) or (last is not None and last < 0):
+        raise GraphQLError("`first` and `last` must be non-negative.")
+    if max_limit is not None:
+        if (first or 0) > max_limit or (last or 0) > max_limit:
+            raise GraphQLError(f"Requesting more than {max_limit} records is not allowed.")
+    backward = last is not None
+    limit = (last if backward else first)
+    if limit is None:
+        limit = max_limit
+    model = queryset.model
+
+    # Keep the key columns loaded even if the optimizer narrowed the row with only()
+    queryset = queryset.annotate(**{f'keyset_{name}': F(name) for name, _ in ordering})
+    if after:
+        queryset = queryset.filter(_seek(ordering, decode_cursor(after, model, ordering), after=True))
+    if before:
+        queryset = queryset.filter(_seek(ordering, decode_cursor(before, model, ordering), after=False))
+    queryset = queryset.order_by(*order_by_expressions(ordering, reverse=backward))
+
+    rows = list(queryset[:limit + 1]) if limit is not None else list(queryset)
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    if backward:
+        rows.reverse()
+
+    edges = [
+        connection_type.Edge(
+            node=row,
+            cursor=encode_cursor(ordering, [getattr(row, f'keyset_{name}') for name, _ in ordering]),
+        )
+        for row in rows
+    ]
+    page_info = PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_previous_page=has_more if backward else bool(after),
+        has_next_page=bool(before) if backward else has_more,
+    )
+    return connection_type(edges=edges, page_info=page_info)
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from graphql import GraphQLError
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# A parsed DocumentNode is far larger than its source text; this factor turns the
+# query length into a conservative estimate of the cached AST's footprint.
+AST_BYTES_PER_CHAR = 40
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Thread-safe LRU of parsed and validated DocumentNodes keyed by query hash,
+    bounded both by entry count and by an estimate of the memory it holds.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, document, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (document, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _cache_settings():
+    return getattr(settings, 'GRAPHQL_DOCUMENT_CACHE', {})
+
+
+document_cache = DocumentCache(
+    max_entries=_cache_settings().get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+    max_bytes=_cache_settings().get('MAX_BYTES', DEFAULT_MAX_BYTES),
+)
+
+
+def get_cached_document(schema, query, parse_and_validate):
+    """
+    Return ``(document, errors)`` for ``query``, parsing and validating it only on
+    a cache miss. Documents that fail to parse or validate are not cached.
+    """
+    key = (id(schema), query_hash(query))
+    document = document_cache.get(key)
+    if document is not None:
+        return document, None
+    document, errors = parse_and_validate(query)
+    if not errors:
+        document_cache.set(key, document, len(query) * AST_BYTES_PER_CHAR)
+    return document, errors
+
+
+# Persisted queries (Apollo "automatic persisted queries" protocol)
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super().__init__(message, extensions={'code': code})
+
+
+PERSISTED_QUERY_PREFIX = 'crm:persisted-query:'
+
+
+def _store():
+    return caches[_cache_settings().get('PERSISTED_QUERY_CACHE', 'default')]
+
+
+def persist_query(query):
+    """Store ``query`` under its sha256 hash and return the hash."""
+    sha = query_hash(query)
+    _store().set(PERSISTED_QUERY_PREFIX + sha, query, timeout=None)
+    return sha
+
+
+def _persisted_query_extension(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+    return (extensions or {}).get('persistedQuery')
+
+
+def _persisted_query_hash(request, data, query):
+    """The sha256 hash a request refers to, or None without the extension."""
+    extension = _persisted_query_extension(request, data)
+    if not extension:
+        return None
+    sha = extension.get('sha256Hash')
+    if extension.get('version', 1) != 1 or not sha:
+        raise PersistedQueryError("Unsupported persisted query version", 'PERSISTED_QUERY_NOT_SUPPORTED')
+    if query and query_hash(query) != sha:
+        raise PersistedQueryError("provided sha does not match query", 'INVALID_PERSISTED_QUERY')
+    return sha
+
+
+def _stored_query(stored):
+    if stored is None:
+        raise PersistedQueryError("PersistedQueryNotFound", 'PERSISTED_QUERY_NOT_FOUND')
+    return stored
+
+
+def resolve_persisted_query(request, data, query):
+    """
+    Apply the persisted-query extension of a request. A hash without a query is
+    looked up in the store; a hash with a query is checked and then stored.
+    Requests without the extension return ``query`` unchanged.
+    """
+    sha = _persisted_query_hash(request, data, query)
+    if sha is None:
+        return query
+    if query:
+        persist_query(query)
+        return query
+    return _stored_query(_store().get(PERSISTED_QUERY_PREFIX + sha))
+
+
+async def aresolve_persisted_query(request, data, query):
+    """resolve_persisted_query() through the async cache API, for the ASGI view."""
+    sha = _persisted_query_hash(request, data, query)
+    if sha is None:
+        return query
+    if query:
+        await _store().aset(PERSISTED_QUERY_PREFIX + sha, query, timeout=None)
+        return query
+    return _stored_query(await _store().aget(PERSISTED_QUERY_PREFIX + sha))
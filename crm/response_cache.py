@@ -0,0 +1,244 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from graphene.utils.str_converters import to_snake_case
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLInterfaceType,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationType,
+    get_named_type,
+    get_operation_ast,
+    print_ast,
+)
+
+from .persisted import DocumentCache, query_hash
+
+VERSION_PREFIX = 'crm:response-cache:version:'
+ENTRY_PREFIX = 'crm:response-cache:entry:'
+
+# Extra model dependencies of types that are not DjangoObjectTypes (e.g. aggregates),
+# filled in by the schema with cache_depends_on().
+TYPE_DEPENDENCIES = {}
+# FilterSets behind fields that take filter arguments without being filter
+# connections, per (graphene type, field name), and the models read by method
+# filters; filled in by the schema with cache_filters() / filter_depends_on().
+FIELD_FILTERSETS = {}
+FILTER_DEPENDENCIES = {}
+
+# Normalized key and model dependencies per query text, so they are derived once
+_analysis_cache = DocumentCache(max_entries=1000)
+
+
+def _settings():
+    return getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {})
+
+
+def is_enabled():
+    return bool(_settings().get('ENABLED', False))
+
+
+def _cache():
+    return caches[_settings().get('CACHE', 'default')]
+
+
+def _label(model_or_label):
+    if isinstance(model_or_label, str):
+        return model_or_label.lower()
+    return model_or_label._meta.label_lower
+
+
+def cache_depends_on(graphene_type, *models):
+    """Declare that results containing ``graphene_type`` are derived from ``models``."""
+    TYPE_DEPENDENCIES[graphene_type] = {_label(m) for m in models}
+
+
+def cache_filters(graphene_type, field_name, filterset_class):
+    """Declare that the arguments of ``graphene_type.field_name`` are ``filterset_class`` filters."""
+    FIELD_FILTERSETS[(graphene_type, field_name)] = filterset_class
+
+
+def filter_depends_on(filterset_class, **models):
+    """Declare the models read by method filters, e.g. ``product_name=[OrderItem, Product]``."""
+    FILTER_DEPENDENCIES.setdefault(filterset_class, {}).update(
+        {name: {_label(m) for m in related} for name, related in models.items()}
+    )
+
+
+def _path_labels(model, field_name):
+    # customer__name -> the models joined on the way: {'crm.customer'}
+    labels = set()
+    for part in field_name.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        model = field.related_model
+        labels.add(_label(model))
+    return labels
+
+
+def _filterset(parent_type, field_name):
+    graphene_type = getattr(parent_type, 'graphene_type', None)
+    if graphene_type is None:
+        return None
+    name = to_snake_case(field_name)
+    for klass in getattr(graphene_type, '__mro__', ()):
+        if (klass, name) in FIELD_FILTERSETS:
+            return FIELD_FILTERSETS[(klass, name)]
+    field = getattr(graphene_type._meta, 'fields', {}).get(name)
+    return getattr(field, 'filterset_class', None)
+
+
+def _argument_dependencies(parent_type, selection):
+    """Models read by the filter arguments given to ``selection``, beyond its output type."""
+    if not selection.arguments:
+        return set()
+    filterset_class = _filterset(parent_type, selection.name.value)
+    if filterset_class is None:
+        return set()
+    declared = FILTER_DEPENDENCIES.get(filterset_class, {})
+    labels = set()
+    for argument in selection.arguments:
+        name = to_snake_case(argument.name.value)
+        labels.update(declared.get(name, ()))
+        f = filterset_class.base_filters.get(name)
+        if f is not None and f.method is None:
+            labels.update(_path_labels(filterset_class._meta.model, f.field_name))
+    return labels
+
+
+def _type_dependencies(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    labels = set(TYPE_DEPENDENCIES.get(graphene_type, ()))
+    model = getattr(getattr(graphene_type, '_meta', None), 'model', None)
+    if model is not None:
+        labels.add(_label(model))
+    return labels
+
+
+def model_dependencies(schema, document, operation):
+    """
+    Labels of every model whose rows can appear in the result of ``operation``,
+    or that its filter arguments read (``customerName`` joins Customer).
+    """
+    fragments = {
+        d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)
+    }
+    labels = set()
+
+    def walk(parent_type, selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field = parent_type.fields.get(selection.name.value)
+                if field is None:
+                    continue
+                named = get_named_type(field.type)
+                labels.update(_type_dependencies(named))
+                labels.update(_argument_dependencies(parent_type, selection))
+                if selection.selection_set and isinstance(named, (GraphQLObjectType, GraphQLInterfaceType)):
+                    walk(named, selection.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                walk(schema.get_type(condition.name.value) if condition else parent_type, selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    walk(schema.get_type(fragment.type_condition.name.value), fragment.selection_set)
+
+    walk(schema.query_type, operation.selection_set)
+    return labels
+
+
+def _analyze(schema, query, document, operation_name):
+    key = (id(schema), query_hash(query), operation_name)
+    analysis = _analysis_cache.get(key)
+    if analysis is None:
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.QUERY:
+            analysis = (None, ())
+        else:
+            normalized = hashlib.sha256(print_ast(document).encode('utf-8')).hexdigest()
+            analysis = (normalized, tuple(sorted(model_dependencies(schema, document, operation))))
+        _analysis_cache.set(key, analysis, len(query))
+    return analysis
+
+
+def cache_key(schema, query, document, operation_name, variables):
+    """
+    Cache key for a query operation, or None for mutations/subscriptions. The key
+    embeds the current version of every model the result depends on, so bumping
+    a model's version makes exactly the entries that read it unreachable.
+    """
+    normalized, labels = _analyze(schema, query, document, operation_name)
+    if normalized is None:
+        return None
+    versions = _cache().get_many([VERSION_PREFIX + label for label in labels])
+    return _entry_key(normalized, operation_name, variables, labels, versions)
+
+
+async def acache_key(schema, query, document, operation_name, variables):
+    """cache_key() reading the model versions through the async cache API."""
+    normalized, labels = _analyze(schema, query, document, operation_name)
+    if normalized is None:
+        return None
+    versions = await _cache().aget_many([VERSION_PREFIX + label for label in labels])
+    return _entry_key(normalized, operation_name, variables, labels, versions)
+
+
+def _entry_key(normalized, operation_name, variables, labels, versions):
+    payload = json.dumps(
+        [normalized, operation_name, variables or {}, [versions.get(VERSION_PREFIX + l, 0) for l in labels]],
+        sort_keys=True,
+        default=str,
+    )
+    return ENTRY_PREFIX + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(key):
+    return _cache().get(key)
+
+
+async def alookup(key):
+    return await _cache().aget(key)
+
+
+def store(key, data):
+    _cache().set(key, data, timeout=_settings().get('TIMEOUT', 300))
+
+
+async def astore(key, data):
+    await _cache().aset(key, data, timeout=_settings().get('TIMEOUT', 300))
+
+
+def _bump(labels):
+    cache = _cache()
+    for label in labels:
+        key = VERSION_PREFIX + label
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+
+
+def invalidate(*models):
+    """
+    Make every cached response that depends on ``models`` stale. The versions are
+    bumped immediately and again on commit, so a reader racing the write cannot
+    re-cache pre-commit data under the new version.
+    """
+    if not is_enabled():
+        return
+    labels = {_label(m) for m in models}
+    _bump(labels)
+    transaction.on_commit(lambda: _bump(labels))
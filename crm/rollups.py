@@ -0,0 +1,125 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, Order, OrderItem
+from .response_cache import invalidate
+from .stats import TRUNC_FUNCTIONS, _money
+
+# Days before the watermark that every refresh rebuilds again, to pick up
+# orders committed late and line items added to recent orders.
+DEFAULT_LOOKBACK_DAYS = 1
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _settings():
+    return getattr(settings, 'CRM_SALES_ROLLUP', {})
+
+
+def watermark():
+    """The latest day in the rollup, or None before the first refresh."""
+    return DailySales.objects.aggregate(latest=Max('date'))['latest']
+
+
+def _start_of_day(day):
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def refresh_daily_sales(since=None):
+    """
+    Rebuild the DailySales / DailyProductSales rows from ``since`` (a date)
+    onwards and return the number of days written.
+
+    Without ``since`` the refresh starts LOOKBACK_DAYS before the watermark, so
+    each run reads only the orders placed since the previous one; before the
+    first refresh it rolls up every order. Days are replaced whole, from one
+    GROUP BY per table, inside a single transaction.
+    """
+    config = _settings()
+    batch_size = config.get('BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    if since is None:
+        latest = watermark()
+        if latest is not None:
+            since = latest - timedelta(days=config.get('LOOKBACK_DAYS', DEFAULT_LOOKBACK_DAYS))
+
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    days = DailySales.objects.all()
+    product_days = DailyProductSales.objects.all()
+    if since is not None:
+        start = _start_of_day(since)
+        orders = orders.filter(order_date__gte=start)
+        items = items.filter(order__order_date__gte=start)
+        days = days.filter(date__gte=since)
+        product_days = product_days.filter(date__gte=since)
+
+    daily = (
+        orders.order_by()
+        .annotate(day=TruncDate('order_date'))
+        .values('day')
+        .annotate(
+            order_count=Count('pk'),
+            revenue=Sum('total_amount'),
+            customer_count=Count('customer', distinct=True),
+        )
+    )
+    per_product = (
+        items.order_by()
+        .annotate(day=TruncDate('order__order_date'))
+        .values('day', 'product_id')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('unit_price')))
+    )
+
+    with transaction.atomic():
+        days.delete()
+        product_days.delete()
+        written = DailySales.objects.bulk_create([
+            DailySales(
+                date=row['day'],
+                order_count=row['order_count'],
+                revenue=_money(row['revenue'] or 0),
+                customer_count=row['customer_count'],
+            )
+            for row in daily
+        ], batch_size=batch_size)
+        DailyProductSales.objects.bulk_create((
+            DailyProductSales(
+                date=row['day'],
+                product_id=row['product_id'],
+                units=row['units'],
+                revenue=_money(row['revenue'] or 0),
+            )
+            for row in per_product.iterator(chunk_size=batch_size)
+        ), batch_size=batch_size)
+    invalidate(DailySales, DailyProductSales)
+    return len(written)
+
+
+def sales_timeseries(date_from, date_to, granularity='day', product_id=None):
+    """
+    Order count, revenue and customer-days per period between two dates
+    (inclusive), read from the rollup: one row per day at most. With
+    ``product_id`` the series covers that product's units and revenue.
+    """
+    if product_id is not None:
+        rows = DailyProductSales.objects.filter(product_id=product_id)
+        totals = {'units': Sum('units'), 'revenue': Sum('revenue')}
+    else:
+        rows = DailySales.objects.all()
+        totals = {
+            'order_count': Sum('order_count'),
+            'revenue': Sum('revenue'),
+            'customer_count': Sum('customer_count'),
+        }
+    rows = rows.filter(date__gte=date_from, date__lte=date_to).order_by()
+    if granularity == 'day':
+        rows = rows.annotate(period=F('date'))
+    else:
+        rows = rows.annotate(period=TRUNC_FUNCTIONS[granularity]('date'))
+    rows = rows.values('period').annotate(**totals).order_by('period')
+    return [dict(row, revenue=_money(row['revenue'] or 0)) for row in rows]
@@ -1,59 +1,340 @@
 # crm/schema.py
 
 import graphene
+from functools import partial
 from graphene import relay
 from graphene_django import DjangoObjectType
 from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.filter.utils import get_filtering_args_from_filterset
+from graphene_django.settings import graphene_settings
+from django.core.exceptions import ValidationError
+from graphql import GraphQLError
 from django.db import IntegrityError, transaction
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, OrderItem, DailySales, DailyProductSales
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .execution import async_aware
+from .inventory import LOW_STOCK_THRESHOLD, reserve_stock, restock_low_stock, stock_changed, take_stock
+from .loaders import get_loaders
+from .optimizer import optimize_queryset
+from .pagination import keyset_connection, order_by_expressions, parse_ordering
+from .rollups import sales_timeseries
+from . import response_cache, stats
 from decimal import Decimal
 import re
 
 PHONE_REGEX = re.compile(r'^(\+\d{1,3}\d{4,}|\d{3}-\d{3}-\d{4})$')
 
 
+# Relation resolvers backed by the per-request loaders in crm/loaders.py
+class CustomerRelations:
+    def resolve_orders(self, info, **kwargs):
+        return get_loaders(info).customer_orders.load(self.pk)
+
+
+class ProductRelations:
+    def resolve_orders(self, info, **kwargs):
+        return get_loaders(info).product_orders.load(self.pk)
+
+
+class OrderRelations:
+    def resolve_items(self, info):
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return list(self.items.all())
+        return get_loaders(info).order_items.load(self.pk)
+
+    def resolve_customer(self, info):
+        # Joined by the queryset optimizer when the connection selected it
+        if Order.customer.is_cached(self):
+            return self.customer
+        return get_loaders(info).customer.load(self.customer_id)
+
+    def resolve_products(self, info, **kwargs):
+        if 'products' in getattr(self, '_prefetched_objects_cache', {}):
+            return list(self.products.all())
+        return get_loaders(info).order_products.load(self.pk)
+
+
+class CRMConnectionField(DjangoFilterConnectionField):
+    """
+    Filter connection that narrows the filtered queryset to the selection set
+    before pagination and queues the nodes of each page on the request loaders.
+
+    With ``ordering_fields`` the field accepts ``orderBy`` over those columns.
+    With ``keyset_fields`` it also accepts ``keyset: true``, which pages by
+    seeking on those columns (ending with ``id``), or on the ``orderBy``
+    columns plus ``id``, and skips the COUNT(*).
+    """
+
+    def __init__(self, *args, keyset_fields=None, ordering_fields=None, **kwargs):
+        self.keyset_fields = keyset_fields
+        self.ordering_fields = ordering_fields
+        if keyset_fields:
+            kwargs.setdefault('keyset', graphene.Boolean(
+                description=f"Page by ({', '.join(keyset_fields)}) cursors, or by orderBy and id, "
+                            "without counting the result."
+            ))
+        super().__init__(*args, **kwargs)
+        if ordering_fields:
+            # DjangoFilterConnectionField swallows an order_by keyword, so the argument is added here
+            self._base_args['order_by'] = graphene.Argument(graphene.String, description=(
+                f"Comma-separated columns, '-' for descending: {', '.join(ordering_fields)}."
+            ))
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class, ordering_fields=()):
+        qs = super().resolve_queryset(
+            connection, iterable, info, args,
+            filtering_args=filtering_args, filterset_class=filterset_class,
+        )
+        if args.get('order_by'):
+            qs = qs.order_by(*order_by_expressions(parse_ordering(args['order_by'], ordering_fields)))
+        return optimize_queryset(qs, info)
+
+    def get_queryset_resolver(self):
+        return partial(super().get_queryset_resolver(), ordering_fields=self.ordering_fields or ())
+
+    @classmethod
+    def connection_resolver(
+        cls, resolver, connection, default_manager, queryset_resolver,
+        max_limit, enforce_first_or_last, root, info, **args
+    ):
+        result = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+        get_loaders(info).queue(edge.node for edge in result.edges)
+        return result
+
+    @classmethod
+    def keyset_connection_resolver(
+        cls, offset_resolver, resolver, connection, default_manager, queryset_resolver,
+        max_limit, keyset_fields, ordering_fields, root, info, **args
+    ):
+        if not args.pop('keyset', False):
+            return offset_resolver(root, info, **args)
+        if args.get('offset') is not None:
+            raise GraphQLError("`offset` cannot be combined with keyset pagination.")
+        order_by = args.pop('order_by', None)
+        if order_by:
+            ordering = parse_ordering(order_by, ordering_fields)
+        else:
+            ordering = [(name, False) for name in keyset_fields]
+        iterable = resolver(root, info, **args)
+        if iterable is None:
+            iterable = default_manager
+        qs = queryset_resolver(connection, iterable, info, args)
+        result = keyset_connection(connection, qs, ordering, args, max_limit=max_limit)
+        get_loaders(info).queue(edge.node for edge in result.edges)
+        return result
+
+    def wrap_resolve(self, parent_resolver):
+        # Pagination is sync ORM code; under async execution it runs in the DB thread
+        offset_resolver = super().wrap_resolve(parent_resolver)
+        if not self.keyset_fields:
+            return async_aware(offset_resolver)
+        return async_aware(partial(
+            self.keyset_connection_resolver,
+            offset_resolver,
+            self.resolver or parent_resolver,
+            self.connection_type,
+            self.get_manager(),
+            self.get_queryset_resolver(),
+            self.max_limit,
+            self.keyset_fields,
+            self.ordering_fields or (),
+        ))
+
+
 # Simple Types (for graphene.List compatibility)
-class CustomerType(DjangoObjectType):
+class CustomerType(CustomerRelations, DjangoObjectType):
     class Meta:
         model = Customer
         fields = '__all__'
 
 
-class ProductType(DjangoObjectType):
+class ProductType(ProductRelations, DjangoObjectType):
     class Meta:
         model = Product
         fields = '__all__'
 
 
-class OrderType(DjangoObjectType):
+class OrderType(OrderRelations, DjangoObjectType):
     class Meta:
         model = Order
         fields = '__all__'
 
 
+class OrderItemType(DjangoObjectType):
+    line_total = graphene.Decimal()
+
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'product', 'quantity', 'unit_price')
+
+    def resolve_product(self, info):
+        if OrderItem.product.is_cached(self):
+            return self.product
+        return get_loaders(info).product.load(self.product_id)
+
+
 # Relay Nodes (for connection fields)
-class CustomerNode(DjangoObjectType):
+class CustomerNode(CustomerRelations, DjangoObjectType):
     class Meta:
         model = Customer
         interfaces = (relay.Node,)
         fields = '__all__'
 
 
-class ProductNode(DjangoObjectType):
+class ProductNode(ProductRelations, DjangoObjectType):
     class Meta:
         model = Product
         interfaces = (relay.Node,)
         fields = '__all__'
 
 
-class OrderNode(DjangoObjectType):
+class OrderNode(OrderRelations, DjangoObjectType):
     class Meta:
         model = Order
         interfaces = (relay.Node,)
         fields = '__all__'
 
 
+# Aggregates
+class StatsGranularity(graphene.Enum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+class PeriodStats(graphene.ObjectType):
+    period = graphene.DateTime()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+
+
+class CRMStats(graphene.ObjectType):
+    customer_count = graphene.Int(description="Distinct customers among the filtered orders.")
+    order_count = graphene.Int()
+    revenue_sum = graphene.Decimal()
+    revenue_avg = graphene.Decimal()
+    periods = graphene.List(PeriodStats, granularity=StatsGranularity(default_value='month'))
+
+    @async_aware
+    def resolve_customer_count(self, info):
+        return self.totals['customer_count']
+
+    @async_aware
+    def resolve_order_count(self, info):
+        return self.totals['order_count']
+
+    @async_aware
+    def resolve_revenue_sum(self, info):
+        return self.totals['revenue_sum']
+
+    @async_aware
+    def resolve_revenue_avg(self, info):
+        return self.totals['revenue_avg']
+
+    @async_aware
+    def resolve_periods(self, info, granularity):
+        granularity = getattr(granularity, 'value', granularity)
+        return [PeriodStats(**row) for row in stats.period_totals(self.orders, granularity)]
+
+
+class OrderStatsRoot:
+    """Root value for CRMStats: the filtered orders plus lazily computed totals."""
+
+    def __init__(self, orders):
+        self.orders = orders
+        self._totals = None
+
+    @property
+    def totals(self):
+        if self._totals is None:
+            self._totals = stats.order_totals(self.orders)
+        return self._totals
+
+
+response_cache.cache_depends_on(CRMStats, Customer, Order)
+
+
+class RFMSegment(graphene.ObjectType):
+    recency = graphene.Int(description="Recency score, 1 (longest since last order) to quantiles.")
+    frequency = graphene.Int(description="Frequency score, 1 (fewest orders) to quantiles.")
+    monetary = graphene.Int(description="Monetary score, 1 (lowest revenue) to quantiles.")
+    customer_count = graphene.Int()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+
+
+class CustomerRFM(graphene.ObjectType):
+    customer_id = graphene.ID()
+    customer = graphene.Field(CustomerNode)
+    last_order_date = graphene.DateTime()
+    order_count = graphene.Int()
+    total_spent = graphene.Decimal()
+    recency_score = graphene.Int()
+    frequency_score = graphene.Int()
+    monetary_score = graphene.Int()
+
+    def resolve_customer(self, info):
+        return get_loaders(info).customer.load(self.customer_id)
+
+
+class CustomerSegments(graphene.ObjectType):
+    quantiles = graphene.Int()
+    customers_without_orders = graphene.Int()
+    segments = graphene.List(RFMSegment)
+    customers = graphene.List(
+        CustomerRFM,
+        first=graphene.Int(default_value=100),
+        recency=graphene.Int(),
+        frequency=graphene.Int(),
+        monetary=graphene.Int(),
+        description="Highest-revenue customers, optionally within the given scores.",
+    )
+
+    @async_aware
+    def resolve_customers_without_orders(self, info):
+        return stats.customers_without_orders(self.customers)
+
+    @async_aware
+    def resolve_segments(self, info):
+        return [RFMSegment(**row) for row in stats.rfm_segments(self.customers, self.quantiles)]
+
+    @async_aware
+    def resolve_customers(self, info, first, recency=None, frequency=None, monetary=None):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        if first < 0 or (max_limit and first > max_limit):
+            raise GraphQLError(f"`first` must be between 0 and {max_limit}.")
+        rows = stats.rfm_customers(self.customers, self.quantiles, first, recency, frequency, monetary)
+        get_loaders(info).customer.queue(row['customer_id'] for row in rows)
+        return [CustomerRFM(**row) for row in rows]
+
+
+class CustomerSegmentsRoot:
+    """Root value for CustomerSegments: the filtered customers and the bucket count."""
+
+    def __init__(self, customers, quantiles):
+        self.customers = customers
+        self.quantiles = quantiles
+
+
+response_cache.cache_depends_on(CustomerSegments, Customer, Order)
+response_cache.cache_depends_on(CustomerRFM, Customer, Order)
+
+
+class SalesPoint(graphene.ObjectType):
+    period = graphene.Date()
+    order_count = graphene.Int()
+    revenue = graphene.Decimal()
+    customer_count = graphene.Int(description="Distinct customers per day, summed over the period (customer-days).")
+    units = graphene.Int(description="Units sold of the requested product.")
+
+
+response_cache.cache_depends_on(SalesPoint, DailySales, DailyProductSales)
+
+
 # Query
 class Query(graphene.ObjectType):
     hello = graphene.String()
@@ -69,14 +350,35 @@ class Query(graphene.ObjectType):
     all_orders = graphene.List(OrderType)
     
     # Relay connection queries (for advanced filtering)
-    customers_connection = DjangoFilterConnectionField(
-        CustomerNode, filterset_class=CustomerFilter, order_by=graphene.String()
+    customers_connection = CRMConnectionField(
+        CustomerNode, filterset_class=CustomerFilter,
+        ordering_fields=('name', 'email', 'created_at', 'id'), keyset_fields=('created_at', 'id'),
+    )
+    products_connection = CRMConnectionField(
+        ProductNode, filterset_class=ProductFilter, ordering_fields=('name', 'price', 'stock', 'id')
     )
-    products_connection = DjangoFilterConnectionField(
-        ProductNode, filterset_class=ProductFilter, order_by=graphene.String()
+    orders_connection = CRMConnectionField(
+        OrderNode, filterset_class=OrderFilter,
+        ordering_fields=('order_date', 'total_amount', 'id'), keyset_fields=('order_date', 'id'),
     )
-    orders_connection = DjangoFilterConnectionField(
-        OrderNode, filterset_class=OrderFilter, order_by=graphene.String()
+
+    # Aggregates computed in SQL, filtered with the OrderFilter arguments
+    crm_stats = graphene.Field(CRMStats, **get_filtering_args_from_filterset(OrderFilter, OrderNode))
+
+    # Read from the DailySales rollup (crm/rollups.py), one row per day
+    sales_timeseries = graphene.List(
+        SalesPoint,
+        date_from=graphene.Date(required=True, name='from'),
+        date_to=graphene.Date(required=True, name='to'),
+        granularity=StatsGranularity(default_value='day'),
+        product_id=graphene.ID(description="Units and revenue of one product instead of all orders."),
+    )
+
+    # RFM scores grouped in SQL, over the customers matching the CustomerFilter arguments
+    customer_segments = graphene.Field(
+        CustomerSegments,
+        quantiles=graphene.Int(default_value=5, description="Number of score buckets per metric."),
+        **get_filtering_args_from_filterset(CustomerFilter, CustomerNode),
     )
 
     def resolve_hello(self, info):
@@ -110,15 +412,95 @@ class Query(graphene.ObjectType):
                 return None
         return Order.objects.first()
     
+    def resolve_crm_stats(self, info, **kwargs):
+        filterset = OrderFilter(data=kwargs, queryset=Order.objects.all(), request=info.context)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.form.errors.as_json())
+        return OrderStatsRoot(filterset.qs)
+
+    @async_aware
+    def resolve_sales_timeseries(self, info, date_from, date_to, granularity, product_id=None):
+        if date_from > date_to:
+            raise GraphQLError("`from` must not be after `to`.")
+        granularity = getattr(granularity, 'value', granularity)
+        if product_id is not None:
+            product_id = parse_pk(product_id)
+            if product_id is None:
+                raise GraphQLError("Invalid productId.")
+        return [SalesPoint(**row) for row in sales_timeseries(date_from, date_to, granularity, product_id)]
+
+    def resolve_customer_segments(self, info, quantiles, **kwargs):
+        if not 1 <= quantiles <= 100:
+            raise GraphQLError("`quantiles` must be between 1 and 100.")
+        filterset = CustomerFilter(data=kwargs, queryset=Customer.objects.all(), request=info.context)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.form.errors.as_json())
+        return CustomerSegmentsRoot(filterset.qs, quantiles)
+
     # Resolvers for list queries
     def resolve_all_customers(self, info):
-        return Customer.objects.all()
+        customers = list(optimize_queryset(Customer.objects.all(), info, connection=False))
+        get_loaders(info).queue_customers(customers)
+        return customers
     
     def resolve_all_products(self, info):
-        return Product.objects.all()
+        products = list(optimize_queryset(Product.objects.all(), info, connection=False))
+        get_loaders(info).queue_products(products)
+        return products
     
     def resolve_all_orders(self, info):
-        return Order.objects.all()
+        orders = list(optimize_queryset(Order.objects.all(), info, connection=False))
+        get_loaders(info).queue_orders(orders)
+        return orders
+
+
+response_cache.cache_filters(Query, 'crm_stats', OrderFilter)
+response_cache.cache_filters(Query, 'customer_segments', CustomerFilter)
+response_cache.filter_depends_on(OrderFilter, product_name=[OrderItem, Product], product_id=[OrderItem])
+
+
+class AsyncQuery(Query):
+    """
+    Query for the ASGI view (crm.views.AsyncCRMGraphQLView): root rows are
+    fetched with the async ORM and relations resolve through the async loaders.
+    Connections and aggregates are async_aware and run in the DB thread.
+    """
+
+    class Meta:
+        name = 'Query'
+
+    async def resolve_customer(self, info, **kwargs):
+        id = kwargs.get('id')
+        if id:
+            return await Customer.objects.filter(pk=id).afirst()
+        return await Customer.objects.afirst()
+
+    async def resolve_product(self, info, **kwargs):
+        id = kwargs.get('id')
+        if id:
+            return await Product.objects.filter(pk=id).afirst()
+        return await Product.objects.afirst()
+
+    async def resolve_order(self, info, **kwargs):
+        id = kwargs.get('id')
+        if id:
+            return await Order.objects.filter(pk=id).afirst()
+        return await Order.objects.afirst()
+
+    async def resolve_all_customers(self, info):
+        customers = [c async for c in optimize_queryset(Customer.objects.all(), info, connection=False)]
+        get_loaders(info).queue_customers(customers)
+        return customers
+
+    async def resolve_all_products(self, info):
+        products = [p async for p in optimize_queryset(Product.objects.all(), info, connection=False)]
+        get_loaders(info).queue_products(products)
+        return products
+
+    async def resolve_all_orders(self, info):
+        orders = [o async for o in optimize_queryset(Order.objects.all(), info, connection=False)]
+        get_loaders(info).queue_orders(orders)
+        return orders
 
 
 # Input types
@@ -209,16 +591,23 @@ class CreateOrder(graphene.Mutation):
             if input.quantity <= 0:
                 return CreateOrder(order=None, message="Quantity must be positive", ok=False)
 
+            # Fast reject only; reserve_stock() below is the authoritative check
             if product.stock < input.quantity:
                 return CreateOrder(order=None, message="Not enough stock", ok=False)
 
             with transaction.atomic():
                 order = Order.objects.create(
-                    customer=customer, product=product, quantity=input.quantity
+                    customer=customer, total_amount=product.price * input.quantity
+                )
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=input.quantity, unit_price=product.price
                 )
-                product.stock -= input.quantity
-                product.save()
+                reserved = reserve_stock(product.pk, input.quantity)
+                if not reserved:
+                    transaction.set_rollback(True)
 
+            if not reserved:
+                return CreateOrder(order=None, message="Not enough stock", ok=False)
             return CreateOrder(order=order, message="Order created", ok=True)
         except Customer.DoesNotExist:
             return CreateOrder(order=None, message="Customer not found", ok=False)
@@ -231,20 +620,20 @@ class CreateOrder(graphene.Mutation):
 class UpdateLowStockProducts(graphene.Mutation):
     class Arguments:
         increment_by = graphene.Int(default_value=10)
+        threshold = graphene.Int(default_value=LOW_STOCK_THRESHOLD)
+        chunk_size = graphene.Int(description="Restock in primary-key chunks of this size, one transaction each.")
 
     ok = graphene.Boolean()
     message = graphene.String()
     updated_products = graphene.List(lambda: ProductNode)
 
     @classmethod
-    def mutate(cls, root, info, increment_by):
-        updated = []
-        with transaction.atomic():
-            qs = Product.objects.select_for_update().filter(stock__lt=10)
-            for p in qs:
-                p.stock = p.stock + increment_by
-                p.save(update_fields=["stock"])
-                updated.append(p)
+    def mutate(cls, root, info, increment_by, threshold, chunk_size=None):
+        if increment_by <= 0:
+            return UpdateLowStockProducts(ok=False, message="incrementBy must be positive", updated_products=[])
+        if chunk_size is not None and chunk_size <= 0:
+            return UpdateLowStockProducts(ok=False, message="chunkSize must be positive", updated_products=[])
+        updated = restock_low_stock(increment_by=increment_by, threshold=threshold, chunk_size=chunk_size)
         return UpdateLowStockProducts(
             ok=True,
             message=f"Updated {len(updated)} products",
@@ -252,12 +641,195 @@ class UpdateLowStockProducts(graphene.Mutation):
         )
 
 
+# Bulk mutations
+BULK_CHUNK_SIZE = 500
+
+
+class BulkRowError(graphene.ObjectType):
+    index = graphene.Int()
+    message = graphene.String()
+
+
+def chunked(rows, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def bulk_persist(rows, save_chunk, errors):
+    """
+    Run ``save_chunk`` on ``(index, row)`` pairs chunk by chunk, each chunk in its
+    own transaction. A failing chunk is rolled back and reported on every row.
+    """
+    created = []
+    for chunk in chunked(rows):
+        try:
+            with transaction.atomic():
+                created.extend(save_chunk(chunk))
+        except IntegrityError as e:
+            errors.extend(BulkRowError(index=i, message=str(e)) for i, _ in chunk)
+    return created
+
+
+def parse_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bulk_result(mutation_cls, info, field, created, errors, total, models=()):
+    errors.sort(key=lambda e: e.index)
+    if created:
+        # bulk_create() and update() send no post_save signals
+        response_cache.invalidate(*models)
+    get_loaders(info).queue(created)
+    return mutation_cls(
+        ok=not errors,
+        message=f"Created {len(created)} of {total} rows",
+        errors=errors,
+        **{field: created},
+    )
+
+
+class CreateCustomers(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(CustomerInput), required=True)
+
+    customers = graphene.List(CustomerNode)
+    errors = graphene.List(BulkRowError)
+    message = graphene.String()
+    ok = graphene.Boolean()
+
+    @classmethod
+    def mutate(cls, root, info, input):
+        errors, rows, seen = [], [], set()
+        emails = [row.email.strip().lower() for row in input]
+        existing = set(Customer.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        for index, (row, email) in enumerate(zip(input, emails)):
+            phone = row.phone or None
+            if not CreateCustomer.validate_phone(phone):
+                errors.append(BulkRowError(index=index, message="Invalid phone format"))
+            elif email in existing or email in seen:
+                errors.append(BulkRowError(index=index, message="Email already exists"))
+            else:
+                seen.add(email)
+                rows.append((index, Customer(name=row.name.strip(), email=email, phone=phone)))
+
+        def save_chunk(chunk):
+            return Customer.objects.bulk_create([customer for _, customer in chunk])
+
+        created = bulk_persist(rows, save_chunk, errors)
+        return bulk_result(CreateCustomers, info, 'customers', created, errors, len(input), models=[Customer])
+
+
+class CreateProducts(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(ProductInput), required=True)
+
+    products = graphene.List(ProductNode)
+    errors = graphene.List(BulkRowError)
+    message = graphene.String()
+    ok = graphene.Boolean()
+
+    @classmethod
+    def mutate(cls, root, info, input):
+        errors, rows = [], []
+        for index, row in enumerate(input):
+            price = Decimal(row.price)
+            stock = row.stock or 0
+            if price < 0:
+                errors.append(BulkRowError(index=index, message="Price must be non-negative"))
+            elif stock < 0:
+                errors.append(BulkRowError(index=index, message="Stock must be non-negative"))
+            else:
+                rows.append((index, Product(name=row.name.strip(), price=price, stock=stock)))
+
+        def save_chunk(chunk):
+            products = Product.objects.bulk_create([product for _, product in chunk])
+            stock_changed(product.pk for product in products)
+            return products
+
+        created = bulk_persist(rows, save_chunk, errors)
+        return bulk_result(CreateProducts, info, 'products', created, errors, len(input), models=[Product])
+
+
+class CreateOrders(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(OrderInput), required=True)
+
+    orders = graphene.List(OrderNode)
+    errors = graphene.List(BulkRowError)
+    message = graphene.String()
+    ok = graphene.Boolean()
+
+    @classmethod
+    def mutate(cls, root, info, input):
+        errors, rows = [], []
+        customer_ids = [parse_pk(row.customer_id) for row in input]
+        product_ids = [parse_pk(row.product_id) for row in input]
+        customers = Customer.objects.in_bulk({pk for pk in customer_ids if pk is not None})
+        products = Product.objects.in_bulk({pk for pk in product_ids if pk is not None})
+        # Remaining stock as the batch consumes it, so rows cannot oversell together
+        available = {p.pk: p.stock for p in products.values()}
+
+        for index, row in enumerate(input):
+            customer = customers.get(customer_ids[index])
+            product = products.get(product_ids[index])
+            if customer is None:
+                errors.append(BulkRowError(index=index, message="Customer not found"))
+            elif product is None:
+                errors.append(BulkRowError(index=index, message="Product not found"))
+            elif row.quantity <= 0:
+                errors.append(BulkRowError(index=index, message="Quantity must be positive"))
+            elif available[product.pk] < row.quantity:
+                errors.append(BulkRowError(index=index, message="Not enough stock"))
+            else:
+                available[product.pk] -= row.quantity
+                rows.append((index, (customer, product, row.quantity)))
+
+        def save_chunk(chunk):
+            # One conditional stock >= quantity UPDATE per product for its total
+            # in the chunk. A product that cannot cover the total (another
+            # writer took stock since it was read) is retried row by row, so
+            # only the rows that would oversell are rejected.
+            by_product = {}
+            for entry in chunk:
+                by_product.setdefault(entry[1][1].pk, []).append(entry)
+            accepted, rejected = [], []
+            for pk, entries in by_product.items():
+                if take_stock(pk, sum(quantity for _, (_, _, quantity) in entries)):
+                    accepted.extend(entries)
+                    continue
+                for entry in entries:
+                    (accepted if take_stock(pk, entry[1][2]) else rejected).append(entry)
+            accepted.sort(key=lambda entry: entry[0])
+
+            orders = Order.objects.bulk_create([
+                Order(customer=customer, total_amount=product.price * quantity)
+                for _, (customer, product, quantity) in accepted
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=quantity, unit_price=product.price)
+                for order, (_, (_, product, quantity)) in zip(orders, accepted)
+            ])
+            stock_changed(by_product)
+            errors.extend(BulkRowError(index=index, message="Not enough stock") for index, _ in rejected)
+            return orders
+
+        created = bulk_persist(rows, save_chunk, errors)
+        return bulk_result(CreateOrders, info, 'orders', created, errors, len(input), models=[Order, OrderItem, Product])
+
+
 # Root Mutation
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
     update_low_stock_products = UpdateLowStockProducts.Field()
+    create_customers = CreateCustomers.Field()
+    create_products = CreateProducts.Field()
+    create_orders = CreateOrders.Field()
 
 
 # Alias for nicer GraphQL API name
@@ -265,4 +837,5 @@ UpdateLowStockProductsField = UpdateLowStockProducts.Field
 
 
 # Schema (for testing this module independently)
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+schema = graphene.Schema(query=Query, mutation=Mutation)
+async_schema = graphene.Schema(query=AsyncQuery, mutation=Mutation)
\ No newline at end of file
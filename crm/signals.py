@@ -0,0 +1,68 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import response_cache
+from .inventory import stock_changed
+from .models import Customer, Order, OrderItem, Product
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def update_order_totals(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Order.total_amount in sync whenever the product set of an order changes,
+    recomputing only the affected orders with one correlated SUM per change.
+    """
+    if reverse and action == 'pre_clear':
+        # product.orders.clear(): remember which orders lose the product
+        instance._cleared_order_ids = list(instance.orders.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        Order.objects.filter(pk=instance.pk).update_totals()
+        instance.total_amount = Order.objects.values_list('total_amount', flat=True).get(pk=instance.pk)
+        return
+
+    order_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_order_ids', [])
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).update_totals()
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_total_on_item_save(sender, instance, raw=False, **kwargs):
+    # Line edits (quantity or price) that bypass order.products.add()/remove()
+    if not raw:
+        Order.objects.filter(pk=instance.order_id).update_totals()
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_order_total_on_item_delete(sender, instance, **kwargs):
+    # Lines deleted directly (admin inline, queryset.delete()); update_totals()
+    # also invalidates cached Order responses
+    Order.objects.filter(pk=instance.order_id).update_totals()
+
+
+@receiver(post_save, sender=Product)
+def check_stock_on_product_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # New products and stock edits (admin, product.save()) may need restocking
+    if not raw and (created or update_fields is None or 'stock' in update_fields):
+        stock_changed([instance.pk])
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_response_cache(sender, **kwargs):
+    response_cache.invalidate(sender)
+
+
+@receiver(m2m_changed, sender=Order.products.through)
+def invalidate_response_cache_on_products_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        response_cache.invalidate(OrderItem, Order)
@@ -0,0 +1,233 @@
+"""
+Structured output for the cron jobs and Celery tasks.
+
+Each job writes records (a dict with ``ts``, ``stream``, ``event``, ``level``,
+``message`` and any extra fields) to a named sink configured in
+``settings.CRM_SINKS``. Sinks buffer records and write them in batches: the
+file sinks keep their file open and append a whole batch with one ``write``
+under an exclusive lock, so lines from concurrent cron runs and Celery workers
+never interleave, and the database sink inserts a batch with one
+``bulk_create``.
+
+Jobs call ``flush()`` (or use the sink as a context manager) when they finish;
+anything still buffered is flushed at interpreter exit. The module imports
+without Django so standalone scripts can use the file sinks.
+"""
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows: O_APPEND writes only
+    fcntl = None
+
+DEFAULT_BACKEND = 'crm.sinks.JSONLinesSink'
+DEFAULT_PATH = '/tmp/crm_{stream}_log.jsonl'
+DEFAULT_BUFFER_SIZE = 100
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+# Keys every record has; anything else is stored in JobLog.data
+RECORD_FIELDS = ('ts', 'stream', 'event', 'level', 'message')
+
+
+def _settings():
+    return getattr(settings, 'CRM_SINKS', {}) if settings.configured else {}
+
+
+class Sink:
+    """Buffers records and hands them to ``write_batch`` BUFFER_SIZE at a time."""
+
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def emit(self, event, message='', level='info', **fields):
+        record = {
+            'ts': datetime.now().astimezone(),
+            'stream': self.stream,
+            'event': event,
+            'level': level,
+            'message': message,
+            **fields,
+        }
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush()
+        return record
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            records, self._buffer = self._buffer, []
+            self.write_batch(records)
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class JSONLinesSink(Sink):
+    """
+    One JSON object per line. The file is opened once, in append mode, and
+    reopened only when it has been rotated or removed underneath us.
+    """
+
+    def __init__(self, stream, path=None, **kwargs):
+        super().__init__(stream, **kwargs)
+        self.path = os.fspath(path or DEFAULT_PATH.format(stream=stream))
+        self._fd = None
+
+    def encode(self, records):
+        return ''.join(json.dumps(record, cls=DjangoJSONEncoder) + '\n' for record in records).encode('utf-8')
+
+    def write_batch(self, records):
+        data = self.encode(records)
+        with self._file_lock():
+            self._open()
+            self.before_write(len(data))
+            fd = self._open()  # a new file if before_write rotated it
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+
+    def before_write(self, size):
+        """Called under the file lock before each batch is appended."""
+
+    def _open(self):
+        # Another process may have rotated the file since our last batch
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(self._fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if not current:
+                os.close(self._fd)
+                self._fd = None
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _file_lock(self):
+        # A separate lock file survives rotation; opened per batch, so forked
+        # Celery workers never share one lock
+        return _FileLock(self.path + '.lock')
+
+    def close(self):
+        super().close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class RotatingFileSink(JSONLinesSink):
+    """JSON Lines rotated to ``path.1`` ... ``path.N`` once a batch would exceed ``max_bytes``."""
+
+    def __init__(self, stream, path=None, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT, **kwargs):
+        super().__init__(stream, path, **kwargs)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def before_write(self, size):
+        current = os.fstat(self._fd).st_size
+        if not current or current + size <= self.max_bytes:
+            return
+        if self.backup_count:
+            for n in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{n}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{n + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.truncate(self.path, 0)
+
+
+class DatabaseSink(Sink):
+    """Records stored as crm.JobLog rows, one INSERT per batch."""
+
+    def write_batch(self, records):
+        from .models import JobLog
+
+        JobLog.objects.bulk_create([
+            JobLog(
+                created_at=record['ts'],
+                stream=record['stream'],
+                event=record['event'],
+                level=record['level'],
+                message=record['message'],
+                data={k: v for k, v in record.items() if k not in RECORD_FIELDS},
+            )
+            for record in records
+        ])
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            os.close(self.fd)  # releases the lock
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(stream):
+    """
+    The process-wide sink for ``stream``, built from ``CRM_SINKS[stream]``:
+    BACKEND plus its lower-cased options (PATH, BUFFER_SIZE, MAX_BYTES, ...).
+    """
+    with _sinks_lock:
+        sink = _sinks.get(stream)
+        if sink is None:
+            config = dict(_settings().get(stream, {}))
+            backend = import_string(config.pop('BACKEND', DEFAULT_BACKEND))
+            sink = _sinks[stream] = backend(stream, **{key.lower(): value for key, value in config.items()})
+        return sink
+
+
+@atexit.register
+def close_sinks():
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+@receiver(setting_changed)
+def _reset_sinks(setting, **kwargs):
+    if setting == 'CRM_SINKS':
+        close_sinks()
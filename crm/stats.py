@@ -0,0 +1,155 @@
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order
+
+CENTS = Decimal('0.01')
+
+TRUNC_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _money(value):
+    return Decimal(value).quantize(CENTS)
+
+
+def _countable(orders):
+    # Relation filters may add joins + DISTINCT; aggregate over the distinct ids instead
+    if orders.query.distinct:
+        return Order.objects.filter(pk__in=orders.values('pk'))
+    return orders
+
+
+def order_totals(orders):
+    """
+    Order count, distinct customers, revenue sum and revenue average of
+    ``orders`` in one aggregate query.
+    """
+    totals = _countable(orders).order_by().aggregate(
+        order_count=Count('pk'),
+        customer_count=Count('customer', distinct=True),
+        revenue_sum=Sum('total_amount'),
+        revenue_avg=Avg('total_amount'),
+    )
+    totals['revenue_sum'] = _money(totals['revenue_sum'] or 0)
+    if totals['revenue_avg'] is not None:
+        totals['revenue_avg'] = _money(totals['revenue_avg'])
+    return totals
+
+
+def period_totals(orders, granularity='month'):
+    """Per-period order count and revenue, grouped in SQL on the truncated ``order_date``."""
+    trunc = TRUNC_FUNCTIONS[granularity]
+    rows = (
+        _countable(orders)
+        .order_by()
+        .annotate(period=trunc('order_date'))
+        .values('period')
+        .annotate(order_count=Count('pk'), revenue=Sum('total_amount'))
+        .order_by('period')
+    )
+    return [dict(row, revenue=_money(row['revenue'] or 0)) for row in rows]
+
+
+# RFM (recency, frequency, monetary) segmentation. The per-customer metrics
+# are one GROUP BY over Order; the scores and segment counts are computed
+# around it in SQL, so no customer or order row is loaded into Python.
+RFM_SCORE = "1 + (RANK() OVER (ORDER BY {column}) - 1) * %s / COUNT(*) OVER ()"
+
+
+def _rfm_sql(customers, quantiles):
+    """
+    ``(sql, params)`` of one row per customer with orders: ``customer_id,
+    last_order, frequency, monetary`` and a 1..quantiles score for each metric
+    (higher is better). Scores come from RANK(), so ties share a bucket.
+    """
+    metrics = (
+        Order.objects.filter(customer_id__in=customers.values('pk'))
+        .order_by()
+        .values('customer_id')
+        .annotate(last_order=Max('order_date'), frequency=Count('pk'), monetary=Sum('total_amount'))
+    )
+    inner, params = metrics.query.sql_with_params()
+    # Integer division on both PostgreSQL and SQLite
+    sql = (
+        "SELECT customer_id, last_order, frequency, monetary, "
+        f"{RFM_SCORE.format(column='last_order')} AS recency_score, "
+        f"{RFM_SCORE.format(column='frequency')} AS frequency_score, "
+        f"{RFM_SCORE.format(column='monetary')} AS monetary_score "
+        f"FROM ({inner}) rfm_metrics"
+    )
+    return sql, [quantiles, quantiles, quantiles, *params]
+
+
+def _datetime(value):
+    # Raw queries skip the backend converters; SQLite returns text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def rfm_segments(customers, quantiles=5):
+    """Customer count, orders and revenue per (recency, frequency, monetary) score."""
+    scored, params = _rfm_sql(customers, quantiles)
+    sql = (
+        "SELECT recency_score, frequency_score, monetary_score, COUNT(*), SUM(frequency), SUM(monetary) "
+        f"FROM ({scored}) rfm GROUP BY recency_score, frequency_score, monetary_score "
+        "ORDER BY recency_score DESC, frequency_score DESC, monetary_score DESC"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'recency': recency,
+            'frequency': frequency,
+            'monetary': monetary,
+            'customer_count': count,
+            'order_count': orders,
+            'revenue': _money(revenue or 0),
+        }
+        for recency, frequency, monetary, count, orders, revenue in rows
+    ]
+
+
+def rfm_customers(customers, quantiles=5, limit=100, recency=None, frequency=None, monetary=None):
+    """Top ``limit`` scored customers by revenue, optionally within one score per metric."""
+    scored, params = _rfm_sql(customers, quantiles)
+    conditions = []
+    for column, score in (('recency_score', recency), ('frequency_score', frequency), ('monetary_score', monetary)):
+        if score is not None:
+            conditions.append(f"{column} = %s")
+            params.append(score)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    sql = f"SELECT * FROM ({scored}) rfm {where}ORDER BY monetary DESC, customer_id LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        rows = cursor.fetchall()
+    return [
+        {
+            'customer_id': customer_id,
+            'last_order_date': _datetime(last_order),
+            'order_count': order_count,
+            'total_spent': _money(total or 0),
+            'recency_score': r,
+            'frequency_score': f,
+            'monetary_score': m,
+        }
+        for customer_id, last_order, order_count, total, r, f, m in rows
+    ]
+
+
+def customers_without_orders(customers):
+    return customers.filter(~Exists(Order.objects.filter(customer=OuterRef('pk')))).count()
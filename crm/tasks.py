@@ -1,64 +1,112 @@
-from celery import shared_task
+from celery import chord, shared_task
 from datetime import datetime
-from pathlib import Path
-import requests
-
-GRAPHQL_URL = "http://localhost:8000/graphql"
-REPORT_LOG = Path("/tmp/crm_report_log.txt")
-
-QUERY = """
-query ReportData($first:Int){
-  allCustomers { pageInfo { hasNextPage } }  # we just need existence to count via a dedicated field if available
-  allOrders(first:$first){
-    edges {
-      node {
-        id
-        totalAmount
-      }
-    }
-  }
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+
+from .inventory import restock_settings, restock_products
+from .models import Customer, Order
+from .rollups import refresh_daily_sales
+from .sinks import get_sink
+
+# Primary-key range covered by each report subtask
+DEFAULT_PARTITION_SIZE = 100_000
+REPORT_MODELS = {
+    "customers": Customer,
+    "orders": Order,
 }
-"""
 
-# Optional: if your schema has dedicated aggregate fields, replace the query above with them.
-COUNT_CUSTOMERS = """
-query { allCustomers { edges { node { id } } } }
-"""
+
+def report_partitions(partition_size=None):
+    """``(model key, low pk, high pk)`` ranges that together cover every report row."""
+    if partition_size is None:
+        partition_size = getattr(settings, "CRM_REPORT", {}).get("PARTITION_SIZE", DEFAULT_PARTITION_SIZE)
+    partitions = []
+    for key, model in REPORT_MODELS.items():
+        bounds = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            continue
+        for low in range(bounds["low"], bounds["high"] + 1, partition_size):
+            partitions.append((key, low, low + partition_size))
+    return partitions
+
 
 @shared_task
 def generate_crm_report():
     """
-    Uses GraphQL to compute simple totals and logs them.
-    NOTE: This example pulls orders (first 1000) and sums totalAmount client-side.
-    For large datasets, add proper aggregate fields in your schema.
+    Fans the report out as a chord: one report_partition subtask per primary-key
+    range of customers and orders, merged and logged by write_crm_report, so
+    the work spreads over every worker process and node.
     """
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    ts = datetime.now().astimezone().isoformat()
     try:
-        # Count customers (basic approach)
-        r1 = requests.post(GRAPHQL_URL, json={"query": COUNT_CUSTOMERS}, timeout=60)
-        r1.raise_for_status()
-        cust_edges = r1.json().get("data", {}).get("allCustomers", {}).get("edges", [])
-        total_customers = len(cust_edges)
-
-        # Orders and revenue (limited)
-        r2 = requests.post(GRAPHQL_URL, json={"query": QUERY, "variables": {"first": 1000}}, timeout=60)
-        r2.raise_for_status()
-        orders = (r2.json().get("data", {}).get("allOrders", {}) or {}).get("edges", [])
-        total_orders = len(orders)
-        total_revenue = 0.0
-        for e in orders:
-            node = e.get("node") or {}
-            amt = node.get("totalAmount")
-            if amt is None:
-                continue
-            try:
-                total_revenue += float(amt)
-            except Exception:
-                pass
-
-        REPORT_LOG.parent.mkdir(parents=True, exist_ok=True)
-        with REPORT_LOG.open("a", encoding="utf-8") as f:
-            f.write(f"{ts} - Report: {total_customers} customers, {total_orders} orders, {total_revenue:.2f} revenue\n")
+        header = [report_partition.s(key, low, high) for key, low, high in report_partitions()]
     except Exception as e:
-        with REPORT_LOG.open("a", encoding="utf-8") as f:
-            f.write(f"{ts} - ERROR generating report: {e}\n")
+        log_report(f"ERROR generating report: {e}", level="error", requested_at=ts)
+        return
+    if not header:
+        return write_crm_report([], ts)
+    return chord(header)(write_crm_report.s(ts).on_error(report_failed.s(ts))).id
+
+
+@shared_task
+def report_partition(key, low, high):
+    """Partial aggregates of one primary-key range, computed in SQL."""
+    rows = REPORT_MODELS[key].objects.filter(pk__gte=low, pk__lt=high)
+    if key == "orders":
+        totals = rows.aggregate(count=Count("pk"), revenue=Sum("total_amount"))
+        return {"key": key, "count": totals["count"], "revenue": str(totals["revenue"] or 0)}
+    return {"key": key, "count": rows.count()}
+
+
+@shared_task
+def write_crm_report(partials, ts):
+    """Chord callback: merge the partial aggregates and record the report."""
+    total_customers = sum(p["count"] for p in partials if p["key"] == "customers")
+    total_orders = sum(p["count"] for p in partials if p["key"] == "orders")
+    total_revenue = sum((Decimal(p["revenue"]) for p in partials if p["key"] == "orders"), Decimal("0"))
+    record = log_report(
+        f"Report: {total_customers} customers, {total_orders} orders, {total_revenue:.2f} revenue",
+        requested_at=ts,
+        customers=total_customers,
+        orders=total_orders,
+        revenue=f"{total_revenue:.2f}",
+    )
+    return record["message"]
+
+
+@shared_task
+def report_failed(request, exc, traceback, ts):
+    """Chord error callback: a partition failed, so only the error is recorded."""
+    log_report(f"ERROR generating report: {exc}", level="error", requested_at=ts)
+
+
+def log_report(message, level="info", **fields):
+    """Write one record to the "report" sink and return it."""
+    with get_sink("report") as sink:
+        return sink.emit("report", message, level=level, **fields)
+
+
+@shared_task
+def refresh_sales_rollup(since=None):
+    """
+    Roll orders placed since the last run into DailySales / DailyProductSales.
+    ``since`` (YYYY-MM-DD) rebuilds from that day instead, e.g. after editing old orders.
+    """
+    since = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+    return refresh_daily_sales(since)
+
+
+@shared_task
+def restock_product(product_id):
+    """
+    Restock one product queued by crm.inventory.enqueue_low_stock when an order
+    took its stock below the threshold; a no-op if it has been restocked since.
+    """
+    config = restock_settings()
+    updated = restock_products([product_id], increment_by=config["INCREMENT_BY"], threshold=config["THRESHOLD"])
+    products = [{"id": p.pk, "name": p.name, "stock": p.stock} for p in updated]
+    if products:
+        with get_sink("low_stock") as sink:
+            sink.emit("restock", f"Restocked {len(products)} products", count=len(products), products=products)
+    return products
@@ -1,3 +1,1513 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from celery import current_app
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from graphql import parse
+from graphql_relay import from_global_id
+from urllib3.exceptions import NewConnectionError
+
+from .complexity import estimate_cost
+from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .instrumentation import MetricsRegistry
+from . import checks, inventory, rollups, stats, views
+from .models import Customer, Product, Order, OrderItem, DailySales, JobLog
+from .persisted import DocumentCache, document_cache, query_hash
+from .sinks import JSONLinesSink, RotatingFileSink
+from . import tasks
+from .celery import app
+from .client import GraphQLClient, GraphQLClientError, get_client
+from .cron_jobs import send_order_reminders
+from .schema import bulk_persist, schema
+
+
+class GraphQLViewMixin:
+    """Post operations to the sync and async GraphQL views (crm/urls.py)."""
+
+    VIEWS = ('/graphql', '/graphql/async')
+
+    def graphql(self, query, variables=None, path='/graphql'):
+        response = self.client.post(
+            path, json.dumps({'query': query, 'variables': variables or {}}), content_type='application/json',
+        )
+        return response.json()
+
+    def assertViewsAgree(self, query, variables=None):
+        """Run ``query`` on both views and return the data they agree on."""
+        results = [self.graphql(query, variables, path) for path in self.VIEWS]
+        for path, result in zip(self.VIEWS, results):
+            self.assertNotIn('errors', result, path)
+        self.assertEqual(results[0], results[1])
+        return results[0]['data']
+
+
+INDEX_PLAN_MARKERS = {
+    'sqlite': ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY'),
+    'postgresql': ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'),
+}
+
+
+class FilterIndexUsageTests(TestCase):
+    """Every filter in crm/filters.py should be answered from an index, checked with EXPLAIN."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com', phone='+123456789')
+        product = Product.objects.create(name='Laptop', price=Decimal('1200.50'), stock=5)
+        order = Order.objects.create(customer=customer)
+        order.products.add(product, through_defaults={'quantity': 1, 'unit_price': product.price})
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are always cheaper to scan; ask the planner what it could use
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                return queryset.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET enable_seqscan = on')
+        return queryset.explain()
+
+    def assertFilterUsesIndex(self, filterset_class, data):
+        filterset = filterset_class(data=data, queryset=filterset_class._meta.model.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        plan = self.explain(filterset.qs)
+        markers = INDEX_PLAN_MARKERS.get(connection.vendor)
+        if markers is None:
+            self.skipTest(f"No plan markers for {connection.vendor}")
+        self.assertTrue(any(m in plan for m in markers), f"{filterset_class.__name__} {data} does not use an index:\n{plan}")
+
+    def test_range_and_prefix_filters_use_indexes(self):
+        cases = [
+            (CustomerFilter, {'created_at__gte': '2020-01-01T00:00:00'}),
+            (CustomerFilter, {'created_at__lte': '2020-01-01T00:00:00'}),
+            (ProductFilter, {'price__gte': '100'}),
+            (ProductFilter, {'price__lte': '100'}),
+            (ProductFilter, {'stock__gte': '3'}),
+            (ProductFilter, {'stock__lte': '3'}),
+            (OrderFilter, {'total_amount__gte': '10'}),
+            (OrderFilter, {'total_amount__lte': '10'}),
+            (OrderFilter, {'order_date__gte': '2020-01-01T00:00:00'}),
+            (OrderFilter, {'order_date__lte': '2020-01-01T00:00:00'}),
+            (OrderFilter, {'product_id': '1'}),
+        ]
+        for filterset_class, data in cases:
+            with self.subTest(filterset=filterset_class.__name__, **data):
+                self.assertFilterUsesIndex(filterset_class, data)
+
+    @skipUnless(connection.vendor == 'postgresql', "SQLite cannot seek an index for LIKE ... ESCAPE")
+    def test_phone_prefix_uses_pattern_ops_index(self):
+        self.assertFilterUsesIndex(CustomerFilter, {'phone_pattern': '+1'})
+
+    @skipUnless(connection.vendor == 'postgresql', "icontains can only use trigram indexes on PostgreSQL")
+    def test_icontains_filters_use_trigram_indexes(self):
+        cases = [
+            (CustomerFilter, {'name': 'lic'}),
+            (CustomerFilter, {'email': 'example'}),
+            (ProductFilter, {'name': 'apt'}),
+            (OrderFilter, {'customer_name': 'lic'}),
+            (OrderFilter, {'product_name': 'apt'}),
+        ]
+        for filterset_class, data in cases:
+            with self.subTest(filterset=filterset_class.__name__, **data):
+                self.assertFilterUsesIndex(filterset_class, data)
+
+
+CREATE_ORDER = """
+mutation($customer: ID!, $product: ID!, $quantity: Int!) {
+  createOrder(input: {customerId: $customer, productId: $product, quantity: $quantity}) { ok message }
+}
+"""
+
+
+# Restock events would refill the product mid-test
+@override_settings(CRM_RESTOCK={'THRESHOLD': 0})
+class CreateOrderConcurrencyTests(TransactionTestCase):
+    """Concurrent checkouts against one product must never sell more than its stock."""
+
+    # CRM_STRESS_ORDERS=2000 for the full stress run; a quarter of the orders can succeed
+    ORDERS = int(os.environ.get('CRM_STRESS_ORDERS', 200))
+    STOCK = ORDERS // 4
+    THREADS = 16
+    # Far below what any backend achieves; catches orders serializing on long-held locks
+    MIN_ORDERS_PER_SECOND = 50
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Shared-cache in-memory databases fail concurrent writers instead of waiting
+            self.skipTest("needs a file-backed SQLite test database (DATABASES TEST NAME) or another backend")
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.product = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=self.STOCK)
+
+    def create_order(self, _):
+        try:
+            result = schema.execute(CREATE_ORDER, context_value=SimpleNamespace(), variable_values={
+                'customer': self.customer.pk, 'product': self.product.pk, 'quantity': 1,
+            })
+            return result.data['createOrder']
+        finally:
+            connections.close_all()
+
+    def test_concurrent_orders_never_oversell(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = list(pool.map(self.create_order, range(self.ORDERS)))
+        elapsed = time.perf_counter() - start
+
+        succeeded = sum(1 for r in results if r['ok'])
+        unexpected = {r['message'] for r in results if not r['ok'] and r['message'] != 'Not enough stock'}
+        self.product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=self.product).count()
+
+        self.assertEqual(unexpected, set())
+        self.assertEqual(succeeded, self.STOCK)
+        self.assertEqual(sold, succeeded)
+        self.assertEqual(Order.objects.count(), succeeded)
+        self.assertEqual(self.product.stock, 0)
+        throughput = self.ORDERS / elapsed
+        self.assertGreater(
+            throughput, self.MIN_ORDERS_PER_SECOND,
+            f"{self.ORDERS} concurrent orders on {connection.vendor}: {throughput:.0f} orders/s",
+        )
+
+
+class EagerCeleryMixin:
+    """Run Celery tasks inline, without Redis."""
+
+    CELERY_CONF = {'task_always_eager': True, 'broker_url': 'memory://', 'result_backend': 'cache+memory://'}
+
+    def setUp(self):
+        super().setUp()
+        # @shared_task tasks run on celery.current_app, which is the app created
+        # last: alx_backend_graphql's own once that package has been imported
+        for celery_app in {app, current_app._get_current_object()}:
+            saved = {key: celery_app.conf[key] for key in self.CELERY_CONF}
+            celery_app.conf.update(self.CELERY_CONF)
+            self.addCleanup(celery_app.conf.update, saved)
+
+
+@override_settings(CRM_REPORT={'PARTITION_SIZE': 2}, CRM_SINKS={'report': {'BACKEND': 'crm.sinks.DatabaseSink'}})
+class CRMReportChordTests(EagerCeleryMixin, TestCase):
+    """generate_crm_report fans out per pk range and merges the partials, eagerly and without Redis."""
+
+    def test_report_merges_partitions(self):
+        customers = [Customer.objects.create(name=f'C{i}', email=f'c{i}@example.com') for i in range(3)]
+        for i, amount in enumerate(['10.50', '20.25', '5.00', '1.10', '3.15']):
+            Order.objects.create(customer=customers[i % 3], total_amount=Decimal(amount))
+
+        self.assertEqual(len(tasks.report_partitions()), 2 + 3)
+        tasks.generate_crm_report.delay()
+
+        record = JobLog.objects.get(stream='report')
+        self.assertEqual(record.message, "Report: 3 customers, 5 orders, 40.00 revenue")
+        self.assertEqual(record.data, {'requested_at': record.data['requested_at'], 'customers': 3, 'orders': 5, 'revenue': '40.00'})
+
+    def test_empty_database_reports_zero(self):
+        tasks.generate_crm_report.delay()
+        record = JobLog.objects.get(stream='report')
+        self.assertEqual(record.message, "Report: 0 customers, 0 orders, 0.00 revenue")
+        self.assertEqual(record.level, 'info')
+
+
+class SinkTests(TestCase):
+    """File sinks append whole batches under a lock, so concurrent writers never interleave lines."""
+
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.dir = Path(log_dir.name)
+
+    def read(self, path):
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def test_concurrent_writers(self):
+        path = self.dir / 'jobs.jsonl'
+
+        def write(worker):
+            # A sink per worker: its own file handle, as in separate processes
+            sink = JSONLinesSink('jobs', path, buffer_size=50)
+            for n in range(500):
+                sink.emit('tick', 'x' * 200, worker=worker, n=n)
+            sink.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(write, range(8)))
+
+        records = self.read(path)
+        self.assertEqual(len(records), 8 * 500)
+        for worker in range(8):
+            self.assertEqual([r['n'] for r in records if r['worker'] == worker], list(range(500)))
+
+    def test_rotation(self):
+        path = self.dir / 'jobs.jsonl'
+        sink = RotatingFileSink('jobs', path, buffer_size=1, max_bytes=1000, backup_count=2)
+        for n in range(30):
+            sink.emit('tick', n=n)
+        sink.close()
+
+        files = [Path(f"{path}.2"), Path(f"{path}.1"), path]
+        self.assertFalse(Path(f"{path}.3").exists())
+        self.assertTrue(all(f.stat().st_size <= 1000 for f in files))
+        kept = [r['n'] for f in files for r in self.read(f)]
+        self.assertEqual(kept, list(range(30 - len(kept), 30)))
+
+
+@override_settings(
+    CRM_RESTOCK={'THRESHOLD': 10, 'INCREMENT_BY': 10, 'DEBOUNCE_SECONDS': 5, 'CACHE': 'default'},
+    CRM_SINKS={'low_stock': {'BACKEND': 'crm.sinks.DatabaseSink'}},
+)
+class RestockEventTests(EagerCeleryMixin, TestCase):
+    """Orders that leave a product below the threshold queue a debounced restock once committed."""
+
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.product = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=12)
+        self.other = Product.objects.create(name='Phone', price=Decimal('5.00'), stock=11)
+        cache.clear()
+
+    def order(self, product, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = schema.execute(CREATE_ORDER, context_value=SimpleNamespace(), variable_values={
+                'customer': self.customer.pk, 'product': product.pk, 'quantity': quantity,
+            })
+        self.assertTrue(result.data['createOrder']['ok'], result.data)
+
+    def test_crossing_threshold_restocks(self):
+        self.order(self.product, 5)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 17)
+        record = JobLog.objects.get(stream='low_stock')
+        self.assertEqual(record.data['products'], [{'id': self.product.pk, 'name': 'Laptop', 'stock': 17}])
+
+    def test_above_threshold_queues_nothing(self):
+        with mock.patch.object(tasks.restock_product, 'apply_async') as apply_async:
+            self.order(self.product, 2)
+        apply_async.assert_not_called()
+
+    def test_events_are_debounced_per_product(self):
+        with mock.patch.object(tasks.restock_product, 'apply_async') as apply_async:
+            self.order(self.product, 3)
+            self.order(self.product, 3)
+            self.order(self.other, 2)
+        self.assertEqual(apply_async.call_args_list, [
+            mock.call(args=[self.product.pk], countdown=5, queue='restock'),
+            mock.call(args=[self.other.pk], countdown=5, queue='restock'),
+        ])
+
+
+class RestockCacheCheckTests(TestCase):
+    """The restock debounce keys must live in a cache shared between processes."""
+
+    def errors(self, backend, alias='shared'):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}, 'shared': {'BACKEND': backend}}
+        with self.settings(CACHES=caches, CRM_RESTOCK={'CACHE': alias}):
+            return [error.id for error in checks.check_restock_cache(None)]
+
+    def test_shared_backend_passes(self):
+        self.assertEqual(self.errors('django.core.cache.backends.redis.RedisCache'), [])
+
+    def test_process_local_backend_fails(self):
+        self.assertEqual(self.errors('django.core.cache.backends.locmem.LocMemCache'), ['crm.E002'])
+        self.assertEqual(self.errors('django.core.cache.backends.dummy.DummyCache'), ['crm.E002'])
+
+    def test_unknown_alias_fails(self):
+        self.assertEqual(self.errors('django.core.cache.backends.redis.RedisCache', alias='missing'), ['crm.E001'])
+
+
+CUSTOMER_SEGMENTS = """
+query($quantiles: Int, $recency: Int) {
+  customerSegments(quantiles: $quantiles) {
+    customersWithoutOrders
+    segments { recency frequency monetary customerCount orderCount revenue }
+    customers(recency: $recency) { recencyScore frequencyScore monetaryScore totalSpent customer { name } }
+  }
+}
+"""
+
+
+@override_settings(ROOT_URLCONF='crm.urls')
+class CustomerSegmentsTests(GraphQLViewMixin, TestCase):
+    """RFM scores from RANK(): ties share a bucket and every score stays within 1..quantiles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # name: order totals, oldest customer first
+        history = {'A': ['10.00'], 'B': ['5.00', '15.00'], 'C': ['10.00', '20.00'], 'D': ['25.00'] * 4}
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        for n, (name, totals) in enumerate(history.items()):
+            customer = Customer.objects.create(name=name, email=f'{name.lower()}@example.com')
+            for amount in totals:
+                order = Order.objects.create(customer=customer, total_amount=Decimal(amount))
+                Order.objects.filter(pk=order.pk).update(order_date=start + timedelta(days=n))
+        Customer.objects.create(name='E', email='e@example.com')
+
+    def test_customers_resolve_on_both_views(self):
+        data = self.assertViewsAgree(CUSTOMER_SEGMENTS, {'quantiles': 2, 'recency': 2})
+        customers = data['customerSegments']['customers']
+        self.assertEqual([c['customer']['name'] for c in customers], ['D', 'C'])
+        self.assertEqual(data['customerSegments']['customersWithoutOrders'], 1)
+
+    def scores(self, rows):
+        return [(r['recency'], r['frequency'], r['monetary'], r['customer_count']) for r in rows]
+
+    def test_segment_counts(self):
+        segments = stats.rfm_segments(Customer.objects.all(), quantiles=2)
+        self.assertEqual(self.scores(segments), [(2, 2, 2, 1), (2, 1, 2, 1), (1, 1, 1, 2)])
+        self.assertEqual([(s['order_count'], s['revenue']) for s in segments], [
+            (4, Decimal('100.00')), (2, Decimal('30.00')), (3, Decimal('30.00')),
+        ])
+
+    def test_ties_share_a_bucket(self):
+        # B and C both placed two orders; RANK() gives them 2 and skips 3
+        rows = stats.rfm_customers(Customer.objects.all(), quantiles=4)
+        frequency = {Customer.objects.get(pk=r['customer_id']).name: r['frequency_score'] for r in rows}
+        self.assertEqual(frequency, {'A': 1, 'B': 2, 'C': 2, 'D': 4})
+
+    def test_scores_stay_within_quantiles(self):
+        for quantiles in (1, 3, 4, 100):
+            with self.subTest(quantiles=quantiles):
+                for row in stats.rfm_customers(Customer.objects.all(), quantiles=quantiles):
+                    for metric in ('recency_score', 'frequency_score', 'monetary_score'):
+                        self.assertTrue(1 <= row[metric] <= quantiles, row)
+
+    def test_score_filters(self):
+        def names(**scores):
+            rows = stats.rfm_customers(Customer.objects.all(), quantiles=2, **scores)
+            return [Customer.objects.get(pk=r['customer_id']).name for r in rows]
+
+        self.assertEqual(names(recency=2), ['D', 'C'])
+        self.assertEqual(names(frequency=1, monetary=1), ['B', 'A'])
+        self.assertEqual(names(recency=1, monetary=2), [])
+
+    def test_customer_filters_are_applied(self):
+        customers = Customer.objects.exclude(name='D')
+        self.assertEqual(self.scores(stats.rfm_segments(customers, quantiles=2)), [(2, 1, 2, 1), (1, 1, 1, 2)])
+        self.assertEqual(stats.customers_without_orders(customers), 1)
+        self.assertEqual(stats.customers_without_orders(customers.exclude(name='E')), 0)
+
+
+@override_settings(ROOT_URLCONF='crm.urls', GRAPHQL_RESPONSE_CACHE={'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 300})
+class ResponseCacheTests(GraphQLViewMixin, TestCase):
+    """Cached results go stale when a model they read changes, including models only their filters join."""
+
+    ORDERS_BY_CUSTOMER = """
+    query($name: String) { ordersConnection(customerName: $name) { edges { node { totalAmount } } } }
+    """
+    STATS_BY_PRODUCT = """
+    query($name: String) { crmStats(productName: $name) { orderCount } }
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.product = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=5)
+        order = Order.objects.create(customer=self.customer)
+        order.products.add(self.product, through_defaults={'quantity': 1, 'unit_price': self.product.price})
+
+    def test_renamed_customer_leaves_customer_name_filter(self):
+        for path in self.VIEWS:
+            with self.subTest(path=path):
+                self.customer.name = 'Alice'
+                self.customer.save()
+                edges = self.graphql(self.ORDERS_BY_CUSTOMER, {'name': 'alice'}, path)['data']['ordersConnection']['edges']
+                self.assertEqual(len(edges), 1)
+
+                self.customer.name = 'Bob'
+                self.customer.save()
+                edges = self.graphql(self.ORDERS_BY_CUSTOMER, {'name': 'alice'}, path)['data']['ordersConnection']['edges']
+                self.assertEqual(edges, [])
+
+    def test_renamed_product_leaves_product_name_filter(self):
+        self.assertEqual(self.graphql(self.STATS_BY_PRODUCT, {'name': 'lap'})['data']['crmStats']['orderCount'], 1)
+        self.product.name = 'Phone'
+        self.product.save()
+        self.assertEqual(self.graphql(self.STATS_BY_PRODUCT, {'name': 'lap'})['data']['crmStats']['orderCount'], 0)
+
+    def test_unrelated_writes_keep_entries(self):
+        self.graphql(self.ORDERS_BY_CUSTOMER, {'name': 'alice'})
+        with mock.patch('crm.schema.CRMConnectionField.connection_resolver') as resolver:
+            Product.objects.create(name='Phone', price=Decimal('5.00'), stock=5)
+            self.graphql(self.ORDERS_BY_CUSTOMER, {'name': 'alice'})
+        resolver.assert_not_called()
+
+
+@override_settings(ROOT_URLCONF='crm.urls')
+class QueryCostTests(GraphQLViewMixin, TestCase):
+    """Operations are costed from the AST; over MAX_COST or MAX_DEPTH they are rejected before any SQL."""
+
+    NESTED = "{ allCustomers { orders { edges { node { items { product { name } } } } } } }"
+
+    @classmethod
+    def setUpTestData(cls):
+        Customer.objects.bulk_create(Customer(name=f'C{i}', email=f'c{i}@example.com') for i in range(100))
+
+    def cost(self, query, variables=None):
+        return estimate_cost(schema.graphql_schema, parse(query), variables=variables)
+
+    def test_default_budget_accepts_nested_lists(self):
+        cost = self.cost(self.NESTED)
+        # 100 customers (the table) x 10 orders x 5 items, each with its product
+        self.assertEqual(cost.cost, 100 * (1 + 10 * (1 + 5 * (1 + 1))))
+        self.assertEqual(cost.errors, [])
+        self.assertNotIn('errors', self.graphql(self.NESTED))
+
+    def test_boundary(self):
+        with override_settings(GRAPHQL_QUERY_COST={'MAX_COST': 11100}):
+            self.assertNotIn('errors', self.graphql(self.NESTED))
+        with override_settings(GRAPHQL_QUERY_COST={'MAX_COST': 11099}):
+            self.cost(self.NESTED)  # table size estimated once, then reused
+            with self.assertNumQueries(0):
+                result = self.graphql(self.NESTED)
+        self.assertEqual([e['extensions']['code'] for e in result['errors']], ['QUERY_TOO_COMPLEX'])
+        self.assertEqual(result['extensions']['cost']['requested'], 11100)
+
+    @override_settings(GRAPHQL_QUERY_COST={'MAX_COST': 150})
+    def test_unpaginated_root_list_priced_at_table_size(self):
+        self.assertEqual(self.cost('{ customersConnection { edges { node { name } } } }').cost, 100)
+        self.assertEqual(self.cost('{ allCustomers { name } }').cost, 100)
+        Customer.objects.bulk_create(Customer(name=f'D{i}', email=f'd{i}@example.com') for i in range(100))
+        with override_settings(GRAPHQL_QUERY_COST={'MAX_COST': 150}):  # drops the cached size
+            for path in self.VIEWS:
+                result = self.graphql('{ allCustomers { name } }', path=path)
+                self.assertEqual([e['extensions']['code'] for e in result['errors']], ['QUERY_TOO_COMPLEX'])
+                self.assertEqual(result['extensions']['cost']['requested'], 200)
+            # The connection is capped at max_limit whatever the table size
+            self.assertNotIn('errors', self.graphql('{ customersConnection { edges { node { name } } } }'))
+
+    def test_row_estimates_override_table_size(self):
+        with override_settings(GRAPHQL_QUERY_COST={'ROW_ESTIMATES': {'Query.allOrders': 50_000}}):
+            self.assertEqual(self.cost('{ allOrders { id } }').cost, 50_000)
+
+    def test_fragments_cost_the_same(self):
+        query = """
+        { allCustomers { ...CustomerOrders } }
+        fragment CustomerOrders on CustomerType { orders { edges { node { ... on OrderNode { items { ...Line } } } } } }
+        fragment Line on OrderItemType { product { name } }
+        """
+        self.assertEqual(self.cost(query).cost, self.cost(self.NESTED).cost)
+
+    def test_first_from_variables(self):
+        query = """
+        query($first: Int, $orders: Int) {
+          customersConnection(first: $first) { edges { node { orders(first: $orders) { edges { node { id } } } } } }
+        }
+        """
+        self.assertEqual(self.cost(query, {'first': 10, 'orders': 3}).cost, 10 * (1 + 3))
+        self.assertEqual(self.cost(query, {'first': 20, 'orders': 3}).cost, 20 * (1 + 3))
+
+    def test_depth(self):
+        query = """
+        { allOrders { customer { orders(first: 1) { edges { node {
+          customer { orders(first: 1) { edges { node { customer { name } } } } }
+        } } } } } }
+        """
+        self.assertEqual(self.cost(query).depth, 6)
+        with override_settings(GRAPHQL_QUERY_COST={'MAX_COST': None, 'MAX_DEPTH': 5}):
+            result = self.graphql(query)
+        self.assertEqual([e['extensions']['code'] for e in result['errors']], ['QUERY_TOO_DEEP'])
+
+
+class RestockTests(TestCase):
+    """restock_low_stock re-checks the threshold when it writes, so racing restocks apply once."""
+
+    def setUp(self):
+        self.low = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=2)
+        self.full = Product.objects.create(name='Phone', price=Decimal('5.00'), stock=50)
+
+    def test_restocks_only_low_products(self):
+        for chunk_size in (None, 1):
+            with self.subTest(chunk_size=chunk_size):
+                Product.objects.filter(pk=self.low.pk).update(stock=2)
+                updated = inventory.restock_low_stock(increment_by=10, threshold=10, chunk_size=chunk_size)
+                self.assertEqual([(p.pk, p.stock) for p in updated], [(self.low.pk, 12)])
+                self.full.refresh_from_db()
+                self.assertEqual(self.full.stock, 50)
+
+    def test_racing_restock_is_not_applied_twice(self):
+        restock_ids = inventory._restock_ids
+
+        def race(ids, increment_by, threshold):
+            # Another worker restocks the product after this chunk read its id
+            Product.objects.filter(pk=self.low.pk).update(stock=F('stock') + 10)
+            return restock_ids(ids, increment_by, threshold)
+
+        for returning in (True, False):
+            with self.subTest(returning=returning):
+                Product.objects.filter(pk=self.low.pk).update(stock=2)
+                with mock.patch.object(inventory, 'supports_update_returning', return_value=returning), \
+                        mock.patch.object(inventory, '_restock_ids', side_effect=race):
+                    updated = inventory.restock_low_stock(increment_by=10, threshold=10, chunk_size=10)
+                self.assertEqual(updated, [])
+                self.low.refresh_from_db()
+                self.assertEqual(self.low.stock, 12)
+
+
+CREATE_ORDERS = """
+mutation($input: [OrderInput!]!) {
+  createOrders(input: $input) { ok message orders { totalAmount } errors { index message } }
+}
+"""
+
+
+class CreateOrdersTests(TestCase):
+    """Bulk orders report errors per row, including rows that lose a stock race."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.product = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=5)
+
+    def create_orders(self, *quantities):
+        rows = [
+            {'customerId': self.customer.pk, 'productId': self.product.pk, 'quantity': quantity}
+            for quantity in quantities
+        ]
+        result = schema.execute(CREATE_ORDERS, context_value=SimpleNamespace(), variable_values={'input': rows})
+        self.assertIsNone(result.errors)
+        return result.data['createOrders']
+
+    def test_validation_errors_per_row(self):
+        data = self.create_orders(2, 0, 2, 2)
+        self.assertEqual(data['errors'], [
+            {'index': 1, 'message': 'Quantity must be positive'},
+            {'index': 3, 'message': 'Not enough stock'},
+        ])
+        self.assertEqual([o['totalAmount'] for o in data['orders']], ['20.00', '20.00'])
+        self.assertEqual(data['message'], 'Created 2 of 4 rows')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_stock_taken_concurrently_rejects_only_overselling_rows(self):
+        persist = bulk_persist
+
+        def race(rows, save_chunk, errors):
+            # Another checkout takes 2 units after the batch read the stock
+            Product.objects.filter(pk=self.product.pk).update(stock=F('stock') - 2)
+            return persist(rows, save_chunk, errors)
+
+        with mock.patch('crm.schema.bulk_persist', side_effect=race):
+            data = self.create_orders(1, 3, 1)
+        self.assertEqual(data['errors'], [{'index': 1, 'message': 'Not enough stock'}])
+        self.assertEqual(len(data['orders']), 2)
+        self.assertEqual(OrderItem.objects.filter(product=self.product).count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+
+CRM_STATS = """
+query($customerName: String) { crmStats(customerName: $customerName) { customerCount orderCount revenueSum } }
+"""
+
+
+class CRMStatsTests(TestCase):
+    """Every crmStats figure covers the orders matching the filters."""
+
+    def setUp(self):
+        alice = Customer.objects.create(name='Alice', email='alice@example.com')
+        bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        Customer.objects.create(name='Carol', email='carol@example.com')
+        for customer, amount in ((alice, '10.00'), (alice, '5.00'), (bob, '7.50')):
+            Order.objects.create(customer=customer, total_amount=Decimal(amount))
+
+    def stats(self, **variables):
+        result = schema.execute(CRM_STATS, context_value=SimpleNamespace(), variable_values=variables)
+        self.assertIsNone(result.errors)
+        return result.data['crmStats']
+
+    def test_unfiltered(self):
+        self.assertEqual(self.stats(), {'customerCount': 2, 'orderCount': 3, 'revenueSum': '22.50'})
+
+    def test_customer_count_follows_filters(self):
+        self.assertEqual(self.stats(customerName='ali'), {'customerCount': 1, 'orderCount': 2, 'revenueSum': '15.00'})
+        self.assertEqual(self.stats(customerName='carol'), {'customerCount': 0, 'orderCount': 0, 'revenueSum': '0.00'})
+
+
+NESTED_CUSTOMERS = """
+{ allCustomers { name orders { edges { node { id products { edges { node { name } } } } } } } }
+"""
+
+
+class LoaderQueryCountTests(TestCase):
+    """Nested relations resolve with one batched query per level, however many rows there are."""
+
+    def add_customers(self, count):
+        for _ in range(count):
+            n = Customer.objects.count()
+            customer = Customer.objects.create(name=f'Customer {n}', email=f'customer{n}@example.com')
+            product = Product.objects.create(name=f'Product {n}', price=Decimal('1.00'), stock=100)
+            for _ in range(2):
+                order = Order.objects.create(customer=customer)
+                OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+    def execute(self, query):
+        result = schema.execute(query, context_value=SimpleNamespace())
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # customers, their orders, and the order items with products joined
+        self.add_customers(2)
+        with self.assertNumQueries(3):
+            self.execute(NESTED_CUSTOMERS)
+        self.add_customers(6)
+        with self.assertNumQueries(3):
+            data = self.execute(NESTED_CUSTOMERS)
+        self.assertEqual(len(data['allCustomers']), 8)
+        for customer in data['allCustomers']:
+            n = customer['name'].split()[-1]
+            orders = customer['orders']['edges']
+            self.assertEqual(len(orders), 2)
+            for order in orders:
+                self.assertEqual(order['node']['products']['edges'], [{'node': {'name': f'Product {n}'}}])
+
+    def test_order_customer_uses_one_batch(self):
+        self.add_customers(5)
+        with self.assertNumQueries(2):
+            data = self.execute('{ allOrders { id items { quantity } customer { email } } }')
+        self.assertEqual(len({o['customer']['email'] for o in data['allOrders']}), 5)
+
+
+class QueryOptimizerTests(TestCase):
+    """Connections and lists select only the requested columns and join forward relations."""
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        product = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=100)
+        for _ in range(3):
+            order = Order.objects.create(customer=customer)
+            OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+    def captured(self, query):
+        with CaptureQueriesContext(connection) as ctx:
+            result = schema.execute(query, context_value=SimpleNamespace())
+        self.assertIsNone(result.errors)
+        return result.data, [q['sql'] for q in ctx.captured_queries]
+
+    def test_connection_joins_customer_and_narrows_columns(self):
+        data, queries = self.captured("""
+        { ordersConnection(first: 10) { edges { node { ...OrderFields } } } }
+        fragment OrderFields on OrderNode { id customer { name } }
+        """)
+        self.assertEqual([e['node']['customer']['name'] for e in data['ordersConnection']['edges']], ['Alice'] * 3)
+        count, page = queries
+        self.assertIn('COUNT(*)', count)
+        self.assertIn('JOIN "crm_customer"', page)
+        self.assertIn('"crm_customer"."name"', page)
+        self.assertNotIn('"crm_customer"."email"', page)
+        self.assertNotIn('total_amount', page)
+
+    def test_list_prefetches_products_with_selected_columns(self):
+        data, queries = self.captured('{ allOrders { totalAmount products { edges { node { name } } } } }')
+        self.assertEqual(len(queries), 2)
+        self.assertIn('total_amount', queries[0])
+        self.assertNotIn('order_date', queries[0])
+        self.assertIn('"crm_product"."name"', queries[1])
+        self.assertNotIn('"crm_product"."price"', queries[1])
+        self.assertEqual(data['allOrders'][0]['products']['edges'], [{'node': {'name': 'Laptop'}}])
+
+
+KEYSET_ORDERS = """
+query($first: Int, $after: String, $last: Int, $before: String, $orderBy: String) {
+  ordersConnection(keyset: true, first: $first, after: $after, last: $last, before: $before, orderBy: $orderBy) {
+    edges { node { totalAmount } }
+    pageInfo { startCursor endCursor hasNextPage hasPreviousPage }
+  }
+}
+"""
+
+
+class KeysetPaginationTests(TestCase):
+    """keyset: true pages on (order_date, id), breaking order_date ties by id."""
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        day = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        # Orders 1-3 share a timestamp; 0 is newest, so key order is 1, 2, 3, 4, 0
+        dates = [day + timedelta(days=5), day, day, day, day + timedelta(days=1)]
+        for n, date in enumerate(dates):
+            order = Order.objects.create(customer=customer, total_amount=Decimal(n))
+            Order.objects.filter(pk=order.pk).update(order_date=date)
+
+    def page(self, **variables):
+        result = schema.execute(KEYSET_ORDERS, context_value=SimpleNamespace(), variable_values=variables)
+        self.assertIsNone(result.errors)
+        connection = result.data['ordersConnection']
+        return [int(Decimal(e['node']['totalAmount'])) for e in connection['edges']], connection['pageInfo']
+
+    def test_forward_round_trip(self):
+        seen, after = [], None
+        with CaptureQueriesContext(connection) as ctx:
+            while True:
+                amounts, info = self.page(first=2, after=after)
+                seen += amounts
+                if not info['hasNextPage']:
+                    break
+                after = info['endCursor']
+        self.assertEqual(seen, [1, 2, 3, 4, 0])
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+    def test_backward_from_cursor(self):
+        _, info = self.page(first=3)
+        amounts, info = self.page(last=2, before=info['endCursor'])
+        self.assertEqual(amounts, [1, 2])
+        self.assertFalse(info['hasPreviousPage'])
+        self.assertTrue(info['hasNextPage'])
+
+    def walk(self, **variables):
+        seen, after = [], None
+        while True:
+            amounts, info = self.page(first=2, after=after, **variables)
+            seen += amounts
+            if not info['hasNextPage']:
+                return seen
+            after = info['endCursor']
+
+    def test_order_by_builds_the_keyset(self):
+        self.assertEqual(self.walk(orderBy='-totalAmount'), [4, 3, 2, 1, 0])
+        # Equal totals fall back to id order
+        Order.objects.filter(total_amount__in=[1, 3]).update(total_amount=2)
+        self.assertEqual(self.walk(orderBy='-totalAmount'), [4, 2, 2, 2, 0])
+        self.assertEqual(self.walk(orderBy='totalAmount,-orderDate'), [0, 2, 2, 2, 4])
+        _, info = self.page(first=4, orderBy='-totalAmount')
+        amounts, _ = self.page(last=2, before=info['endCursor'], orderBy='-totalAmount')
+        self.assertEqual(amounts, [2, 2])
+
+    def test_order_by_matches_offset_pagination(self):
+        query = '{ ordersConnection(orderBy: "-totalAmount") { edges { node { totalAmount } } } }'
+        result = schema.execute(query, context_value=SimpleNamespace())
+        self.assertIsNone(result.errors)
+        self.assertEqual([int(Decimal(e['node']['totalAmount'])) for e in result.data['ordersConnection']['edges']],
+                         [4, 3, 2, 1, 0])
+
+    def test_unsupported_order_by_and_foreign_cursor_rejected(self):
+        result = schema.execute(KEYSET_ORDERS, context_value=SimpleNamespace(), variable_values={'orderBy': 'customer'})
+        self.assertIn("Cannot order by 'customer'", result.errors[0].message)
+        _, info = self.page(first=1)
+        result = schema.execute(KEYSET_ORDERS, context_value=SimpleNamespace(),
+                                variable_values={'after': info['endCursor'], 'orderBy': '-totalAmount'})
+        self.assertIn('Invalid keyset cursor', result.errors[0].message)
+
+    def test_invalid_cursor_and_offset_rejected(self):
+        result = schema.execute(KEYSET_ORDERS, context_value=SimpleNamespace(), variable_values={'after': 'bogus'})
+        self.assertIn('Invalid keyset cursor', result.errors[0].message)
+        result = schema.execute('{ ordersConnection(keyset: true, offset: 2) { edges { cursor } } }',
+                                context_value=SimpleNamespace())
+        self.assertIn('`offset` cannot be combined', result.errors[0].message)
+
+
+CREATE_CUSTOMERS = """
+mutation($input: [CustomerInput!]!) {
+  createCustomers(input: $input) { ok message customers { email } errors { index message } }
+}
+"""
+
+CREATE_PRODUCTS = """
+mutation($input: [ProductInput!]!) {
+  createProducts(input: $input) { ok message products { name stock } errors { index message } }
+}
+"""
+
+
+class BulkCreateTests(TestCase):
+    """createCustomers and createProducts save the valid rows and report the rest by index."""
+
+    def execute(self, mutation, rows):
+        result = schema.execute(mutation, context_value=SimpleNamespace(), variable_values={'input': rows})
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_customers_per_row_errors(self):
+        Customer.objects.create(name='Alice', email='alice@example.com')
+        data = self.execute(CREATE_CUSTOMERS, [
+            {'name': 'Alice', 'email': 'ALICE@example.com'},
+            {'name': 'Bob', 'email': 'bob@example.com', 'phone': '123-456-7890'},
+            {'name': 'Bob again', 'email': 'Bob@example.com'},
+            {'name': 'Carol', 'email': 'carol@example.com', 'phone': 'not a phone'},
+            {'name': 'Dave', 'email': 'dave@example.com'},
+        ])['createCustomers']
+        self.assertFalse(data['ok'])
+        self.assertEqual(data['message'], 'Created 2 of 5 rows')
+        self.assertEqual(data['customers'], [{'email': 'bob@example.com'}, {'email': 'dave@example.com'}])
+        self.assertEqual(data['errors'], [
+            {'index': 0, 'message': 'Email already exists'},
+            {'index': 2, 'message': 'Email already exists'},
+            {'index': 3, 'message': 'Invalid phone format'},
+        ])
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_products_per_row_errors(self):
+        data = self.execute(CREATE_PRODUCTS, [
+            {'name': 'Laptop', 'price': '999.99', 'stock': 20},
+            {'name': 'Free', 'price': '-1'},
+            {'name': 'Mouse', 'price': '19.99'},
+            {'name': 'Ghost', 'price': '5', 'stock': -3},
+        ])['createProducts']
+        self.assertEqual(data['products'], [{'name': 'Laptop', 'stock': 20}, {'name': 'Mouse', 'stock': 0}])
+        self.assertEqual(data['errors'], [
+            {'index': 1, 'message': 'Price must be non-negative'},
+            {'index': 3, 'message': 'Stock must be non-negative'},
+        ])
+
+    def test_failing_chunk_is_rolled_back_and_reported(self):
+        def save_chunk(chunk):
+            Customer.objects.bulk_create([Customer(name='Erin', email='erin@example.com')])
+            Customer.objects.bulk_create([Customer(name='Erin', email='erin@example.com')])
+
+        errors = []
+        self.assertEqual(bulk_persist([(0, None), (1, None)], save_chunk, errors), [])
+        self.assertEqual([e.index for e in errors], [0, 1])
+        self.assertFalse(Customer.objects.exists())
+
+
+class OrderTotalTests(TestCase):
+    """Order.total_amount follows every change to the order's lines."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.laptop = Product.objects.create(name='Laptop', price=Decimal('999.99'), stock=100)
+        self.mouse = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=100)
+        self.order = Order.objects.create(customer=self.customer)
+
+    def total(self, order=None):
+        return Order.objects.values_list('total_amount', flat=True).get(pk=(order or self.order).pk)
+
+    def add(self, order, product, quantity=1):
+        order.products.add(product, through_defaults={'quantity': quantity, 'unit_price': product.price})
+
+    def test_add_and_remove(self):
+        self.add(self.order, self.laptop)
+        self.add(self.order, self.mouse, quantity=3)
+        self.assertEqual(self.total(), Decimal('1059.99'))
+        self.assertEqual(self.order.total_amount, Decimal('1059.99'))
+        self.order.products.remove(self.laptop)
+        self.assertEqual(self.total(), Decimal('60.00'))
+        self.order.products.clear()
+        self.assertEqual(self.total(), Decimal('0.00'))
+
+    def test_reverse_remove_and_clear(self):
+        other = Order.objects.create(customer=self.customer)
+        for order in (self.order, other):
+            self.add(order, self.laptop)
+            self.add(order, self.mouse)
+        self.mouse.orders.remove(self.order)
+        self.assertEqual(self.total(), Decimal('999.99'))
+        self.assertEqual(self.total(other), Decimal('1019.99'))
+        self.laptop.orders.clear()
+        self.assertEqual(self.total(), Decimal('0.00'))
+        self.assertEqual(self.total(other), Decimal('20.00'))
+
+    def test_item_edits(self):
+        self.add(self.order, self.mouse)
+        item = self.order.items.get()
+        item.quantity = 4
+        item.save()
+        self.assertEqual(self.total(), Decimal('80.00'))
+        OrderItem.objects.create(order=self.order, product=self.laptop, quantity=1, unit_price=Decimal('900.00'))
+        self.assertEqual(self.total(), Decimal('980.00'))
+
+    def test_item_deletes(self):
+        self.add(self.order, self.laptop)
+        self.add(self.order, self.mouse, quantity=2)
+        self.order.items.get(product=self.laptop).delete()
+        self.assertEqual(self.total(), Decimal('40.00'))
+        OrderItem.objects.filter(order=self.order).delete()
+        self.assertEqual(self.total(), Decimal('0.00'))
+
+    def test_recompute_command(self):
+        self.add(self.order, self.laptop, quantity=2)
+        Order.objects.update(total_amount=0)
+        call_command('recompute_order_totals', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.total(), Decimal('1999.98'))
+
+
+class OrderItemTests(TestCase):
+    """Order lines keep the quantity and the unit price charged when the order was placed."""
+
+    def test_price_snapshot(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        product = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=100)
+        result = schema.execute(CREATE_ORDER, context_value=SimpleNamespace(),
+                                variable_values={'customer': customer.pk, 'product': product.pk, 'quantity': 3})
+        self.assertTrue(result.data['createOrder']['ok'])
+
+        Product.objects.filter(pk=product.pk).update(price=Decimal('25.00'))
+        result = schema.execute(
+            '{ allOrders { totalAmount items { quantity unitPrice lineTotal product { name price } } } }',
+            context_value=SimpleNamespace(),
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['allOrders'], [{
+            'totalAmount': '60.00',
+            'items': [{'quantity': 3, 'unitPrice': '20.00', 'lineTotal': '60.00', 'product': {'name': 'Mouse', 'price': '25.00'}}],
+        }])
+
+    def test_one_line_per_product(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        product = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=100)
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OrderItem.objects.create(order=order, product=product, quantity=2, unit_price=product.price)
+
+
+class OrderFilterSemiJoinTests(TestCase):
+    """Product filters on orders match each order once, without DISTINCT."""
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.products = [
+            Product.objects.create(name=name, price=Decimal('1.00'), stock=100)
+            for name in ('Laptop Pro', 'Laptop Air', 'Mouse')
+        ]
+        self.both_laptops = Order.objects.create(customer=customer)
+        self.mouse_only = Order.objects.create(customer=customer)
+        self.laptop_and_mouse = Order.objects.create(customer=customer)
+        for order, products in (
+            (self.both_laptops, self.products[:2]),
+            (self.mouse_only, self.products[2:]),
+            (self.laptop_and_mouse, self.products[::2]),
+        ):
+            for product in products:
+                OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+    def filter(self, **data):
+        filterset = OrderFilter(data=data, queryset=Order.objects.order_by('pk'))
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        sql = str(filterset.qs.query)
+        self.assertNotIn('DISTINCT', sql)
+        # The outer query reads crm_order alone; line items only appear in the subquery
+        self.assertIn('FROM "crm_order" WHERE', sql)
+        return list(filterset.qs)
+
+    def test_product_name(self):
+        self.assertEqual(self.filter(product_name='laptop'), [self.both_laptops, self.laptop_and_mouse])
+        self.assertEqual(self.filter(product_name='mouse'), [self.mouse_only, self.laptop_and_mouse])
+
+    def test_product_id(self):
+        self.assertEqual(self.filter(product_id=self.products[0].pk), [self.both_laptops, self.laptop_and_mouse])
+
+    def test_connection_pages_each_order_once(self):
+        result = schema.execute(
+            '{ ordersConnection(productName: "laptop", first: 1) { pageInfo { hasNextPage } edges { node { id } } } }',
+            context_value=SimpleNamespace(),
+        )
+        self.assertIsNone(result.errors)
+        self.assertTrue(result.data['ordersConnection']['pageInfo']['hasNextPage'])
+        result = schema.execute(
+            '{ ordersConnection(productName: "laptop", first: 2) { pageInfo { hasNextPage } edges { node { id } } } }',
+            context_value=SimpleNamespace(),
+        )
+        self.assertFalse(result.data['ordersConnection']['pageInfo']['hasNextPage'])
+        self.assertEqual(len(result.data['ordersConnection']['edges']), 2)
+
+
+@override_settings(ROOT_URLCONF='crm.urls')
+class PersistedQueryTests(GraphQLViewMixin, TestCase):
+    """Persisted queries by sha256 hash, and the LRU of validated documents."""
+
+    QUERY = '{ hello }'
+
+    def setUp(self):
+        cache.clear()
+        document_cache.clear()
+
+    def post(self, sha, query=None, path='/graphql'):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha}}}
+        if query is not None:
+            body['query'] = query
+        response = self.client.post(path, json.dumps(body), content_type='application/json')
+        return response.json()
+
+    def error_code(self, result):
+        return result['errors'][0]['extensions']['code']
+
+    def test_register_then_run_by_hash(self):
+        sha = query_hash(self.QUERY)
+        for path in self.VIEWS:
+            self.assertEqual(self.error_code(self.post(sha, path=path)), 'PERSISTED_QUERY_NOT_FOUND')
+        self.assertEqual(self.post(sha, self.QUERY)['data'], {'hello': 'Hello, GraphQL!'})
+        for path in self.VIEWS:
+            self.assertEqual(self.post(sha, path=path)['data'], {'hello': 'Hello, GraphQL!'})
+
+    def test_hash_mismatch(self):
+        for path in self.VIEWS:
+            result = self.post(query_hash('{ other }'), self.QUERY, path=path)
+            self.assertEqual(self.error_code(result), 'INVALID_PERSISTED_QUERY')
+        self.assertEqual(self.error_code(self.post(query_hash(self.QUERY))), 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_repeated_operations_reuse_the_document(self):
+        for _ in range(3):
+            self.graphql(self.QUERY)
+        stats = document_cache.stats()
+        self.assertEqual((stats['entries'], stats['misses'], stats['hits']), (1, 1, 2))
+        self.assertIn('errors', self.graphql('{ nope }'))
+        self.assertEqual(document_cache.stats()['entries'], 1)
+
+    def test_lru_eviction(self):
+        lru = DocumentCache(max_entries=2, max_bytes=100)
+        lru.set('a', 'A', 10)
+        lru.set('b', 'B', 10)
+        lru.get('a')
+        lru.set('c', 'C', 10)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), ('A', None, 'C'))
+        lru.set('d', 'D', 95)
+        self.assertEqual((lru.get('a'), lru.get('c'), lru.get('d')), (None, None, 'D'))
+        lru.set('e', 'E', 101)
+        self.assertIsNone(lru.get('e'))
+        self.assertEqual(lru.stats()['evictions'], 3)
+
+
+@override_settings(ROOT_URLCONF='crm.urls')
+class AsyncViewParityTests(GraphQLViewMixin, TestCase):
+    """/graphql/async answers every query exactly like /graphql."""
+
+    QUERIES = [
+        '{ customer { name } product { name } order { totalAmount customer { name } } }',
+        '{ allCustomers { name orders { edges { node { totalAmount items { quantity product { name } } } } } } }',
+        '{ allOrders { totalAmount customer { email } products { edges { node { name price } } } } }',
+        '{ allProducts { name orders { edges { node { customer { name } } } } } }',
+        '{ ordersConnection(first: 2, productName: "laptop") '
+        '{ pageInfo { hasNextPage endCursor } edges { node { totalAmount customer { name } } } } }',
+        '{ customersConnection(keyset: true, first: 1) { pageInfo { hasNextPage } edges { cursor node { name } } } }',
+        '{ crmStats(customerName: "a") { customerCount orderCount revenueSum periods { orderCount revenue } } }',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        alice = Customer.objects.create(name='Alice', email='alice@example.com')
+        bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        laptop = Product.objects.create(name='Laptop', price=Decimal('999.99'), stock=100)
+        mouse = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=100)
+        for customer, products in ((alice, [laptop, mouse]), (alice, [mouse]), (bob, [laptop])):
+            order = Order.objects.create(customer=customer)
+            for product in products:
+                order.products.add(product, through_defaults={'quantity': 2, 'unit_price': product.price})
+
+    def test_queries_agree(self):
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                self.assertTrue(self.assertViewsAgree(query))
+
+    def test_mutations_fall_back_to_the_sync_view(self):
+        result = self.graphql(
+            'mutation { createCustomer(input: {name: "Carol", email: "carol@example.com"}) { ok } }',
+            path='/graphql/async',
+        )
+        self.assertEqual(result['data'], {'createCustomer': {'ok': True}})
+        self.assertTrue(Customer.objects.filter(email='carol@example.com').exists())
+
+    def test_errors_agree(self):
+        results = [self.graphql('{ customer { nope } }', path=path) for path in self.VIEWS]
+        self.assertIn('errors', results[0])
+        self.assertEqual(results[0], results[1])
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 300})
+    def test_cache_calls_stay_off_the_event_loop(self):
+        cache.clear()
+        on_loop, calls = [], []
+
+        def spy(name):
+            original = getattr(LocMemCache, name)
+
+            def method(backend, *args, **kwargs):
+                calls.append(name)
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    pass
+                else:
+                    on_loop.append(name)
+                return original(backend, *args, **kwargs)
+            return method
+
+        query = '{ allCustomers { name } }'
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+        with mock.patch.multiple(LocMemCache, **{name: spy(name) for name in ('get', 'get_many', 'set')}):
+            for body in ({'query': query, 'extensions': extensions}, {'extensions': extensions}):
+                response = self.client.post('/graphql/async', json.dumps(body), content_type='application/json')
+                self.assertEqual(len(response.json()['data']['allCustomers']), 2)
+        # The persisted query and the response were stored, then both read back
+        self.assertEqual(calls.count('set'), 2)
+        self.assertGreaterEqual(calls.count('get'), 2)
+        self.assertEqual(on_loop, [])
+
+
+@override_settings(
+    ROOT_URLCONF='crm.urls', INTERNAL_IPS=['127.0.0.1'],
+    GRAPHQL_INSTRUMENTATION={'SAMPLE_RATE': 0.0, 'MAX_OPERATIONS': 2},
+)
+class InstrumentationTests(GraphQLViewMixin, TestCase):
+    """Debug-header requests report resolver and SQL timing; traces feed the Prometheus histograms."""
+
+    QUERY = 'query Customers { allCustomers { name orders { edges { node { totalAmount } } } } }'
+
+    def setUp(self):
+        customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        Order.objects.create(customer=customer)
+        self.metrics = MetricsRegistry()
+        patcher = mock.patch('crm.views.metrics', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def traced(self, path, query=QUERY, operation_name=None, **extra):
+        body = {'query': query}
+        if operation_name:
+            body['operationName'] = operation_name
+        response = self.client.post(
+            path, json.dumps(body), content_type='application/json', headers={'X-GraphQL-Debug': '1'}, **extra,
+        )
+        return response.json().get('extensions', {}).get('timing')
+
+    def test_debug_header_reports_timing(self):
+        for path in self.VIEWS:
+            with self.subTest(path=path):
+                timing = self.traced(path)
+                self.assertEqual(timing['operation'], 'Customers')
+                self.assertEqual(timing['sqlQueries'], 2)
+                paths = {field['path']: field['calls'] for field in timing['fields']}
+                self.assertEqual(paths['allCustomers'], 1)
+                self.assertEqual(paths['allCustomers.orders.edges.node.totalAmount'], 1)
+
+    def test_untraced_requests_have_no_timing(self):
+        self.assertNotIn('timing', self.graphql(self.QUERY).get('extensions', {}))
+        self.assertEqual(self.metrics.export().count('_count'), 0)
+
+    def test_metrics_export(self):
+        self.traced('/graphql')
+        self.traced('/graphql/async')
+        response = self.client.get('/graphql/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('graphql_operation_duration_seconds_count{operation="Customers"} 2', body)
+        self.assertIn('graphql_operation_sql_queries_bucket{operation="Customers",le="2"} 2', body)
+        self.assertIn('graphql_field_duration_seconds_count{field="Query.allCustomers"} 2', body)
+        self.assertEqual(self.client.get('/graphql/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    def test_debug_header_ignored_for_other_clients(self):
+        for path in self.VIEWS:
+            self.assertIsNone(self.traced(path, REMOTE_ADDR='203.0.113.9'))
+        self.assertEqual(self.metrics.export().count('_count'), 0)
+
+    def test_operation_labels_are_bounded(self):
+        for name in ('A', 'B', 'C', 'D'):
+            self.traced('/graphql', f'query {name} {{ hello }}')
+        # A name the document does not define is not a label either
+        self.traced('/graphql', self.QUERY, operation_name='Injected')
+        body = self.client.get('/graphql/metrics').content.decode()
+        counts = {
+            line.split('"')[1]: line.rsplit(' ', 1)[1]
+            for line in body.splitlines() if line.startswith('graphql_operation_duration_seconds_count')
+        }
+        self.assertEqual(counts, {'A': '1', 'B': '1', 'anonymous': '1', 'other': '2'})
+
+
+@override_settings(ROOT_URLCONF='crm.urls')
+class ExportTests(TestCase):
+    """Filtered exports stream as CSV or NDJSON; bad formats and filters get a 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        alice = Customer.objects.create(name='Alice', email='alice@example.com', phone='+123456789')
+        bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        laptop = Product.objects.create(name='Laptop', price=Decimal('999.99'), stock=100)
+        mouse = Product.objects.create(name='Mouse', price=Decimal('20.00'), stock=100)
+        for customer, products in ((alice, [laptop, mouse]), (bob, [mouse]), (alice, [])):
+            order = Order.objects.create(customer=customer)
+            for product in products:
+                order.products.add(product, through_defaults={'quantity': 1, 'unit_price': product.price})
+        cls.orders = list(Order.objects.order_by('pk'))
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_orders_csv(self):
+        response = self.client.get('/export/orders', {'customerName': 'ali'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.csv"')
+        rows = list(csv.reader(StringIO(self.content(response))))
+        self.assertEqual(rows[0], [
+            'id', 'order_date', 'customer_id', 'customer_name', 'customer_email', 'total_amount', 'products',
+        ])
+        self.assertEqual([(r[0], r[3], r[5], r[6]) for r in rows[1:]], [
+            (str(self.orders[0].pk), 'Alice', '1019.99', 'Laptop; Mouse'),
+            (str(self.orders[2].pk), 'Alice', '0.00', ''),
+        ])
+
+    @override_settings(CRM_EXPORT={'CHUNK_SIZE': 2})
+    def test_customers_ndjson_in_chunks(self):
+        response = self.client.get('/export/customers', {'format': 'ndjson', 'email': 'example'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 2)
+        records = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual([(r['name'], r['phone']) for r in records], [('Alice', '+123456789'), ('Bob', None)])
+
+    @override_settings(CRM_EXPORT={'CHUNK_SIZE': 2})
+    def test_order_lines_read_once_per_chunk(self):
+        response = self.client.get('/export/orders', {'format': 'ndjson'})
+        with self.assertNumQueries(3):
+            lines = self.content(response).splitlines()
+        self.assertEqual([json.loads(line)['products'] for line in lines], ['Laptop; Mouse', 'Mouse', ''])
+
+    def test_formula_cells_escaped_in_csv_only(self):
+        Customer.objects.create(name='=HYPERLINK("http://x.test")', email='@evil@example.com')
+        rows = list(csv.reader(StringIO(self.content(self.client.get('/export/customers')))))
+        self.assertEqual([(r[1], r[2], r[3]) for r in rows[1:]], [
+            ('Alice', 'alice@example.com', "'+123456789"),
+            ('Bob', 'bob@example.com', ''),
+            ("'=HYPERLINK(\"http://x.test\")", "'@evil@example.com", ''),
+        ])
+        lines = self.content(self.client.get('/export/customers', {'format': 'ndjson'})).splitlines()
+        self.assertEqual(json.loads(lines[2])['name'], '=HYPERLINK("http://x.test")')
+
+    def test_remote_clients_need_staff(self):
+        self.assertEqual(self.client.get('/export/orders', REMOTE_ADDR='203.0.113.5').status_code, 403)
+        request = RequestFactory().get('/export/orders', REMOTE_ADDR='203.0.113.5')
+        request.user = SimpleNamespace(is_authenticated=True, is_staff=True)
+        self.assertEqual(views.export(request, 'orders').status_code, 200)
+        with override_settings(INTERNAL_IPS=['203.0.113.5']):
+            self.assertEqual(self.client.get('/export/orders', REMOTE_ADDR='203.0.113.5').status_code, 200)
+
+    def test_bad_requests(self):
+        response = self.client.get('/export/orders', {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"Unknown format 'xml'", response.content)
+        response = self.client.get('/export/orders', {'totalAmount_Gte': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total_amount__gte', response.json()['errors'])
+        self.assertEqual(self.client.post('/export/customers').status_code, 405)
+
+
+@override_settings(CRM_SINKS={'order_reminders': {'BACKEND': 'crm.sinks.DatabaseSink'}})
+class OrderReminderTests(TestCase):
+    """The reminder job reads orders from its watermark on, overlapping it to catch late commits."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.now = datetime.now(dt_timezone.utc)
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        state = Path(state_dir.name) / 'state.json'
+        for name, value in (
+            ('STATE_FILE', state),
+            ('PAGE_SIZE', 1),
+            ('get_client', lambda: GraphQLClient(in_process=True)),
+        ):
+            patcher = mock.patch.object(send_order_reminders, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def order(self, age):
+        order = Order.objects.create(customer=self.customer)
+        Order.objects.filter(pk=order.pk).update(order_date=self.now - age)
+        return order
+
+    def run_job(self):
+        before = set(JobLog.objects.values_list('pk', flat=True))
+        with redirect_stdout(StringIO()):
+            send_order_reminders.main()
+        new = JobLog.objects.exclude(pk__in=before).order_by('pk')
+        return [from_global_id(log.data['order_id'])[1] for log in new]
+
+    def state(self):
+        return json.loads(send_order_reminders.STATE_FILE.read_text())
+
+    def test_watermark_advances(self):
+        self.order(timedelta(days=10))
+        first = self.order(timedelta(days=2))
+        second = self.order(timedelta(days=1))
+        self.assertEqual(self.run_job(), [str(first.pk), str(second.pk)])
+        self.assertEqual(send_order_reminders.parse_date(self.state()['watermark']), self.now - timedelta(days=1))
+        self.assertEqual(self.run_job(), [])
+        third = self.order(timedelta(hours=1))
+        self.assertEqual(self.run_job(), [str(third.pk)])
+
+    def test_overlap_catches_late_commits_once(self):
+        self.order(timedelta(hours=1))
+        self.run_job()
+        # Committed after the run, but dated just before its watermark
+        late = self.order(timedelta(hours=1, minutes=2))
+        self.order(timedelta(hours=2))  # older than the overlap: out of reach
+        self.assertEqual(self.run_job(), [str(late.pk)])
+        self.assertEqual(self.run_job(), [])
+        self.assertEqual(len(self.state()['processed']), 2)
+
+
+class GraphQLClientTests(TestCase):
+    """The shared client retries only what is safe to repeat, and can skip HTTP in-process."""
+
+    def response(self, status, body=None):
+        resp = mock.Mock(status_code=status)
+        resp.json.side_effect = (lambda: body) if body is not None else ValueError
+        return resp
+
+    def http_client(self, *outcomes):
+        client = GraphQLClient(in_process=False, retries=2)
+        client._session = mock.Mock()
+        client._session.post.side_effect = outcomes
+        client.sleep = mock.Mock()
+        return client
+
+    def test_in_process(self):
+        client = GraphQLClient(in_process=True)
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'Hello, GraphQL!'})
+        with self.assertRaises(GraphQLClientError) as ctx:
+            client.execute('{ nope }')
+        self.assertIn('nope', str(ctx.exception))
+        self.assertIs(get_client(in_process=True), get_client(in_process=True))
+
+    def test_query_retried_on_503_and_connection_errors(self):
+        client = self.http_client(
+            self.response(503),
+            requests.ReadTimeout('slow'),
+            self.response(200, {'data': {'hello': 'hi'}}),
+        )
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'hi'})
+        self.assertEqual(client._session.post.call_count, 3)
+        self.assertEqual(client.sleep.call_args_list, [mock.call(0), mock.call(1)])
+
+    def test_retries_exhausted(self):
+        client = self.http_client(*[self.response(503)] * 3)
+        with self.assertRaisesMessage(GraphQLClientError, 'HTTP 503'):
+            client.execute('{ hello }')
+        self.assertEqual(client._session.post.call_count, 3)
+
+    def test_mutation_retried_only_when_never_sent(self):
+        mutation = 'mutation { createCustomer(input: {name: "A", email: "a@example.com"}) { ok } }'
+        refused = requests.ConnectionError(mock.Mock(reason=NewConnectionError(None, 'refused')))
+        client = self.http_client(refused, self.response(200, {'data': {'createCustomer': {'ok': True}}}))
+        self.assertEqual(client.execute(mutation), {'createCustomer': {'ok': True}})
+
+        for outcome in (requests.ReadTimeout('slow'), self.response(503)):
+            client = self.http_client(outcome, self.response(200, {'data': {}}))
+            with self.assertRaises(GraphQLClientError):
+                client.execute(mutation)
+            self.assertEqual(client._session.post.call_count, 1)
+
+    def test_validation_errors_are_not_http_failures(self):
+        client = self.http_client(self.response(400, {'errors': [{'message': 'Cannot query field'}]}))
+        with self.assertRaisesMessage(GraphQLClientError, 'Cannot query field'):
+            client.execute('{ nope }')
+        self.assertEqual(client._session.post.call_count, 1)
+
+
+SALES_TIMESERIES = """
+query($from: Date!, $to: Date!, $granularity: StatsGranularity, $productId: ID) {
+  salesTimeseries(from: $from, to: $to, granularity: $granularity, productId: $productId) {
+    period orderCount revenue customerCount units
+  }
+}
+"""
+
+
+class DailySalesRollupTests(TestCase):
+    """DailySales is rebuilt from the watermark minus the lookback; salesTimeseries reads it."""
+
+    def setUp(self):
+        self.alice = Customer.objects.create(name='Alice', email='alice@example.com')
+        self.bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        self.laptop = Product.objects.create(name='Laptop', price=Decimal('10.00'), stock=100)
+        self.mouse = Product.objects.create(name='Mouse', price=Decimal('1.00'), stock=100)
+        # 2024-01-01 is a Monday
+        for day, customer, product, quantity in (
+            (date(2024, 1, 1), self.alice, self.laptop, 1),
+            (date(2024, 1, 1), self.bob, self.mouse, 5),
+            (date(2024, 1, 3), self.alice, self.laptop, 2),
+            (date(2024, 1, 9), self.bob, self.mouse, 3),
+            (date(2024, 2, 1), self.alice, self.laptop, 1),
+        ):
+            self.order(day, customer, product, quantity)
+
+    def order(self, day, customer, product, quantity):
+        order = Order.objects.create(customer=customer)
+        order.products.add(product, through_defaults={'quantity': quantity, 'unit_price': product.price})
+        placed = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+        Order.objects.filter(pk=order.pk).update(order_date=placed)
+        return order
+
+    def days(self):
+        return list(DailySales.objects.order_by('date').values_list('date', 'order_count', 'revenue', 'customer_count'))
+
+    def series(self, granularity, product=None, start=date(2024, 1, 1), end=date(2024, 2, 29)):
+        variables = {'from': start.isoformat(), 'to': end.isoformat(), 'granularity': granularity}
+        if product is not None:
+            variables['productId'] = product.pk
+        result = schema.execute(SALES_TIMESERIES, context_value=SimpleNamespace(), variable_values=variables)
+        self.assertIsNone(result.errors)
+        return [
+            {key: value for key, value in point.items() if value is not None}
+            for point in result.data['salesTimeseries']
+        ]
+
+    def test_first_refresh_rolls_up_every_order(self):
+        self.assertIsNone(rollups.watermark())
+        self.assertEqual(rollups.refresh_daily_sales(), 4)
+        self.assertEqual(self.days(), [
+            (date(2024, 1, 1), 2, Decimal('15.00'), 2),
+            (date(2024, 1, 3), 1, Decimal('20.00'), 1),
+            (date(2024, 1, 9), 1, Decimal('3.00'), 1),
+            (date(2024, 2, 1), 1, Decimal('10.00'), 1),
+        ])
+        self.assertEqual(rollups.watermark(), date(2024, 2, 1))
+
+    def test_incremental_refresh_replaces_the_lookback_days(self):
+        rollups.refresh_daily_sales()
+        self.order(date(2024, 1, 31), self.bob, self.laptop, 1)  # inside the 1-day lookback
+        self.order(date(2024, 2, 1), self.bob, self.mouse, 2)
+        self.order(date(2024, 1, 9), self.alice, self.mouse, 1)  # before it: left alone
+        self.assertEqual(rollups.refresh_daily_sales(), 2)
+        self.assertEqual(self.days()[2:], [
+            (date(2024, 1, 9), 1, Decimal('3.00'), 1),
+            (date(2024, 1, 31), 1, Decimal('10.00'), 1),
+            (date(2024, 2, 1), 2, Decimal('12.00'), 2),
+        ])
+        rollups.refresh_daily_sales(since=date(2024, 1, 9))
+        self.assertEqual(self.days()[2], (date(2024, 1, 9), 2, Decimal('4.00'), 2))
+
+    def test_timeseries_by_week_and_month(self):
+        rollups.refresh_daily_sales()
+        self.assertEqual(self.series('WEEK'), [
+            {'period': '2024-01-01', 'orderCount': 3, 'revenue': '35.00', 'customerCount': 3},
+            {'period': '2024-01-08', 'orderCount': 1, 'revenue': '3.00', 'customerCount': 1},
+            {'period': '2024-01-29', 'orderCount': 1, 'revenue': '10.00', 'customerCount': 1},
+        ])
+        self.assertEqual(self.series('MONTH'), [
+            {'period': '2024-01-01', 'orderCount': 4, 'revenue': '38.00', 'customerCount': 4},
+            {'period': '2024-02-01', 'orderCount': 1, 'revenue': '10.00', 'customerCount': 1},
+        ])
+        self.assertEqual(self.series('MONTH', product=self.mouse), [
+            {'period': '2024-01-01', 'revenue': '8.00', 'units': 8},
+        ])
+        self.assertEqual(self.series('DAY', start=date(2024, 1, 2), end=date(2024, 1, 9)), [
+            {'period': '2024-01-03', 'orderCount': 1, 'revenue': '20.00', 'customerCount': 1},
+            {'period': '2024-01-09', 'orderCount': 1, 'revenue': '3.00', 'customerCount': 1},
+        ])
+
+    def test_timeseries_rejects_reversed_range(self):
+        result = schema.execute(SALES_TIMESERIES, context_value=SimpleNamespace(),
+                                variable_values={'from': '2024-02-01', 'to': '2024-01-01'})
+        self.assertEqual(result.errors[0].message, '`from` must not be after `to`.')
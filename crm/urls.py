@@ -1,7 +1,13 @@
- from django.urls import path
- from graphene_django.views import GraphQLView
- from django.views.decorators.csrf import csrf_exempt
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from .schema import async_schema
+from .views import AsyncCRMGraphQLView, CRMGraphQLView, export, graphql_cache_stats, graphql_metrics
 
- urlpatterns = [
-     path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
- ]
\ No newline at end of file
+urlpatterns = [
+    path("graphql", csrf_exempt(CRMGraphQLView.as_view(graphiql=True))),
+    path("graphql/async", csrf_exempt(AsyncCRMGraphQLView.as_view(graphiql=True, async_schema=async_schema))),
+    path("graphql/cache-stats", graphql_cache_stats),
+    path("graphql/metrics", graphql_metrics),
+    path("export/customers", export, {"resource": "customers"}),
+    path("export/orders", export, {"resource": "orders"}),
+]
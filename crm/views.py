@@ -1,3 +1,357 @@
-from django.shortcuts import render
+from contextlib import nullcontext
+from functools import partial
+from inspect import isawaitable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.views.decorators.http import require_GET
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, parse, validate_schema
+from graphql.validation import validate
+
+from . import response_cache
+from .complexity import estimate_cost
+from .execution import enable_async
+from .exports import EXPORTS, FORMATS, STREAMERS, ExportError
+from .instrumentation import TRACE_ATTR, OperationTrace, TimingMiddleware, debug_requested, metrics, should_trace
+from .persisted import (
+    PersistedQueryError,
+    aresolve_persisted_query,
+    document_cache,
+    get_cached_document,
+    resolve_persisted_query,
+)
+
+
+class CRMGraphQLView(GraphQLView):
+    """
+    GraphQLView that accepts persisted queries and reuses parsed, validated
+    documents from an in-process LRU, so repeated operations skip both steps.
+    When GRAPHQL_RESPONSE_CACHE is enabled, results of query operations are
+    served from the shared cache until a model they read from changes.
+
+    Every operation is costed before it runs (crm/complexity.py); operations
+    over GRAPHQL_QUERY_COST are rejected, and the cost is reported in the
+    ``extensions`` of the response.
+
+    Sampled requests, and requests carrying the debug header, are traced per
+    resolver and per SQL statement (crm/instrumentation.py).
+    """
+
+    def parse_and_validate(self, query, schema=None):
+        schema = schema or self.schema.graphql_schema
+        try:
+            document = parse(query)
+        except Exception as e:
+            return None, [e]
+        errors = validate(
+            schema,
+            document,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        return document, errors
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        trace = self.start_trace(request)
+        with trace.capture() if trace else nullcontext():
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        if trace:
+            self.finish_trace(request, trace, execution_result)
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        return self.format_response(request, execution_result, id, show_graphiql)
+
+    def format_response(self, request, execution_result, id=None, show_graphiql=False):
+        """GraphQLView.get_response's JSON body and status, plus ``extensions``."""
+        status_code = 200
+        if not execution_result:
+            return None, status_code
+
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        if getattr(request, TRACE_ATTR, None) is not None:
+            middleware = [*(middleware or []), TimingMiddleware()]
+        return middleware
+
+    @staticmethod
+    def start_trace(request):
+        if not should_trace(request):
+            return None
+        trace = OperationTrace()
+        setattr(request, TRACE_ATTR, trace)
+        return trace
+
+    def finish_trace(self, request, trace, result):
+        delattr(request, TRACE_ATTR)
+        metrics.record(trace)
+        if result is not None and debug_requested(request):
+            self.with_extensions(result, trace.extensions)
+
+    @staticmethod
+    def with_extensions(result, extensions):
+        result.extensions = {**(result.extensions or {}), **extensions}
+        return result
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        try:
+            query = resolve_persisted_query(request, data, query)
+        except PersistedQueryError as e:
+            return ExecutionResult(data=None, errors=[e])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = get_cached_document(schema, query, self.parse_and_validate)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        # Costed from the AST and cached table sizes, before any resolver runs
+        cost = estimate_cost(schema, document, operation_name, variables)
+        if cost.errors:
+            return ExecutionResult(data=None, errors=cost.errors, extensions=cost.extensions)
+
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return self.with_extensions(result, cost.extensions)
+
+            cache_key = None
+            if response_cache.is_enabled():
+                cache_key = response_cache.cache_key(schema, query, document, operation_name, variables)
+            if cache_key is not None:
+                data = response_cache.lookup(cache_key)
+                if data is not None:
+                    return ExecutionResult(data=data, extensions=cost.extensions)
+
+            result = execute(schema, document, **execute_options)
+            if cache_key is not None and not result.errors and result.data is not None:
+                response_cache.store(cache_key, result.data)
+            return self.with_extensions(result, cost.extensions)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """
+    ASGI variant of CRMGraphQLView. Single query operations execute on the
+    event loop against ``async_schema``, so a request waiting on the database
+    does not hold a worker thread. GraphiQL, batches, mutations and invalid
+    requests are handed to the sync view in a thread.
+    """
+
+    async_schema = None
+
+    view_is_async = True
+
+    def __init__(self, async_schema=None, **kwargs):
+        super().__init__(**kwargs)
+        self.async_schema = async_schema or self.async_schema
+        assert self.async_schema is not None, "AsyncCRMGraphQLView requires an async_schema"
+
+    async def prepare_query(self, request):
+        """
+        ``(query, document, variables, operation_name, cost)`` for a request the
+        event loop can execute, or None when it has to go through the sync view.
+        """
+        if request.method.lower() not in ("get", "post") or self.batch:
+            return None
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return None
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+            query = await aresolve_persisted_query(request, data, query)
+        except (HttpError, PersistedQueryError):
+            return None
+        if not query:
+            return None
+        schema = self.async_schema.graphql_schema
+        document, errors = get_cached_document(
+            schema, query, partial(self.parse_and_validate, schema=schema)
+        )
+        if errors:
+            return None
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        # Root lists may need a table-size estimate from the database
+        cost = await sync_to_async(estimate_cost)(schema, document, operation_name, variables)
+        if cost.errors:
+            return None
+        return query, document, variables, operation_name, cost
+
+    async def dispatch(self, request, *args, **kwargs):
+        prepared = await self.prepare_query(request)
+        if prepared is None:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        query, document, variables, operation_name, cost = prepared
+        schema = self.async_schema.graphql_schema
+
+        trace = self.start_trace(request)
+        async with trace.capture_async() if trace else nullcontext():
+            # Cache calls go through the async API so a network cache never blocks the loop
+            cache_key = None
+            if response_cache.is_enabled():
+                cache_key = await response_cache.acache_key(schema, query, document, operation_name, variables)
+            result = await response_cache.alookup(cache_key) if cache_key is not None else None
+            if result is not None:
+                result = ExecutionResult(data=result)
+            else:
+                result = await self.execute_async(request, document, variables, operation_name)
+                if cache_key is not None and not result.errors and result.data is not None:
+                    await response_cache.astore(cache_key, result.data)
+        if trace:
+            self.finish_trace(request, trace, result)
+
+        content, status_code = self.format_response(request, self.with_extensions(result, cost.extensions))
+        return HttpResponse(status=status_code, content=content, content_type="application/json")
+
+    async def execute_async(self, request, document, variables, operation_name):
+        try:
+            result = execute(
+                self.async_schema.graphql_schema,
+                document,
+                root_value=self.get_root_value(request),
+                context_value=enable_async(self.get_context(request)),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+                execution_context_class=self.execution_context_class,
+            )
+            if isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def graphql_cache_stats(request):
+    """Hit rate and memory use of the parsed-document cache."""
+    return JsonResponse(document_cache.stats())
+
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def _internal(request):
+    remote = request.META.get('REMOTE_ADDR')
+    return remote in LOCAL_ADDRESSES or remote in getattr(settings, 'INTERNAL_IPS', ())
+
+
+def graphql_metrics(request):
+    """Histograms of traced operations in the Prometheus text format, for local scrapers only."""
+    if not _internal(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.export(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def export(request, resource):
+    """
+    Stream every customer or order matching the CustomerFilter / OrderFilter
+    query parameters as CSV (default) or NDJSON (``?format=ndjson``).
+    Every row goes out, so only local or INTERNAL_IPS clients and staff users get it.
+    """
+    user = getattr(request, 'user', None)
+    if not _internal(request) and not (user and user.is_authenticated and user.is_staff):
+        return HttpResponseForbidden()
+    params = request.GET.copy()
+    fmt = params.pop('format', ['csv'])[-1]
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown format {fmt!r}; use one of: {', '.join(FORMATS)}")
+    try:
+        source = EXPORTS[resource](params.dict())
+    except ExportError as e:
+        return JsonResponse({'errors': e.args[0]}, status=400)
+    response = StreamingHttpResponse(STREAMERS[fmt](source), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{resource}.{fmt}"'
+    return response